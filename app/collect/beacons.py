@@ -0,0 +1,36 @@
+from sqlalchemy import and_, select
+
+from app.model import AircraftBeacon, Position, Reception
+
+from app import app
+
+
+def use_normalized_layout():
+    """True if the aircraft beacons are stored in 'positions' and 'receptions' (BEACON_LAYOUT = "normalized")."""
+
+    return app.config.get("BEACON_LAYOUT") == "normalized"
+
+
+def get_aircraft_beacons():
+    """Returns the aircraft beacons (one row per reception) with the column names of the table 'aircraft_beacons'.
+       Normalized layout: the receptions joined with their positions (without the columns which are not stored, e.g. receiver_name)."""
+
+    if not use_normalized_layout():
+        return AircraftBeacon.__table__
+
+    positions = Position.__table__
+    receptions = Reception.__table__
+
+    columns = [column for column in positions.c if column.name != "error_count"] + [column for column in receptions.c if column.name not in ("device_id", "timestamp")]
+
+    return select(columns).select_from(receptions.join(positions, and_(receptions.c.device_id == positions.c.device_id, receptions.c.timestamp == positions.c.timestamp))).alias("aircraft_beacons")
+
+
+def get_positions():
+    """Returns the table with the aircraft positions: 'positions' (one row per device and timestamp) or 'aircraft_beacons' (one row per reception).
+       The result of a query must not depend on the number of receptions (e.g. max altitude)."""
+
+    if use_normalized_layout():
+        return Position.__table__
+    else:
+        return AircraftBeacon.__table__
@@ -14,6 +14,8 @@ from app.collect.stats import create_device_stats, update_device_stats_jumps, cr
 
 from app.collect.ognrange import update_entries as receiver_coverage_update_entries
 
+from app.collect.beacons import use_normalized_layout
+
 from app import db
 from app import celery
 
@@ -67,12 +69,16 @@ def update_receivers_country_code():
 
 @celery.task(name="purge_old_data")
 def purge_old_data(max_hours):
-    """Delete AircraftBeacons and ReceiverBeacons older than given 'age'."""
+    """Delete AircraftBeacons (or Positions and Receptions) and ReceiverBeacons older than given 'age'."""
 
-    from app.model import AircraftBeacon, ReceiverBeacon
+    from app.model import AircraftBeacon, Position, Reception, ReceiverBeacon
 
     min_timestamp = datetime.datetime.utcnow() - datetime.timedelta(hours=max_hours)
-    aircraft_beacons_deleted = db.session.query(AircraftBeacon).filter(AircraftBeacon.timestamp < min_timestamp).delete()
+    if use_normalized_layout():
+        aircraft_beacons_deleted = db.session.query(Reception).filter(Reception.timestamp < min_timestamp).delete()
+        db.session.query(Position).filter(Position.timestamp < min_timestamp).delete()
+    else:
+        aircraft_beacons_deleted = db.session.query(AircraftBeacon).filter(AircraftBeacon.timestamp < min_timestamp).delete()
 
     receiver_beacons_deleted = db.session.query(ReceiverBeacon).filter(ReceiverBeacon.timestamp < min_timestamp).delete()
 
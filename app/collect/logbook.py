@@ -2,8 +2,9 @@ from sqlalchemy import and_, or_, insert, update, exists, between
 from sqlalchemy.sql import func, null
 from sqlalchemy.sql.expression import true, false
 
-from app.model import TakeoffLanding, Logbook, AircraftBeacon
+from app.model import TakeoffLanding, Logbook
 from app.utils import date_to_timestamps
+from app.collect.beacons import get_positions
 
 from app import app
 
@@ -183,10 +184,11 @@ def update_max_altitudes(session, date, logger=None):
         .subquery()
     )
 
+    positions = get_positions()
     max_altitudes = (
-        session.query(Logbook.id, func.max(AircraftBeacon.altitude).label("max_altitude"))
+        session.query(Logbook.id, func.max(positions.c.altitude).label("max_altitude"))
         .filter(Logbook.id == logbook_entries.c.id)
-        .filter(and_(AircraftBeacon.device_id == Logbook.device_id, AircraftBeacon.timestamp >= Logbook.takeoff_timestamp, AircraftBeacon.timestamp <= Logbook.landing_timestamp))
+        .filter(and_(positions.c.device_id == Logbook.device_id, positions.c.timestamp >= Logbook.takeoff_timestamp, positions.c.timestamp <= Logbook.landing_timestamp))
         .group_by(Logbook.id)
         .subquery()
     )
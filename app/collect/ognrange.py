@@ -2,8 +2,9 @@ from sqlalchemy import Date
 from sqlalchemy import and_, insert, update, exists, between
 from sqlalchemy.sql import func, null
 
-from app.model import AircraftBeacon, ReceiverCoverage
+from app.model import ReceiverCoverage
 from app.utils import date_to_timestamps
+from app.collect.beacons import get_aircraft_beacons
 
 from app import app
 
@@ -17,11 +18,12 @@ def update_entries(session, date, logger=None):
     logger.info("Compute receiver coverages.")
 
     (start, end) = date_to_timestamps(date)
+    beacons = get_aircraft_beacons()
 
     # Filter aircraft beacons
     sq = (
-        session.query(AircraftBeacon.location_mgrs_short, AircraftBeacon.receiver_id, AircraftBeacon.signal_quality, AircraftBeacon.altitude, AircraftBeacon.device_id)
-        .filter(and_(between(AircraftBeacon.timestamp, start, end), AircraftBeacon.location_mgrs_short != null(), AircraftBeacon.receiver_id != null(), AircraftBeacon.device_id != null()))
+        session.query(beacons.c.location_mgrs_short, beacons.c.receiver_id, beacons.c.signal_quality, beacons.c.altitude, beacons.c.device_id)
+        .filter(and_(between(beacons.c.timestamp, start, end), beacons.c.location_mgrs_short != null(), beacons.c.receiver_id != null(), beacons.c.device_id != null()))
         .subquery()
     )
 
@@ -2,9 +2,10 @@ from sqlalchemy import insert, distinct, between, literal
 from sqlalchemy.sql import null, and_, func, or_, update
 from sqlalchemy.sql.expression import case
 
-from app.model import AircraftBeacon, DeviceStats, Country, CountryStats, ReceiverStats, ReceiverBeacon, RelationStats, Receiver, Device
+from app.model import DeviceStats, Country, CountryStats, ReceiverStats, ReceiverBeacon, RelationStats, Receiver, Device
 
 from app.utils import date_to_timestamps
+from app.collect.beacons import get_aircraft_beacons, get_positions
 
 from app import app
 
@@ -19,15 +20,16 @@ def create_device_stats(session, date, logger=None):
         logger = app.logger
 
     (start, end) = date_to_timestamps(date)
+    beacons = get_aircraft_beacons()
 
     # First kill the stats for the selected date
     deleted_counter = session.query(DeviceStats).filter(DeviceStats.date == date).delete()
 
     # Since "distinct count" does not work in window functions we need a work-around for receiver counting
     sq = (
-        session.query(AircraftBeacon, func.dense_rank().over(partition_by=AircraftBeacon.device_id, order_by=AircraftBeacon.receiver_id).label("dr"))
-        .filter(and_(between(AircraftBeacon.timestamp, start, end), AircraftBeacon.device_id != null()))
-        .filter(or_(AircraftBeacon.error_count == 0, AircraftBeacon.error_count == null()))
+        session.query(beacons, func.dense_rank().over(partition_by=beacons.c.device_id, order_by=beacons.c.receiver_id).label("dr"))
+        .filter(and_(between(beacons.c.timestamp, start, end), beacons.c.device_id != null()))
+        .filter(or_(beacons.c.error_count == 0, beacons.c.error_count == null()))
         .subquery()
     )
 
@@ -86,6 +88,7 @@ def create_receiver_stats(session, date, logger=None):
         logger = app.logger
 
     (start, end) = date_to_timestamps(date)
+    beacons = get_aircraft_beacons()
 
     # First kill the stats for the selected date
     deleted_counter = session.query(ReceiverStats).filter(ReceiverStats.date == date).delete()
@@ -127,13 +130,13 @@ def create_receiver_stats(session, date, logger=None):
     # Update aircraft_beacon_count, aircraft_count and max_distance
     aircraft_beacon_stats = (
         session.query(
-            AircraftBeacon.receiver_id,
-            func.count(AircraftBeacon.timestamp).label("aircraft_beacon_count"),
-            func.count(func.distinct(AircraftBeacon.device_id)).label("aircraft_count"),
-            func.max(AircraftBeacon.distance).label("max_distance"),
+            beacons.c.receiver_id,
+            func.count(beacons.c.timestamp).label("aircraft_beacon_count"),
+            func.count(func.distinct(beacons.c.device_id)).label("aircraft_count"),
+            func.max(beacons.c.distance).label("max_distance"),
         )
-        .filter(and_(between(AircraftBeacon.timestamp, start, end), AircraftBeacon.error_count == 0, AircraftBeacon.quality <= MAX_PLAUSIBLE_QUALITY, AircraftBeacon.relay == null()))
-        .group_by(AircraftBeacon.receiver_id)
+        .filter(and_(between(beacons.c.timestamp, start, end), beacons.c.error_count == 0, beacons.c.quality <= MAX_PLAUSIBLE_QUALITY, beacons.c.relay == null()))
+        .group_by(beacons.c.receiver_id)
         .subquery()
     )
 
@@ -158,14 +161,15 @@ def create_country_stats(session, date, logger=None):
         logger = app.logger
 
     (start, end) = date_to_timestamps(date)
+    beacons = get_aircraft_beacons()
 
     # First kill the stats for the selected date
     deleted_counter = session.query(CountryStats).filter(CountryStats.date == date).delete()
 
     country_stats = (
-        session.query(literal(date), Country.gid, func.count(AircraftBeacon.timestamp).label("aircraft_beacon_count"), func.count(func.distinct(AircraftBeacon.receiver_id)).label("device_count"))
-        .filter(between(AircraftBeacon.timestamp, start, end))
-        .filter(func.st_contains(Country.geom, AircraftBeacon.location))
+        session.query(literal(date), Country.gid, func.count(beacons.c.timestamp).label("aircraft_beacon_count"), func.count(func.distinct(beacons.c.receiver_id)).label("device_count"))
+        .filter(between(beacons.c.timestamp, start, end))
+        .filter(func.st_contains(Country.geom, beacons.c.location))
         .group_by(Country.gid)
         .subquery()
     )
@@ -184,6 +188,7 @@ def update_device_stats_jumps(session, date, logger=None):
         logger = app.logger
 
     (start, end) = date_to_timestamps(date)
+    positions = get_positions()
 
     # speed limits in m/s (values above indicates a unplausible position / jump)
     max_horizontal_speed = 1000
@@ -193,15 +198,15 @@ def update_device_stats_jumps(session, date, logger=None):
     # find consecutive positions for a device
     sq = (
         session.query(
-            AircraftBeacon.device_id,
-            AircraftBeacon.timestamp,
-            func.lead(AircraftBeacon.timestamp).over(partition_by=AircraftBeacon.device_id, order_by=AircraftBeacon.timestamp).label("timestamp_next"),
-            AircraftBeacon.location_wkt,
-            func.lead(AircraftBeacon.location_wkt).over(partition_by=AircraftBeacon.device_id, order_by=AircraftBeacon.timestamp).label("location_next"),
-            AircraftBeacon.altitude,
-            func.lead(AircraftBeacon.altitude).over(partition_by=AircraftBeacon.device_id, order_by=AircraftBeacon.timestamp).label("altitude_next"),
+            positions.c.device_id,
+            positions.c.timestamp,
+            func.lead(positions.c.timestamp).over(partition_by=positions.c.device_id, order_by=positions.c.timestamp).label("timestamp_next"),
+            positions.c.location,
+            func.lead(positions.c.location).over(partition_by=positions.c.device_id, order_by=positions.c.timestamp).label("location_next"),
+            positions.c.altitude,
+            func.lead(positions.c.altitude).over(partition_by=positions.c.device_id, order_by=positions.c.timestamp).label("altitude_next"),
         )
-        .filter(and_(between(AircraftBeacon.timestamp, start, end), AircraftBeacon.error_count == 0))
+        .filter(and_(between(positions.c.timestamp, start, end), positions.c.error_count == 0))
         .subquery()
     )
 
@@ -240,23 +245,24 @@ def create_relation_stats(session, date, logger=None):
         logger = app.logger
 
     (start, end) = date_to_timestamps(date)
+    beacons = get_aircraft_beacons()
 
     # First kill the stats for the selected date
     deleted_counter = session.query(RelationStats).filter(RelationStats.date == date).delete()
 
     # Calculate stats for selected day
     relation_stats = (
-        session.query(literal(date), AircraftBeacon.device_id, AircraftBeacon.receiver_id, func.max(AircraftBeacon.quality), func.count(AircraftBeacon.timestamp))
+        session.query(literal(date), beacons.c.device_id, beacons.c.receiver_id, func.max(beacons.c.quality), func.count(beacons.c.timestamp))
         .filter(
             and_(
-                between(AircraftBeacon.timestamp, start, end),
-                AircraftBeacon.distance > 1000,
-                AircraftBeacon.error_count == 0,
-                AircraftBeacon.quality <= MAX_PLAUSIBLE_QUALITY,
-                AircraftBeacon.ground_speed > 10,
+                between(beacons.c.timestamp, start, end),
+                beacons.c.distance > 1000,
+                beacons.c.error_count == 0,
+                beacons.c.quality <= MAX_PLAUSIBLE_QUALITY,
+                beacons.c.ground_speed > 10,
             )
         )
-        .group_by(literal(date), AircraftBeacon.device_id, AircraftBeacon.receiver_id)
+        .group_by(literal(date), beacons.c.device_id, beacons.c.receiver_id)
         .subquery()
     )
 
@@ -4,7 +4,8 @@ from sqlalchemy import and_, or_, insert, between, exists
 from sqlalchemy.sql import func, null
 from sqlalchemy.sql.expression import case
 
-from app.model import AircraftBeacon, TakeoffLanding, Airport
+from app.model import AircraftBeacon, Position, TakeoffLanding, Airport
+from app.collect.beacons import use_normalized_layout
 
 from app import app
 
@@ -40,14 +41,17 @@ def update_entries(session, start, end, logger=None):
     max_agl = 200  # takeoff / landing must not exceed this altitude AGL
 
     # get beacons for selected time range, one per device_id and timestamp
-    sq = (
-        session.query(AircraftBeacon)
-        .distinct(AircraftBeacon.device_id, AircraftBeacon.timestamp)
-        .order_by(AircraftBeacon.device_id, AircraftBeacon.timestamp, AircraftBeacon.error_count)
-        .filter(AircraftBeacon.agl < max_agl)
-        .filter(between(AircraftBeacon.timestamp, start, end))
-        .subquery()
-    )
+    if use_normalized_layout():
+        sq = session.query(Position).filter(Position.agl < max_agl).filter(between(Position.timestamp, start, end)).subquery()
+    else:
+        sq = (
+            session.query(AircraftBeacon)
+            .distinct(AircraftBeacon.device_id, AircraftBeacon.timestamp)
+            .order_by(AircraftBeacon.device_id, AircraftBeacon.timestamp, AircraftBeacon.error_count)
+            .filter(AircraftBeacon.agl < max_agl)
+            .filter(between(AircraftBeacon.timestamp, start, end))
+            .subquery()
+        )
 
     # make a query with current, previous and next position
     sq2 = session.query(
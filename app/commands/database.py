@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.sql import func
 
 from app.collect.database import update_device_infos, update_country_code
+from app.collect.beacons import get_positions
 from app.model import *
 from app.utils import get_airports, get_days
 
@@ -19,10 +20,11 @@ ALEMBIC_CONFIG_FILE = "alembic.ini"
 
 
 def get_database_days(start, end):
-    """Returns the first and the last day in aircraft_beacons table."""
+    """Returns the first and the last day in aircraft_beacons table (or positions table)."""
 
     if start is None and end is None:
-        days_from_db = db.session.query(func.min(AircraftBeacon.timestamp).label("first_day"), func.max(AircraftBeacon.timestamp).label("last_day")).one()
+        positions = get_positions()
+        days_from_db = db.session.query(func.min(positions.c.timestamp).label("first_day"), func.max(positions.c.timestamp).label("last_day")).one()
         start = days_from_db[0].date()
         end = days_from_db[1].date()
     else:
@@ -64,6 +66,8 @@ def init_timescaledb():
     db.session.execute("CREATE EXTENSION IF NOT EXISTS timescaledb;")
     db.session.execute("SELECT create_hypertable('aircraft_beacons', 'timestamp', chunk_target_size => '2GB', if_not_exists => TRUE);")
     db.session.execute("SELECT create_hypertable('receiver_beacons', 'timestamp', chunk_target_size => '2GB', if_not_exists => TRUE);")
+    db.session.execute("SELECT create_hypertable('positions', 'timestamp', chunk_target_size => '2GB', if_not_exists => TRUE);")
+    db.session.execute("SELECT create_hypertable('receptions', 'timestamp', chunk_target_size => '2GB', if_not_exists => TRUE);")
     db.session.commit()
 
 
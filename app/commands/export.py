@@ -107,3 +107,20 @@ def igc(address, date):
 
         for point in points.all():
             writer.write_fix(point.timestamp.time(), latitude=point.location.latitude, longitude=point.location.longitude, valid=True, pressure_alt=point.altitude, gps_alt=point.altitude)
+
+
+@user_cli.command("elevation")
+@click.argument("path")
+@click.option("--tile_size", default=256, type=click.INT, help="Edge length of the tiles in pixels (default: 256)")
+def elevation(path, tile_size):
+    """Export the elevation rasters into a memory-mapped grid at <path> (used for AGL computation, see ELEVATION_GRID_PATH)."""
+
+    from app.gateway.elevation import export_elevation
+
+    connection = db.engine.raw_connection()
+    try:
+        grid = export_elevation(connection, path, tile_size=tile_size)
+    finally:
+        connection.close()
+
+    print("Exported elevation grid with {}x{} pixels ({} tiles with data) to '{}'.".format(grid.cols, grid.rows, len(grid.tiles), path))
@@ -5,6 +5,7 @@ from datetime import datetime
 from tqdm import tqdm
 
 from app.commands.database import get_database_days
+from app.collect.beacons import use_normalized_layout
 from app import db
 
 user_cli = AppGroup("flights")
@@ -15,6 +16,28 @@ CONTEST_RELEVANT = "AND agl < 1000"
 LOW_PASS = "AND agl < 50 and ground_speed > 250"
 
 
+def get_positions_subquery(date, filter):
+    """One position per device and timestamp (from the reception with the fewest errors) with timestamp, device_id, location and agl."""
+
+    if use_normalized_layout():
+        return """
+                        SELECT   timestamp, device_id, location, agl
+                        FROM     positions
+                        WHERE    timestamp BETWEEN '{date} 00:00:00' AND '{date} 23:59:59' {filter}
+        """.format(
+            date=date.strftime("%Y-%m-%d"), filter=filter
+        )
+
+    return """
+                        SELECT   DISTINCT ON (device_id, timestamp) timestamp, device_id, location, agl
+                        FROM     aircraft_beacons
+                        WHERE    timestamp BETWEEN '{date} 00:00:00' AND '{date} 23:59:59' {filter}
+                        ORDER BY device_id, timestamp, error_count
+    """.format(
+        date=date.strftime("%Y-%m-%d"), filter=filter
+    )
+
+
 def compute_gaps(session, date):
     query = """
         INSERT INTO flights2d(date, flight_type, device_id, path)
@@ -35,10 +58,7 @@ def compute_gaps(session, date):
                      LAG(sq.device_id) OVER ( PARTITION BY sq.timestamp::DATE, sq.device_id ORDER BY sq.timestamp) d2
                   FROM
                      (
-                        SELECT DISTINCT ON (device_id, timestamp) timestamp, device_id, location, agl
-                        FROM aircraft_beacons
-                        WHERE    timestamp BETWEEN '{date} 00:00:00' AND '{date} 23:59:59' AND agl > 300
-                        ORDER BY device_id, timestamp, error_count
+                        {positions}
                      ) sq
                ) sq2
             WHERE EXTRACT(epoch FROM sq2.t1 - sq2.t2) > 300
@@ -47,7 +67,7 @@ def compute_gaps(session, date):
         GROUP BY sq3.device_id
         ON CONFLICT DO NOTHING;
     """.format(
-        date=date.strftime("%Y-%m-%d")
+        date=date.strftime("%Y-%m-%d"), positions=get_positions_subquery(date, "AND agl > 300")
     )
 
     session.execute(query)
@@ -101,10 +121,7 @@ def compute_flights2d(session, date, flight_type):
                             sq.device_id                                                             d1,
                             lag(sq.device_id) OVER (partition BY sq.device_id ORDER BY sq.timestamp) d2
                     FROM     (
-                        SELECT   DISTINCT ON (device_id, timestamp) timestamp, device_id, location
-                        FROM     aircraft_beacons
-                        WHERE    timestamp BETWEEN '{date} 00:00:00' AND '{date} 23:59:59' {filter}
-                        ORDER BY device_id, timestamp, error_count
+                        {positions}
                     ) sq
                 ) sq2
             ) sq3
@@ -114,7 +131,7 @@ def compute_flights2d(session, date, flight_type):
     GROUP BY sq5.device_id
     ON CONFLICT DO NOTHING;
     """.format(
-        date=date.strftime("%Y-%m-%d"), flight_type=flight_type, filter=filter
+        date=date.strftime("%Y-%m-%d"), flight_type=flight_type, positions=get_positions_subquery(date, filter)
     )
     session.execute(query)
     session.commit()
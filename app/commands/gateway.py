@@ -1,8 +1,19 @@
+import gzip
+import os
+
 from flask.cli import AppGroup
 import click
 
-from ogn.client import AprsClient
-from app.gateway.bulkimport import ContinuousDbFeeder
+from ogn.client import AprsClient, settings
+from app.gateway.bulkimport import ContinuousDbFeeder, parse_errors
+from app.gateway.async_gateway import AsyncGateway
+from app.gateway.spool import Spool, acquire_lock, get_segments, replay_spool
+from app.gateway.parse_errors import get_dead_letter_files, read_dead_letters
+from app.gateway.simulator import TrafficSimulator
+from app.gateway.benchmark import run_benchmark, format_report
+from app.gateway.replay_server import ReplayServer
+from app.gateway.metrics import metrics
+from app.gateway.supervisor import Supervisor
 
 from app import app
 
@@ -10,19 +21,61 @@ user_cli = AppGroup("gateway")
 user_cli.help = "Connection to APRS servers."
 
 
-@user_cli.command("run")
-def run(aprs_user="anon-dev"):
-    """Run the aprs client."""
+def get_worker_filename(filename, worker):
+    """Each worker has its own file: 'gateway.prom' -> 'gateway_0.prom'."""
 
-    saver = ContinuousDbFeeder()
+    if worker is None:
+        return filename
 
-    # User input validation
-    if len(aprs_user) < 3 or len(aprs_user) > 9:
-        print("aprs_user must be a string of 3-9 characters.")
+    root, ext = os.path.splitext(filename)
+    return "{}_{}{}".format(root, worker, ext)
+
+
+def run_gateway(aprs_user, aprs_filter="", use_asyncio=False, queue_size=10000, streaming=False, worker=None, partition=None):
+    """Run the aprs client with a ContinuousDbFeeder until KeyboardInterrupt."""
+
+    include = app.config.get("GATEWAY_INCLUDE_BEACON_TYPES")
+    exclude = app.config.get("GATEWAY_EXCLUDE_BEACON_TYPES")
+    saver = ContinuousDbFeeder(
+        streaming=streaming, include=include.split(",") if include else None, exclude=exclude.split(",") if exclude else None, worker=worker, partition=partition
+    )
+
+    spool_path = app.config.get("SPOOL_PATH")
+    if spool_path:
+        if worker is not None:
+            spool_path = os.path.join(spool_path, "worker_{}".format(worker))
+
+        # the spool is locked before the replay, so "gateway recover" can't replay the same lines
+        spool = Spool(spool_path)
+
+        # replay lines which were received but not transfered before the last stop (e.g. a crash)
+        count = replay_spool(spool_path, saver)
+        if count > 0:
+            app.logger.warning("Replayed {} lines from spool".format(count))
+        saver.spool = spool
+
+    if app.config.get("DEAD_LETTER_FILE"):
+        parse_errors.set_dead_letter_file(get_worker_filename(app.config["DEAD_LETTER_FILE"], worker))
+
+    if app.config.get("APRS_SERVER_HOST"):
+        settings.APRS_SERVER_HOST = app.config["APRS_SERVER_HOST"]
+    if app.config.get("APRS_SERVER_PORT"):
+        settings.APRS_SERVER_PORT_FULL_FEED = settings.APRS_SERVER_PORT_CLIENT_DEFINED_FILTERS = int(app.config["APRS_SERVER_PORT"])
+
+    if app.config.get("METRICS_PORT"):
+        metrics.serve(int(app.config["METRICS_PORT"]) + (worker or 0))
+    if app.config.get("METRICS_FILE"):
+        metrics.start_writer(get_worker_filename(app.config["METRICS_FILE"], worker))
+
+    app.logger.warning("Start ogn gateway" if worker is None else "Start ogn gateway worker {}".format(worker))
+
+    if use_asyncio:
+        gateway = AsyncGateway(saver, aprs_user, aprs_filter=aprs_filter, queue_size=queue_size)
+        gateway.run()
+        saver.close()
         return
 
-    app.logger.warning("Start ogn gateway")
-    client = AprsClient(aprs_user)
+    client = AprsClient(aprs_user, aprs_filter)
     client.connect()
 
     try:
@@ -30,5 +83,196 @@ def run(aprs_user="anon-dev"):
     except KeyboardInterrupt:
         app.logger.warning("\nStop ogn gateway")
 
-    saver.flush()
+    saver.finish()
+    saver.close()
     client.disconnect()
+
+
+def run_gateway_worker(**kwargs):
+    """Runs in the worker processes of the supervisor."""
+
+    with app.app_context():
+        run_gateway(**kwargs)
+
+
+@user_cli.command("run")
+@click.option("--asyncio", "use_asyncio", is_flag=True, help="Read, parse and write in separated tasks with a queue")
+@click.option("--queue_size", default=10000, help="Max number of received lines in memory, further lines are spilled into a temporary file (only with --asyncio, spilled lines survive a crash only with SPOOL_PATH)")
+@click.option("--streaming", is_flag=True, help="Write the beacons directly into the final tables (no staging tables)")
+@click.option("--workers", default=1, help="Number of worker processes, the receivers are hash partitioned (each worker reads the full feed)")
+def run(aprs_user="anon-dev", use_asyncio=False, queue_size=10000, streaming=False, workers=1):
+    """Run the aprs client.
+
+       With GATEWAY_WORKER_FILTERS or --workers > 1 a supervisor runs one gateway worker process per APRS filter
+       (or per receiver partition). Each worker has its own staging tables and database connections."""
+
+    # User input validation
+    if len(aprs_user) < 3 or len(aprs_user) > 9:
+        print("aprs_user must be a string of 3-9 characters.")
+        return
+
+    worker_filters = app.config.get("GATEWAY_WORKER_FILTERS")
+    if worker_filters:
+        filters = [aprs_filter.strip() for aprs_filter in worker_filters.split(";") if aprs_filter.strip()]
+        worker_kwargs = [{"aprs_filter": aprs_filter, "worker": worker} for worker, aprs_filter in enumerate(filters)]
+    elif workers > 1:
+        worker_kwargs = [{"worker": worker, "partition": (worker, workers)} for worker in range(workers)]
+    else:
+        run_gateway(aprs_user, use_asyncio=use_asyncio, queue_size=queue_size, streaming=streaming)
+        return
+
+    for kwargs in worker_kwargs:
+        # APRS servers may drop one of two connections with the same login, so each worker gets its own (max. 9 characters)
+        worker_user = "{}{}".format(aprs_user[: 9 - len(str(kwargs["worker"]))], kwargs["worker"])
+        kwargs.update({"aprs_user": worker_user, "use_asyncio": use_asyncio, "queue_size": queue_size, "streaming": streaming})
+
+    app.logger.warning("Start supervisor with {} gateway workers".format(len(worker_kwargs)))
+    supervisor = Supervisor(run_gateway_worker, worker_kwargs)
+    supervisor.run()
+
+
+@user_cli.command("recover")
+@click.argument("path", required=False)
+def recover(path=None):
+    """Replay the unacknowledged spool segments (default path: SPOOL_PATH). Refuses to run while a gateway uses the spool."""
+
+    path = path or app.config.get("SPOOL_PATH")
+    if not path:
+        print("No spool path given and SPOOL_PATH is not set.")
+        return
+
+    segments = get_segments(path)
+    if not segments:
+        print("Nothing to recover.")
+        return
+
+    lock_file = acquire_lock(path)
+    if lock_file is None:
+        print("The spool is used by a running gateway.")
+        return
+
+    # own staging tables: the staging tables of a gateway must not be dropped
+    saver = ContinuousDbFeeder(worker="recover")
+    count = replay_spool(path, saver)
+    saver.close(drop=True)
+    lock_file.close()
+
+    print("Replayed {} lines from {} segments.".format(count, len(segments)))
+
+
+@user_cli.command("replay_dead_letters")
+@click.argument("filename", required=False)
+@click.option("--delete", is_flag=True, help="Delete the dead letter files after the replay")
+def replay_dead_letters(filename=None, delete=False):
+    """Replay the lines of the dead letter file (default: DEAD_LETTER_FILE) and its rotated files, e.g. after a parser update."""
+
+    filename = filename or app.config.get("DEAD_LETTER_FILE")
+    if not filename:
+        print("No dead letter file given and DEAD_LETTER_FILE is not set.")
+        return
+
+    files = get_dead_letter_files(filename)
+    if not files:
+        print("Nothing to replay.")
+        return
+
+    # own staging tables: a running gateway must not lose its staging tables
+    saver = ContinuousDbFeeder(worker="replay")
+    count = 0
+    for dead_letter_file in files:
+        for _, reference_date, raw_string in read_dead_letters(dead_letter_file):
+            saver.parse(raw_string, reference_date=reference_date)
+            count += 1
+
+            if saver.buffered_count() >= 100000:
+                saver.flush()
+    saver.finish()
+    saver.close(drop=True)
+
+    parse_errors.log_summary()
+    print("Replayed {} lines from {} files, {} lines failed again.".format(count, len(files), parse_errors.total))
+
+    if delete:
+        for dead_letter_file in files:
+            os.remove(dead_letter_file)
+
+
+@user_cli.command("simulate")
+@click.argument("filename")
+@click.option("--duration", default=3600, help="Simulated seconds")
+@click.option("--aircraft", default=200, help="Number of aircraft")
+@click.option("--receivers", default=100, help="Number of receivers")
+@click.option("--seed", default=0, help="Seed of the random generator")
+def simulate(filename, duration=3600, aircraft=200, receivers=100, seed=0):
+    """Write synthetic APRS traffic into a log file (gzip compressed if it ends with '.gz'), e.g. OGN_log.txt_2020-05-01.gz."""
+
+    simulator = TrafficSimulator(aircraft_count=aircraft, receiver_count=receivers, seed=seed)
+
+    count = 0
+    if filename.endswith(".gz"):
+        fout = gzip.open(filename, "wt", encoding="utf-8")
+    else:
+        fout = open(filename, "wt", encoding="utf-8")
+
+    with fout:
+        for _, raw_string in simulator.lines(duration):
+            fout.write(raw_string + "\n")
+            count += 1
+
+    print("Wrote {} lines.".format(count))
+
+
+@user_cli.command("benchmark")
+@click.option("--messages", default=500000, help="Number of messages")
+@click.option("--rate", default=0, help="Messages per second (0: as fast as possible)")
+@click.option("--aircraft", default=200, help="Number of simulated aircraft")
+@click.option("--receivers", default=100, help="Number of simulated receivers")
+@click.option("--streaming", is_flag=True, help="Benchmark the streaming mode")
+@click.option("--flush_interval", default=20, help="Seconds between the flushes")
+@click.option("--transfer_interval", default=30, help="Seconds between the transfers")
+def benchmark(messages=500000, rate=0, aircraft=200, receivers=100, streaming=False, flush_interval=20, transfer_interval=30):
+    """Push synthetic APRS traffic through the gateway pipeline and report the throughput. The beacons are written into the configured database!"""
+
+    # the lines are generated in advance, so the generator doesn't slow down the benchmark
+    simulator = TrafficSimulator(aircraft_count=aircraft, receiver_count=receivers)
+    lines = []
+    for line in simulator.lines(24 * 3600):
+        lines.append(line)
+        if len(lines) >= messages:
+            break
+    print("Generated {} lines ({} simulated seconds).".format(len(lines), (lines[-1][0] - lines[0][0]).total_seconds() if lines else 0))
+
+    # own staging tables (dropped at the end): the benchmark must not interfere with a running gateway
+    saver = ContinuousDbFeeder(streaming=streaming, worker="benchmark")
+    try:
+        result = run_benchmark(saver, lines, rate=rate, flush_interval=flush_interval, transfer_interval=transfer_interval)
+    finally:
+        saver.close(drop=True)
+
+    for line in format_report(result):
+        print(line)
+
+
+@user_cli.command("replay_server")
+@click.argument("filename")
+@click.option("--host", default="localhost", help="Listen address")
+@click.option("--port", default=10152, help="Listen port")
+@click.option("--speed", default=1.0, help="Speed-up factor (1: real time)")
+@click.option("--loop", is_flag=True, help="Start again at the end of the file")
+@click.option("--rewrite_timestamps", is_flag=True, help="Set the timestamps of the beacons to the send time")
+@click.option("--disconnect_interval", default=0, help="Disconnect all clients every ... seconds (0: never)")
+@click.option("--stall_interval", default=0, help="Stop sending every ... seconds (0: never)")
+@click.option("--stall_duration", default=0, help="Duration of the stalls in seconds")
+def replay_server(filename, host="localhost", port=10152, speed=1.0, loop=False, rewrite_timestamps=False, disconnect_interval=0, stall_interval=0, stall_duration=0):
+    """Serve an APRS log file (e.g. OGN_log.txt_2016-09-21.gz) like an APRS-IS server. Set APRS_SERVER_HOST and APRS_SERVER_PORT to connect the gateway."""
+
+    server = ReplayServer(
+        filename,
+        speed=speed,
+        loop=loop,
+        rewrite_timestamps=rewrite_timestamps,
+        disconnect_interval=disconnect_interval,
+        stall_interval=stall_interval,
+        stall_duration=stall_duration,
+    )
+    server.run(host, port)
@@ -5,6 +5,36 @@ SECRET_KEY = "i-like-ogn"
 SQLALCHEMY_DATABASE_URI = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql://postgres@localhost:5432/ogn")
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# Elevation grid for AGL computation in the gateway (create it with "flask export elevation <path>").
+# If not set, the AGL is computed with the 'elevation' raster table in the database.
+ELEVATION_GRID_PATH = os.environ.get("ELEVATION_GRID_PATH")
+
+# Directory for the spool of the gateway: received lines are written there before they are queued or parsed and replayed after a crash.
+# If not set, the gateway runs without spool.
+SPOOL_PATH = os.environ.get("SPOOL_PATH")
+
+# Beacon types (comma separated, e.g. "flarm,aprs_aircraft") the gateway imports or skips. Other lines are dropped before parsing.
+GATEWAY_INCLUDE_BEACON_TYPES = os.environ.get("GATEWAY_INCLUDE_BEACON_TYPES")
+GATEWAY_EXCLUDE_BEACON_TYPES = os.environ.get("GATEWAY_EXCLUDE_BEACON_TYPES")
+
+# File for the lines the gateway can't parse (rotated and gzip compressed). Replay it with "flask gateway replay_dead_letters".
+DEAD_LETTER_FILE = os.environ.get("DEAD_LETTER_FILE")
+
+# APRS filters (separated by ';', e.g. "r/48/10/1500;r/-30/140/3000") for "flask gateway run": one worker process per filter.
+GATEWAY_WORKER_FILTERS = os.environ.get("GATEWAY_WORKER_FILTERS")
+
+# APRS server of the gateway (e.g. "localhost" for a "flask gateway replay_server"). If not set, the gateway connects to aprs.glidernet.org.
+APRS_SERVER_HOST = os.environ.get("APRS_SERVER_HOST")
+APRS_SERVER_PORT = os.environ.get("APRS_SERVER_PORT")
+
+# Storage of the aircraft beacons: "beacons" (default, table aircraft_beacons with one row per reception) or "normalized"
+# (table positions with one row per device and timestamp and the narrow table receptions). The collectors query the selected layout.
+BEACON_LAYOUT = os.environ.get("BEACON_LAYOUT", "beacons")
+
+# Metrics of the gateway in the Prometheus text format: served on http://localhost:<METRICS_PORT>/metrics and/or written every 15s into METRICS_FILE.
+METRICS_PORT = os.environ.get("METRICS_PORT")
+METRICS_FILE = os.environ.get("METRICS_FILE")
+
 # Flask-Cache stuff
 CACHE_TYPE = "simple"
 CACHE_DEFAULT_TIMEOUT = 300
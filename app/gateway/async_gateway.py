@@ -0,0 +1,234 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+from ogn.client import settings
+from ogn.client.client import create_aprs_login
+
+from app.gateway.metrics import metrics
+from app.gateway.flush_scheduler import FlushScheduler
+from app.gateway.spill_queue import SpillQueue
+
+from app import app
+
+
+class AsyncGateway:
+    """APRS gateway with separated reading, parsing and writing.
+
+       The reader coroutine writes the received lines into the spool of the feeder (if any) and puts them into a queue. The parser task drains the queue into the feeder buffers
+       and the writer task writes the buffered beacons with a single worker thread. The reader never waits: above queue_size lines
+       the queue spills into a temporary file. The writes are scheduled by the FlushScheduler: if the feeder has max_buffered
+       unwritten beacons (or max_bytes) the parser waits for the writer, else the beacons are written after flush_interval seconds."""
+
+    def __init__(self, saver, aprs_user, aprs_filter="", queue_size=10000, max_buffered=50000, max_bytes=16 * 1024 * 1024, flush_interval=20, transfer_interval=30, stats_interval=60):
+        self.saver = saver
+        self.aprs_user = aprs_user
+        self.aprs_filter = aprs_filter
+
+        self.queue_size = queue_size
+        self.max_buffered = max_buffered
+        self.flush_interval = flush_interval
+        self.transfer_interval = transfer_interval
+        self.stats_interval = stats_interval
+
+        self.scheduler = FlushScheduler(max_rows=max_buffered, max_bytes=max_bytes, max_latency=flush_interval, transfer_interval=transfer_interval)
+
+        self.queue = SpillQueue(memory_limit=queue_size)
+        self.available = None
+        self.flush_requested = None
+        self.written = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        # receive time (monotonic) of the oldest beacon in the feeder buffers
+        self.oldest_buffered = None
+
+        self.stats = {"received": 0, "parsed": 0, "written": 0, "max_queue_size": 0, "parse_lag": 0.0, "write_lag": 0.0, "write_time": 0.0, "backpressure_time": 0.0}
+
+    def run(self):
+        """Run until KeyboardInterrupt. Remaining lines and beacons are written before returning."""
+
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            app.logger.warning("\nStop ogn gateway")
+        finally:
+            self.executor.shutdown(wait=True)
+            self.shutdown()
+
+    async def main(self):
+        self.available = asyncio.Event()
+        self.flush_requested = asyncio.Event()
+        self.written = asyncio.Event()
+        metrics.add_collector(self.collect_metrics)
+
+        await asyncio.gather(self.read_lines(), self.parse_lines(), self.write_batches(), self.log_stats())
+
+    async def read_lines(self):
+        """Read lines from the APRS server into the queue. Sends keepalives and reconnects on connection errors."""
+
+        port = settings.APRS_SERVER_PORT_CLIENT_DEFINED_FILTERS if self.aprs_filter else settings.APRS_SERVER_PORT_FULL_FEED
+        login = create_aprs_login(self.aprs_user, -1, settings.APRS_APP_NAME, settings.APRS_APP_VER, self.aprs_filter)
+
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.open_connection(settings.APRS_SERVER_HOST, port)
+                writer.write(login.encode())
+                await writer.drain()
+                app.logger.info("Connected to {}:{}".format(settings.APRS_SERVER_HOST, port))
+
+                while True:
+                    try:
+                        line = await asyncio.wait_for(reader.readline(), timeout=settings.APRS_KEEPALIVE_TIME)
+                    except asyncio.TimeoutError:
+                        writer.write("#keepalive\n".encode())
+                        await writer.drain()
+                        continue
+
+                    if len(line) == 0:
+                        app.logger.warning("Connection closed by server")
+                        break
+
+                    self.stats["received"] += 1
+                    if self.saver.spool is not None:
+                        # the line is durable before it is queued (or spilled)
+                        self.saver.spool.append(line.decode("utf-8", errors="replace").strip())
+                    self.queue.put(monotonic(), line)
+                    self.available.set()
+            except (ConnectionError, OSError):
+                app.logger.error("Connection error", exc_info=True)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            await asyncio.sleep(1)
+
+    async def parse_lines(self):
+        """Parse the queued lines into the feeder buffers."""
+
+        count = 0
+        while True:
+            if self.scheduler.flush_reason(monotonic()) == "size":
+                # backpressure: wait until the writer took the buffered beacons
+                start = monotonic()
+                self.written.clear()
+                self.flush_requested.set()
+                await self.written.wait()
+                self.stats["backpressure_time"] += monotonic() - start
+
+            item = self.queue.get()
+            if item is None:
+                self.available.clear()
+                await self.available.wait()
+                continue
+
+            received, line = item
+            self.stats["max_queue_size"] = max(self.stats["max_queue_size"], len(self.queue) + 1)
+
+            raw_string = line.decode("utf-8", errors="replace").strip()
+            if self.saver.parse(raw_string, spooled=True) is not None:
+                now = monotonic()
+                self.scheduler.record(len(line), now)
+                self.stats["parsed"] += 1
+                if self.oldest_buffered is None:
+                    self.oldest_buffered = received
+                self.stats["parse_lag"] = now - received
+
+            # the queue may be long (spilled lines), let the reader and the writer run
+            count += 1
+            if count % 1000 == 0:
+                await asyncio.sleep(0)
+
+    async def write_batches(self):
+        """Write the buffered beacons when the scheduler says so (or earlier if the parser requests it)."""
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+            timeout = self.scheduler.time_to_flush(monotonic())
+            try:
+                await asyncio.wait_for(self.flush_requested.wait(), timeout=self.flush_interval if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            # on backpressure we take all buffered beacons, even if they could still be merged with a second part
+            complete = self.flush_requested.is_set()
+            self.flush_requested.clear()
+
+            now = monotonic()
+            if not complete and self.scheduler.flush_reason(now) is None:
+                # nothing to write (quiet period)
+                continue
+
+            oldest_buffered = self.oldest_buffered
+            self.oldest_buffered = None
+            aircraft_messages, receiver_messages = self.saver.take_batch(complete=complete)
+            self.scheduler.flushed(now, remaining=self.saver.buffered_count())
+
+            do_transfer = self.scheduler.should_transfer(now)
+            if do_transfer:
+                self.scheduler.transferred(now)
+
+            start = monotonic()
+            await loop.run_in_executor(self.executor, self.write, aircraft_messages, receiver_messages, do_transfer)
+            self.stats["write_time"] = monotonic() - start
+            self.stats["written"] += len(aircraft_messages) + len(receiver_messages)
+            if oldest_buffered is not None:
+                self.stats["write_lag"] = monotonic() - oldest_buffered
+
+            self.written.set()
+
+    def write(self, aircraft_messages, receiver_messages, do_transfer):
+        """Runs in the worker thread."""
+
+        with app.app_context():
+            self.saver.write_batch(aircraft_messages, receiver_messages)
+            self.saver.prepare()
+
+            if do_transfer:
+                self.saver.transfer()
+
+    def collect_metrics(self):
+        yield "ogn_gateway_queue_size", {}, len(self.queue)
+        yield "ogn_gateway_spilled_lines_total", {}, self.queue.spilled_total
+
+    async def log_stats(self):
+        last_received = 0
+        while True:
+            await asyncio.sleep(self.stats_interval)
+
+            received = self.stats["received"]
+            app.logger.info(
+                "Received: {} ({:.0f} msg/s), parsed: {}, written: {}, queue: {}/{} (max {}, spilled {}), buffered: {}, parse lag: {:.1f}s, write lag: {:.1f}s, write time: {:.1f}s, backpressure: {:.1f}s".format(
+                    received,
+                    (received - last_received) / self.stats_interval,
+                    self.stats["parsed"],
+                    self.stats["written"],
+                    len(self.queue),
+                    self.queue_size,
+                    self.stats["max_queue_size"],
+                    self.queue.spilled_total,
+                    self.saver.buffered_count(),
+                    self.stats["parse_lag"],
+                    self.stats["write_lag"],
+                    self.stats["write_time"],
+                    self.stats["backpressure_time"],
+                )
+            )
+            last_received = received
+            self.stats["max_queue_size"] = 0
+
+    def shutdown(self):
+        """Parse the lines left in the queue and transfer all buffered beacons."""
+
+        metrics.remove_collector(self.collect_metrics)
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self.saver.parse(item[1].decode("utf-8", errors="replace").strip(), spooled=True)
+        self.queue.close()
+
+        with app.app_context():
+            self.saver.finish()
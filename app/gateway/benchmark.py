@@ -0,0 +1,95 @@
+from time import monotonic, sleep
+
+
+def percentile(values, p):
+    """Nearest-rank percentile (p in 0..100) of the values, None for an empty list."""
+
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    index = max(int(round(p / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def run_benchmark(saver, lines, rate=0, flush_interval=20, transfer_interval=30):
+    """Feed the (timestamp, raw_string) lines into the saver with rate messages per second (0: as fast as possible).
+
+       The saver is flushed and prepared every flush_interval seconds and transfered every transfer_interval seconds like in the gateway.
+       Returns a dict with the number of messages, the elapsed time, the latencies of the flushes/transfers and the stage times of the saver."""
+
+    parse_time = 0.0
+    flush_latencies = []
+    transfer_latencies = []
+
+    start = monotonic()
+    last_flush = last_transfer = start
+    count = 0
+    for timestamp, raw_string in lines:
+        if rate > 0:
+            delay = start + count / rate - monotonic()
+            if delay > 0.001:
+                sleep(delay)
+
+        before = monotonic()
+        saver.parse(raw_string, reference_date=timestamp)
+        now = monotonic()
+        parse_time += now - before
+        count += 1
+
+        if now - last_flush >= flush_interval:
+            saver.flush(complete=False)
+            saver.prepare()
+            last_flush = monotonic()
+            flush_latencies.append(last_flush - now)
+
+        if now - last_transfer >= transfer_interval:
+            before = monotonic()
+            saver.transfer()
+            last_transfer = monotonic()
+            transfer_latencies.append(last_transfer - before)
+
+    before = monotonic()
+    saver.finish()
+    finish_latency = monotonic() - before
+
+    elapsed = monotonic() - start
+
+    return {
+        "messages": count,
+        "elapsed": elapsed,
+        "rate": count / elapsed if elapsed > 0 else 0.0,
+        "parse_time": parse_time,
+        "flush_latencies": flush_latencies,
+        "transfer_latencies": transfer_latencies,
+        "finish_latency": finish_latency,
+        "stage_times": dict(getattr(saver, "stage_times", {})),
+        "stage_counts": dict(getattr(saver, "stage_counts", {})),
+    }
+
+
+def format_latencies(latencies):
+    if not latencies:
+        return "-"
+
+    return "n={} p50={:.3f}s p90={:.3f}s p99={:.3f}s max={:.3f}s".format(len(latencies), percentile(latencies, 50), percentile(latencies, 90), percentile(latencies, 99), max(latencies))
+
+
+def format_report(result):
+    """Returns the benchmark result as list of text lines."""
+
+    lines = [
+        "Messages:  {} in {:.1f}s ({:.0f} msgs/s)".format(result["messages"], result["elapsed"], result["rate"]),
+        "Parsing:   {:.1f}s ({:.1f} us/msg)".format(result["parse_time"], 1e6 * result["parse_time"] / result["messages"] if result["messages"] else 0.0),
+        "Flush:     {}".format(format_latencies(result["flush_latencies"])),
+        "Transfer:  {}".format(format_latencies(result["transfer_latencies"])),
+        "Finish:    {:.3f}s".format(result["finish_latency"]),
+    ]
+
+    if result["stage_times"]:
+        lines.append("Stages:")
+        for stage, seconds in sorted(result["stage_times"].items(), key=lambda x: -x[1]):
+            count = result["stage_counts"].get(stage, 0)
+            lines.append("  {:<10} {:8.3f}s  {:6d} calls  {:8.1f} ms/call".format(stage, seconds, count, 1000 * seconds / count if count else 0.0))
+
+    return lines
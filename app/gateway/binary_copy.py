@@ -0,0 +1,132 @@
+import struct
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from geoalchemy2.types import Geometry
+from sqlalchemy import Boolean, DateTime, Float, Integer, SmallInteger, String
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+
+POSTGRES_EPOCH = datetime(2000, 1, 1)
+NULL = struct.pack("!i", -1)
+
+# EWKB point (little endian) with SRID 4326: byte order, type with SRID flag, srid, x, y
+EWKB_POINT = struct.Struct("<BIIdd")
+EWKB_POINT_TYPE = 0x20000001
+
+
+def encode_smallint(value):
+    return struct.pack("!ih", 2, int(value))
+
+
+def encode_integer(value):
+    return struct.pack("!ii", 4, int(value))
+
+
+def encode_real(value):
+    return struct.pack("!if", 4, value)
+
+
+def encode_double(value):
+    return struct.pack("!id", 8, value)
+
+
+def encode_boolean(value):
+    return b"\x00\x00\x00\x01\x01" if value else b"\x00\x00\x00\x01\x00"
+
+
+def encode_string(value):
+    data = str(value).encode("utf-8")
+    return struct.pack("!i", len(data)) + data
+
+
+def encode_timestamp(value):
+    return struct.pack("!iq", 8, (value - POSTGRES_EPOCH) // timedelta(microseconds=1))
+
+
+def encode_point(longitude, latitude):
+    return struct.pack("!i", EWKB_POINT.size) + EWKB_POINT.pack(1, EWKB_POINT_TYPE, 4326, longitude, latitude)
+
+
+def get_value_encoder(column_type):
+    if isinstance(column_type, SmallInteger):
+        return encode_smallint
+    elif isinstance(column_type, Integer):
+        return encode_integer
+    elif isinstance(column_type, Float):
+        # FLOAT(p) with p <= 24 is a REAL in PostgreSQL
+        return encode_real if column_type.precision is not None and column_type.precision <= 24 else encode_double
+    elif isinstance(column_type, Boolean):
+        return encode_boolean
+    elif isinstance(column_type, String):
+        return encode_string
+    elif isinstance(column_type, DateTime):
+        return encode_timestamp
+    else:
+        raise TypeError("Binary COPY encoding of {} is not supported".format(column_type))
+
+
+class BinaryCopyEncoder:
+    """Encodes beacons (dicts or records) into the PostgreSQL binary COPY format. The encoding of each field is given by the column types of the table.
+
+       Geometry columns are taken from the 'longitude' and 'latitude' fields of the message (of a record: the tuple (longitude, latitude))."""
+
+    def __init__(self, table, fields):
+        self.fields = fields
+        self.field_count = struct.pack("!h", len(fields))
+
+        self.encoders = []
+        for field in fields:
+            column_type = table.columns[field].type
+            if isinstance(column_type, Geometry):
+                self.encoders.append((field, None))
+            else:
+                self.encoders.append((field, get_value_encoder(column_type)))
+
+    def encode_row(self, message):
+        parts = [self.field_count]
+        for field, encoder in self.encoders:
+            if encoder is None:
+                if "latitude" in message:
+                    parts.append(encode_point(message["longitude"], message["latitude"]))
+                else:
+                    parts.append(NULL)
+            else:
+                value = message.get(field)
+                parts.append(NULL if value is None else encoder(value))
+
+        return b"".join(parts)
+
+    def encode_rows(self, messages):
+        """Returns the encoded rows without header and trailer (e.g. to concatenate blocks from worker processes)."""
+
+        return b"".join([self.encode_row(message) for message in messages])
+
+    def encode_record(self, record):
+        """Encode a record (see app.gateway.records) with the fields of the encoder in the same order."""
+
+        parts = [self.field_count]
+        for (field, encoder), value in zip(self.encoders, record):
+            if value is None:
+                parts.append(NULL)
+            elif encoder is None:
+                parts.append(encode_point(*value))
+            else:
+                parts.append(encoder(value))
+
+        return b"".join(parts)
+
+    def encode_records(self, records):
+        return b"".join([self.encode_record(record) for record in records])
+
+    def copy(self, cursor, table_name, rows):
+        """COPY the encoded rows into the table."""
+
+        buffer = BytesIO()
+        buffer.write(PGCOPY_HEADER)
+        buffer.write(rows)
+        buffer.write(PGCOPY_TRAILER)
+        buffer.seek(0)
+
+        cursor.copy_expert('COPY "{}" ({}) FROM STDIN WITH (FORMAT BINARY)'.format(table_name, ", ".join(self.fields)), buffer)
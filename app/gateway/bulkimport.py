@@ -1,16 +1,33 @@
-from datetime import datetime, timedelta
-from io import StringIO
+import itertools
+import os
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from io import BytesIO
+from time import monotonic
 
 from flask.cli import AppGroup
 import click
 from tqdm import tqdm
-from mgrs import MGRS
 
-from ogn.parser import parse, ParseError
+from ogn.parser import parse
 
-from app.model import AircraftBeacon, ReceiverBeacon, Location
+from app.model import AircraftBeacon, ReceiverBeacon, ImportCheckpoint
 from app.utils import open_file
 from app.gateway.process_tools import *
+from app.gateway.resolver import IdResolver
+from app.gateway.geodesy import ReceiverLocations, add_distances
+from app.gateway.elevation import ElevationGrid, add_agl
+from app.gateway.mgrs_cache import MgrsEncoder
+from app.gateway.merger import BeaconMerger
+from app.gateway.binary_copy import BinaryCopyEncoder
+from app.gateway.records import make_record_type
+from app.gateway.connection import FeederConnection
+from app.gateway.prefilter import PreFilter
+from app.gateway.parse_errors import ParseErrorLog
+from app.gateway.reception_cache import ReceptionCache, get_reception
+from app.gateway.metrics import metrics, ROWS_BUCKETS
+from app.gateway.flush_scheduler import FlushScheduler
 
 from app import db
 from app import app
@@ -22,6 +39,7 @@ user_cli.help = "Tools for accelerated data import."
 # define message types we want to proceed
 AIRCRAFT_BEACON_TYPES = ["aprs_aircraft", "flarm", "tracker", "fanet", "lt24", "naviter", "skylines", "spider", "spot", "flymaster"]
 RECEIVER_BEACON_TYPES = ["aprs_receiver", "receiver"]
+IMPORTED_BEACON_TYPES = frozenset(AIRCRAFT_BEACON_TYPES + RECEIVER_BEACON_TYPES)
 
 # define fields we want to proceed
 BEACON_KEY_FIELDS = ["name", "receiver_name", "timestamp"]
@@ -81,39 +99,47 @@ RECEIVER_BEACON_FIELDS = [
     "good_and_bad_senders",
 ]
 
+aircraft_beacon_encoder = BinaryCopyEncoder(AircraftBeacon.__table__, BEACON_KEY_FIELDS + AIRCRAFT_BEACON_FIELDS)
+receiver_beacon_encoder = BinaryCopyEncoder(ReceiverBeacon.__table__, BEACON_KEY_FIELDS + RECEIVER_BEACON_FIELDS)
 
-myMGRS = MGRS()
+# compact records for the file import (same field order as the encoders)
+AircraftBeaconRecord = make_record_type("AircraftBeaconRecord", BEACON_KEY_FIELDS + AIRCRAFT_BEACON_FIELDS)
+ReceiverBeaconRecord = make_record_type("ReceiverBeaconRecord", BEACON_KEY_FIELDS + RECEIVER_BEACON_FIELDS)
+
+
+mgrs_encoder = MgrsEncoder()
+
+# parse errors are counted and logged as summary
+parse_errors = ParseErrorLog()
+
+# the receptions of an aircraft beacon by other receivers are not parsed again
+reception_cache = ReceptionCache()
+
+# elevation grid for the agl of the file import, see get_elevation_grid()
+elevation_grid = None
 
 
 def string_to_message(raw_string, reference_date):
     global receivers
 
+    reception = get_reception(raw_string)
+    if reception is not None:
+        message = reception_cache.get(reception, raw_string, reference_date)
+        if message is not None:
+            return message
+
     try:
         message = parse(raw_string, reference_date)
-    except NotImplementedError as e:
-        app.logger.error("No parser implemented for message: {}".format(raw_string))
-        return None
-    except ParseError as e:
-        app.logger.error("Parsing error with message: {}".format(raw_string))
-        return None
-    except TypeError as e:
-        app.logger.error("TypeError with message: {}".format(raw_string))
-        return None
     except Exception as e:
-        app.logger.error("Other Exception with string: {}".format(raw_string))
+        # NotImplementedError (no parser implemented), ParseError, TypeError, ...
+        parse_errors.record(raw_string, e, reference_date)
         return None
 
     # update reference receivers and distance to the receiver
     if message["aprs_type"] == "position":
-        if message["beacon_type"] in AIRCRAFT_BEACON_TYPES + RECEIVER_BEACON_TYPES:
-            latitude = message["latitude"]
-            longitude = message["longitude"]
-
-            location = Location(longitude, latitude)
-            message["location"] = location.to_wkt()
-            location_mgrs = myMGRS.toMGRS(latitude, longitude).decode("utf-8")
-            message["location_mgrs"] = location_mgrs
-            message["location_mgrs_short"] = location_mgrs[0:5] + location_mgrs[5:7] + location_mgrs[10:12]
+        if message["beacon_type"] in IMPORTED_BEACON_TYPES:
+            # the binary COPY takes the location from longitude and latitude
+            message["location_mgrs"], message["location_mgrs_short"] = mgrs_encoder.encode(message["latitude"], message["longitude"])
 
         if message["beacon_type"] in AIRCRAFT_BEACON_TYPES and "gps_quality" in message:
             if message["gps_quality"] is not None and "horizontal" in message["gps_quality"]:
@@ -129,124 +155,456 @@ def string_to_message(raw_string, reference_date):
     if "good_and_bad_senders" in message and message["good_and_bad_senders"] is not None:
         message["good_and_bad_senders"] = int(message["good_and_bad_senders"])
 
+    if reception is not None and message["aprs_type"] == "position" and message.get("beacon_type") in AIRCRAFT_BEACON_TYPES:
+        reception_cache.add(reception, message)
+
     return message
 
 
-class ContinuousDbFeeder:
-    def __init__(self,):
-        self.postfix = "continuous_import"
-        self.last_flush = datetime.utcnow()
-        self.last_add_missing = datetime.utcnow()
-        self.last_transfer = datetime.utcnow()
+def get_elevation_grid():
+    """Returns the ElevationGrid of ELEVATION_GRID_PATH (opened once per process, e.g. in the workers of the file import) or None."""
 
-        self.aircraft_buffer = StringIO()
-        self.receiver_buffer = StringIO()
+    global elevation_grid
 
-        create_tables(self.postfix)
-        create_indices(self.postfix)
+    if elevation_grid is None and app.config.get("ELEVATION_GRID_PATH"):
+        elevation_grid = ElevationGrid(app.config["ELEVATION_GRID_PATH"])
 
-    def add(self, raw_string):
-        message = string_to_message(raw_string, reference_date=datetime.utcnow())
+    return elevation_grid
+
+
+def convert_records(lines, reference_date, elevation_grid=None):
+    """Parse raw APRS lines and return the records (aircraft_records, receiver_records).
+       The parsed aircraft beacons are kept until the end of the lines, with an elevation grid they get their agl."""
+
+    prefilter = PreFilter(include=AIRCRAFT_BEACON_TYPES + RECEIVER_BEACON_TYPES)
+
+    aircraft_messages = []
+    receiver_records = []
+    for line in lines:
+        line = line.strip()
+        if not prefilter.accept(line):
+            continue
+
+        message = string_to_message(line, reference_date=reference_date)
 
         if message is None or ("raw_message" in message and message["raw_message"][0] == "#") or "beacon_type" not in message:
-            return
+            continue
 
         if message["beacon_type"] in AIRCRAFT_BEACON_TYPES:
-            complete_message = ",".join([str(message[k]) if k in message and message[k] is not None else "\\N" for k in BEACON_KEY_FIELDS + AIRCRAFT_BEACON_FIELDS])
-            self.aircraft_buffer.write(complete_message)
-            self.aircraft_buffer.write("\n")
+            aircraft_messages.append(message)
         elif message["beacon_type"] in RECEIVER_BEACON_TYPES:
-            complete_message = ",".join([str(message[k]) if k in message and message[k] is not None else "\\N" for k in BEACON_KEY_FIELDS + RECEIVER_BEACON_FIELDS])
-            self.receiver_buffer.write(complete_message)
-            self.receiver_buffer.write("\n")
-        else:
-            app.logger.error("Ignore beacon_type: {}".format(message["beacon_type"]))
-            return
+            receiver_records.append(ReceiverBeaconRecord.from_message(message))
 
-        if datetime.utcnow() - self.last_flush >= timedelta(seconds=20):
-            self.flush()
-            self.prepare()
+    if elevation_grid is not None:
+        add_agl(aircraft_messages, elevation_grid)
 
-            self.aircraft_buffer = StringIO()
-            self.receiver_buffer = StringIO()
+    return [AircraftBeaconRecord.from_message(message) for message in aircraft_messages], receiver_records
 
-            self.last_flush = datetime.utcnow()
 
-        if datetime.utcnow() - self.last_add_missing >= timedelta(seconds=60):
-            self.add_missing()
-            self.last_add_missing = datetime.utcnow()
+def convert_lines(lines, reference_date):
+    """Parse a chunk of raw APRS lines and return the binary COPY rows for aircraft and receiver beacons.
+       This function runs in the worker processes of the parallel file import."""
 
-        if datetime.utcnow() - self.last_transfer >= timedelta(seconds=30):
-            self.transfer()
-            self.delete_beacons()
-            self.last_transfer = datetime.utcnow()
+    aircraft_records, receiver_records = convert_records(lines, reference_date, elevation_grid=get_elevation_grid())
 
-    def flush(self):
-        self.aircraft_buffer.seek(0)
-        self.receiver_buffer.seek(0)
+    return aircraft_beacon_encoder.encode_records(aircraft_records), receiver_beacon_encoder.encode_records(receiver_records)
 
-        connection = db.engine.raw_connection()
-        cursor = connection.cursor()
-        cursor.copy_from(self.aircraft_buffer, "aircraft_beacons_{0}".format(self.postfix), sep=",", columns=BEACON_KEY_FIELDS + AIRCRAFT_BEACON_FIELDS)
-        cursor.copy_from(self.receiver_buffer, "receiver_beacons_{0}".format(self.postfix), sep=",", columns=BEACON_KEY_FIELDS + RECEIVER_BEACON_FIELDS)
-        connection.commit()
 
-        self.aircraft_buffer = StringIO()
-        self.receiver_buffer = StringIO()
+class ContinuousDbFeeder:
+    """Writes the beacons of the APRS stream into the database.
 
-    def add_missing(self):
-        add_missing_receivers(self.postfix)
-        add_missing_devices(self.postfix)
+       Default mode: the beacons are copied into staging tables and transfered into the final tables every 30s.
+       Streaming mode: the beacons are copied into temporary tables (not WAL-logged, emptied with each commit) and inserted into the final
+       tables within the same transaction. There are no staging tables, no UPDATE and no DELETE.
 
-    def prepare(self):
-        # make receivers complete
-        update_receiver_beacons(self.postfix)
-        update_receiver_location(self.postfix)
+       All writes go through one long-lived connection with prepared statements. The staging tables have a sequence column 'import_seq'
+       and the feeder keeps watermarks (last copied and last prepared import_seq per table), so prepare and transfer only touch new rows."""
 
-        # make devices complete
-        update_aircraft_beacons(self.postfix)
+    def __init__(self, streaming=False, spool=None, include=None, exclude=None, worker=None, partition=None):
+        """include/exclude: beacon types which are (not) imported, the other lines are dropped by the prefilter without parsing.
+           worker: index of the gateway worker process or name of a one-off feeder (e.g. "replay"), each worker has its own staging tables.
+           partition: (index, count), only the lines of the receivers in this hash partition are imported."""
 
-    def transfer(self):
-        # tranfer beacons
-        transfer_aircraft_beacons(self.postfix)
-        transfer_receiver_beacons(self.postfix)
+        self.streaming = streaming
+        self.spool = spool
+        self.prefilter = PreFilter(include=include or AIRCRAFT_BEACON_TYPES + RECEIVER_BEACON_TYPES, exclude=exclude, partition=partition)
 
-    def delete_beacons(self):
-        # delete already transfered beacons
-        delete_receiver_beacons(self.postfix)
-        delete_aircraft_beacons(self.postfix)
+        # aircraft beacons are written into 'positions' and 'receptions' instead of 'aircraft_beacons'
+        self.normalized = app.config.get("BEACON_LAYOUT") == "normalized"
 
+        # spool marks: lines before pending_mark may still be in the mergers, lines before flushed_mark are written to the database
+        self.pending_mark = None
+        self.flushed_mark = None
 
-class FileDbFeeder:
-    def __init__(self):
-        self.postfix = "continuous_import"
-        self.last_flush = datetime.utcnow()
+        # number of spooled lines which went through parse()
+        self.processed_lines = 0
+
+        self.postfix = "streaming" if streaming else "continuous_import"
+        if worker is not None:
+            self.postfix += "_{}".format(worker)
 
-        self.aircraft_buffer = StringIO()
-        self.receiver_buffer = StringIO()
+        # add() schedules the flushes and transfers, the reference date for the parser is updated once per second
+        self.scheduler = FlushScheduler()
+        self.reference_date = datetime.utcnow()
+        self.reference_tick = monotonic()
 
-        create_tables(self.postfix)
-        create_indices(self.postfix)
+        # parsed beacons, the split position and status beacons are merged before they get their ids, distances etc. batchwise with the next flush
+        self.aircraft_merger = BeaconMerger()
+        self.receiver_merger = BeaconMerger()
+
+        self.resolver = IdResolver()
+        self.receiver_locations = ReceiverLocations()
+        self.receiver_locations.load(db.session)
+
+        if app.config.get("ELEVATION_GRID_PATH"):
+            self.elevation_grid = ElevationGrid(app.config["ELEVATION_GRID_PATH"])
+        else:
+            self.elevation_grid = None
+
+        if self.streaming:
+            self.connection = FeederConnection(setup_queries=[get_create_temp_tables_query(self.postfix)])
+        else:
+            self.connection = FeederConnection()
+            create_tables(self.postfix)
+            create_indices(self.postfix)
+            add_import_sequence(self.postfix)
+
+        # watermarks of the staging tables: rows with import_seq <= copied_seq are copied, rows with import_seq <= prepared_seq are ready for the transfer
+        self.copied_seq = {"aircraft_beacons": 0, "receiver_beacons": 0}
+        self.prepared_seq = {"aircraft_beacons": 0, "receiver_beacons": 0}
+
+        # accumulated seconds and number of calls per processing stage (ids, distances, agl, encode, copy, prepare, transfer)
+        self.stage_times = Counter()
+        self.stage_counts = Counter()
+
+        # parsed beacons by type and the timestamps of the written beacons which are not yet in the final tables (for the lag)
+        self.parsed = Counter()
+        self.written_timestamps = []
+        self.prepared_timestamps = []
+        metrics.add_collector(self.collect_metrics)
+
+    @contextmanager
+    def timed(self, stage):
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.stage_times[stage] += monotonic() - start
+            self.stage_counts[stage] += 1
 
     def add(self, raw_string):
-        message = string_to_message(raw_string, reference_date=datetime.utcnow())
+        now = monotonic()
+        if now - self.reference_tick >= 1:
+            self.reference_date = datetime.utcnow()
+            self.reference_tick = now
+
+        if self.parse(raw_string, reference_date=self.reference_date) is not None:
+            self.scheduler.record(len(raw_string), now)
+
+        reason = self.scheduler.flush_reason(now)
+        if reason is not None:
+            # a size triggered flush takes all buffered beacons, even if they could still be merged with a second part
+            self.flush(complete=(reason == "size"))
+            self.prepare()
+            self.scheduler.flushed(monotonic(), remaining=self.buffered_count())
+
+        if self.scheduler.should_transfer(now):
+            self.transfer()
+            self.scheduler.transferred(monotonic())
+
+    def parse(self, raw_string, reference_date=None, spooled=False):
+        """Parse the raw string and buffer the beacon. Returns the message or None if the beacon is not buffered as new beacon (dropped or merged).
+           If there is a spool the raw string is written into the spool before parsing (unless the reader already spooled it)."""
+
+        if self.spool is not None:
+            if not spooled:
+                self.spool.append(raw_string)
+            self.processed_lines += 1
+
+        if not self.prefilter.accept(raw_string):
+            return None
+
+        message = string_to_message(raw_string, reference_date=reference_date or datetime.utcnow())
 
         if message is None or ("raw_message" in message and message["raw_message"][0] == "#") or "beacon_type" not in message:
-            return
+            return None
+
+        if not self.prefilter.accept_message(message):
+            return None
 
         if message["beacon_type"] in AIRCRAFT_BEACON_TYPES:
-            complete_message = ",".join([str(message[k]) if k in message and message[k] is not None else "\\N" for k in BEACON_KEY_FIELDS + AIRCRAFT_BEACON_FIELDS])
-            self.aircraft_buffer.write(complete_message)
-            self.aircraft_buffer.write("\n")
+            self.parsed[message["beacon_type"]] += 1
+            return self.aircraft_merger.add(message)
         elif message["beacon_type"] in RECEIVER_BEACON_TYPES:
-            complete_message = ",".join([str(message[k]) if k in message and message[k] is not None else "\\N" for k in BEACON_KEY_FIELDS + RECEIVER_BEACON_FIELDS])
-            self.receiver_buffer.write(complete_message)
-            self.receiver_buffer.write("\n")
+            self.parsed[message["beacon_type"]] += 1
+            return self.receiver_merger.add(message)
         else:
             app.logger.error("Ignore beacon_type: {}".format(message["beacon_type"]))
+            return None
+
+    def buffered_count(self):
+        return len(self.aircraft_merger) + len(self.receiver_merger)
+
+    def take_batch(self, complete=False):
+        """Returns the merged beacons (aircraft_messages, receiver_messages) and removes them from the buffers.
+           Beacons which could still get their second part are kept unless complete is set."""
+
+        if self.spool is not None:
+            # lines which are spooled but still queued are not in this batch
+            mark = self.spool.mark(processed=self.processed_lines)
+            if complete:
+                self.flushed_mark = mark
+            else:
+                # the lines before the previous mark are older than the merger window, so they are in this batch
+                self.flushed_mark = self.pending_mark
+            self.pending_mark = mark
+
+        if complete:
+            return self.aircraft_merger.pop_all(), self.receiver_merger.pop_all()
+        else:
+            return self.aircraft_merger.pop_ready(), self.receiver_merger.pop_ready()
+
+    def set_ids(self, aircraft_messages, receiver_messages):
+        """Set receiver_id and device_id. Unknown receivers and devices are inserted."""
+
+        for message in receiver_messages:
+            message["receiver_id"] = self.resolver.get_receiver_id(message["name"])
+        for message in aircraft_messages:
+            message["receiver_id"] = self.resolver.get_receiver_id(message["receiver_name"])
+            message["device_id"] = self.resolver.get_device_id(message.get("address"))
+
+        if not self.resolver.has_missing():
             return
 
+        self.resolver.resolve()
+
+        for message in receiver_messages:
+            if message["receiver_id"] is None:
+                message["receiver_id"] = self.resolver.get_receiver_id(message["name"])
+        for message in aircraft_messages:
+            if message["receiver_id"] is None:
+                message["receiver_id"] = self.resolver.get_receiver_id(message["receiver_name"])
+            if message["device_id"] is None:
+                message["device_id"] = self.resolver.get_device_id(message.get("address"))
+
+    def set_distances(self, aircraft_messages, receiver_messages):
+        """Update the receiver locations and compute distance, radial and quality of the aircraft beacons."""
+
+        for message in receiver_messages:
+            if "latitude" in message:
+                self.receiver_locations.update(message["receiver_id"], message["longitude"], message["latitude"])
+
+        add_distances(aircraft_messages, self.receiver_locations)
+
+    def set_agl(self, aircraft_messages):
+        """Compute the altitude above ground level with the local elevation grid (if available)."""
+
+        if self.elevation_grid is not None:
+            add_agl(aircraft_messages, self.elevation_grid)
+
+    def flush(self, complete=True):
+        aircraft_messages, receiver_messages = self.take_batch(complete=complete)
+        self.write_batch(aircraft_messages, receiver_messages)
+
+    def write_batch(self, aircraft_messages, receiver_messages):
+        """Enrich the beacons and write them into the staging tables."""
+
+        with self.timed("ids"):
+            self.set_ids(aircraft_messages, receiver_messages)
+        with self.timed("distances"):
+            self.set_distances(aircraft_messages, receiver_messages)
+        with self.timed("agl"):
+            self.set_agl(aircraft_messages)
+
+        with self.timed("encode"):
+            aircraft_rows = aircraft_beacon_encoder.encode_rows(aircraft_messages)
+            receiver_rows = receiver_beacon_encoder.encode_rows(receiver_messages)
+
+        copied_seq = {}
+
+        def copy(connection):
+            cursor = connection.cursor()
+            aircraft_beacon_encoder.copy(cursor, "aircraft_beacons_{0}".format(self.postfix), aircraft_rows)
+            receiver_beacon_encoder.copy(cursor, "receiver_beacons_{0}".format(self.postfix), receiver_rows)
+            cursor.close()
+
+            if self.streaming:
+                # the temporary tables are only visible for this connection, so we do the rest of the processing here
+                connection.execute("update_receiver_location", get_update_receiver_location_query(self.postfix))
+                if self.elevation_grid is None:
+                    connection.execute("update_aircraft_beacons", get_update_aircraft_beacons_query(self.postfix))
+                connection.execute("transfer_aircraft_beacons", get_transfer_aircraft_beacons_query(self.postfix, merged=True, normalized=self.normalized))
+                connection.execute("transfer_receiver_beacons", get_transfer_receiver_beacons_query(self.postfix, merged=True))
+            else:
+                for table in ("aircraft_beacons", "receiver_beacons"):
+                    copied_seq[table] = connection.fetch_value("max_import_seq_{}".format(table), get_max_import_seq_query("{}_{}".format(table, self.postfix)))
+
+        with self.timed("copy"):
+            self.connection.run(copy)
+        self.copied_seq.update(copied_seq)
+
+        metrics.observe("ogn_gateway_copy_rows", len(aircraft_messages), buckets=ROWS_BUCKETS, table="aircraft_beacons")
+        metrics.observe("ogn_gateway_copy_rows", len(receiver_messages), buckets=ROWS_BUCKETS, table="receiver_beacons")
+
+        timestamps = [message["timestamp"] for message in itertools.chain(aircraft_messages, receiver_messages)]
+        if self.streaming:
+            self.observe_lag(timestamps)
+        else:
+            self.written_timestamps.extend(timestamps)
+
     def prepare(self):
+        if self.streaming:
+            return
+
+        aircraft_range = (self.prepared_seq["aircraft_beacons"], self.copied_seq["aircraft_beacons"])
+        receiver_range = (self.prepared_seq["receiver_beacons"], self.copied_seq["receiver_beacons"])
+
+        def prepare_beacons(connection):
+            # receiver_id and device_id are already set by the IdResolver
+            connection.execute("update_receiver_location", get_update_receiver_location_query(self.postfix, seq_range=True), receiver_range)
+
+            # compute agl if there is no local elevation grid (distance, radial and quality are already computed with the flush)
+            if self.elevation_grid is None:
+                connection.execute("update_aircraft_beacons", get_update_aircraft_beacons_query(self.postfix, seq_range=True), aircraft_range)
+
+        with self.timed("prepare"):
+            self.connection.run(prepare_beacons)
+        self.prepared_seq = dict(self.copied_seq)
+
+        self.prepared_timestamps.extend(self.written_timestamps)
+        self.written_timestamps = []
+
+    def transfer(self):
+        """Move the prepared beacons from the staging tables into the final tables. Then the written lines are removed from the spool."""
+
+        if not self.streaming:
+
+            def move_beacons(connection):
+                # the beacons are already merged
+                connection.execute("move_aircraft_beacons", get_move_aircraft_beacons_query(self.postfix, normalized=self.normalized), (self.prepared_seq["aircraft_beacons"],))
+                connection.execute("move_receiver_beacons", get_move_receiver_beacons_query(self.postfix), (self.prepared_seq["receiver_beacons"],))
+
+            with self.timed("transfer"):
+                self.connection.run(move_beacons)
+
+            self.observe_lag(self.prepared_timestamps)
+            self.prepared_timestamps = []
+
+        if self.spool is not None and self.flushed_mark is not None:
+            self.spool.acknowledge(self.flushed_mark)
+
+        app.logger.info("Prefilter: {}".format(self.prefilter.summary()))
+        parse_errors.log_summary_if_due()
+
+    def observe_lag(self, timestamps):
+        """Record the time between the beacon timestamps and now (the commit into the final tables)."""
+
+        now = datetime.utcnow()
+        metrics.observe_many("ogn_gateway_lag_seconds", [(now - timestamp).total_seconds() for timestamp in timestamps])
+
+    def collect_metrics(self):
+        for beacon_type, count in dict(self.prefilter.received).items():
+            yield "ogn_gateway_received_total", {"beacon_type": beacon_type}, count
+        for beacon_type, count in dict(self.parsed).items():
+            yield "ogn_gateway_parsed_total", {"beacon_type": beacon_type}, count
+        for beacon_type, count in dict(self.prefilter.skipped).items():
+            yield "ogn_gateway_dropped_total", {"beacon_type": beacon_type}, count
+        yield "ogn_gateway_parse_errors_total", {}, parse_errors.total
+        yield "ogn_gateway_reception_cache_total", {"result": "hit"}, reception_cache.hits
+        yield "ogn_gateway_reception_cache_total", {"result": "miss"}, reception_cache.misses
+        if self.prefilter.partition is not None:
+            yield "ogn_gateway_other_partitions_total", {}, self.prefilter.other_partitions
+
+        yield "ogn_gateway_buffered_beacons", {"table": "aircraft_beacons"}, len(self.aircraft_merger)
+        yield "ogn_gateway_buffered_beacons", {"table": "receiver_beacons"}, len(self.receiver_merger)
+
+        stage_counts = dict(self.stage_counts)
+        for stage, seconds in dict(self.stage_times).items():
+            yield "ogn_gateway_stage_seconds_sum", {"stage": stage}, seconds
+            yield "ogn_gateway_stage_seconds_count", {"stage": stage}, stage_counts.get(stage, 0)
+
+    def finish(self):
+        """Write all buffered beacons into the final tables."""
+
+        self.flush()
+        self.prepare()
+        self.transfer()
+
+    def close(self, drop=False):
+        """With drop the staging tables are dropped (for one-off feeders with their own worker postfix)."""
+
+        metrics.remove_collector(self.collect_metrics)
+        self.connection.close()
+        if self.spool is not None:
+            self.spool.close()
+        if drop and not self.streaming:
+            drop_tables(self.postfix)
+
+
+class FileDbFeeder:
+    def __init__(self, postfix="continuous_import", resume=False, bulk=False):
+        """With resume the tables of an interrupted import are kept.
+
+           Bulk mode: the tables are UNLOGGED and have no indices while the data is copied. prepare() analyzes the tables before the
+           rewrite queries, then builds the indices in parallel and makes the tables crash-safe (LOGGED) at the end.
+           Unlogged tables are emptied after a database crash, so a bulk import can't be resumed."""
+
+        self.postfix = postfix
+        self.bulk = bulk
+
+        self.aircraft_buffer = BytesIO()
+        self.receiver_buffer = BytesIO()
+
+        if not resume or bulk:
+            create_tables(self.postfix, unlogged=bulk)
+        if not bulk:
+            create_indices(self.postfix)
+
+    def add(self, raw_string, reference_date=None):
+        if reference_date is None:
+            reference_date = datetime.utcnow()
+
+        aircraft_records, receiver_records = convert_records([raw_string], reference_date, elevation_grid=get_elevation_grid())
+        self.add_records(aircraft_records, receiver_records)
+
+    def add_records(self, aircraft_records, receiver_records):
+        """Add AircraftBeaconRecords and ReceiverBeaconRecords."""
+
+        self.add_rows(aircraft_beacon_encoder.encode_records(aircraft_records), receiver_beacon_encoder.encode_records(receiver_records))
+
+    def add_rows(self, aircraft_rows, receiver_rows):
+        """Add already converted blocks of binary COPY rows (e.g. from a worker process)."""
+
+        self.aircraft_buffer.write(aircraft_rows)
+        self.receiver_buffer.write(receiver_rows)
+
+    def flush(self, checkpoint=None):
+        """Write the buffered beacons. The checkpoint (filename, offset, lines) is saved in the same transaction."""
+
+        connection = db.engine.raw_connection()
+        cursor = connection.cursor()
+        aircraft_beacon_encoder.copy(cursor, "aircraft_beacons_{0}".format(self.postfix), self.aircraft_buffer.getvalue())
+        receiver_beacon_encoder.copy(cursor, "receiver_beacons_{0}".format(self.postfix), self.receiver_buffer.getvalue())
+        if checkpoint is not None:
+            cursor.execute(
+                """
+                INSERT INTO import_checkpoints(filename, "offset", lines, finished, updated)
+                VALUES (%s, %s, %s, FALSE, NOW() AT TIME ZONE 'UTC')
+                ON CONFLICT (filename) DO UPDATE SET "offset" = EXCLUDED.offset, lines = EXCLUDED.lines, updated = EXCLUDED.updated;
+            """,
+                checkpoint,
+            )
+        connection.commit()
+        connection.close()
+
+        self.aircraft_buffer = BytesIO()
+        self.receiver_buffer = BytesIO()
+
+    def prepare(self):
+        if self.bulk:
+            # the planner needs statistics for the joins of the rewrite queries
+            analyze_tables(self.postfix)
+
         # make receivers complete
         add_missing_receivers(self.postfix)
         update_receiver_location(self.postfix)
@@ -255,9 +613,17 @@ class FileDbFeeder:
         add_missing_devices(self.postfix)
 
         # prepare beacons for transfer
-        create_indices(self.postfix)
-        update_receiver_beacons_bigdata(self.postfix)
-        update_aircraft_beacons_bigdata(self.postfix)
+        if self.bulk:
+            # the rewrite queries create new tables, so the indices are built afterwards
+            update_receiver_beacons_bigdata(self.postfix, unlogged=True)
+            update_aircraft_beacons_bigdata(self.postfix, unlogged=True, raster_agl=(get_elevation_grid() is None))
+            set_tables_logged(self.postfix)
+            create_indices_parallel(self.postfix)
+            analyze_tables(self.postfix)
+        else:
+            create_indices(self.postfix)
+            update_receiver_beacons_bigdata(self.postfix)
+            update_aircraft_beacons_bigdata(self.postfix, raster_agl=(get_elevation_grid() is None))
 
 
 def get_aircraft_beacons_postfixes():
@@ -272,7 +638,7 @@ def get_aircraft_beacons_postfixes():
     """
     ).fetchall()
 
-    return [postfix for postfix in postfixes]
+    return [postfix[0] for postfix in postfixes]
 
 
 def export_to_path(postfix):
@@ -286,99 +652,113 @@ def export_to_path(postfix):
         self.cur.copy_expert("COPY ({}) TO STDOUT WITH (DELIMITER ',', FORMAT CSV, HEADER, ENCODING 'UTF-8');".format(self.get_merged_receiver_beacons_subquery()), gzip_file)
 
 
-def convert(sourcefile, datestr, saver):
-    from app.gateway.process import string_to_message
-    from app.gateway.process_tools import AIRCRAFT_BEACON_TYPES, RECEIVER_BEACON_TYPES
-    from datetime import datetime
+def read_chunks(fin, chunk_size):
+    """Yield lists of lines from a file."""
 
-    fin = open_file(sourcefile)
-
-    # get total lines of the input file
-    total_lines = 0
+    chunk = []
     for line in fin:
-        total_lines += 1
-    fin.seek(0)
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
 
-    current_line = 0
-    steps = 100000
-    reference_date = datetime.strptime(datestr + " 12:00:00", "%Y-%m-%d %H:%M:%S")
+    if chunk:
+        yield chunk
 
-    pbar = tqdm(fin, total=total_lines)
-    for line in pbar:
-        pbar.set_description("Importing {}".format(sourcefile))
 
-        current_line += 1
-        if current_line % steps == 0:
-            saver.flush()
+def convert_chunk(args):
+    """Worker function for the process pool: (lines, reference_date) -> (line_count, aircraft_rows, receiver_rows)."""
 
-        message = string_to_message(line.strip(), reference_date=reference_date)
-        if message is None:
-            continue
+    lines, reference_date = args
+    aircraft_rows, receiver_rows = convert_lines(lines, reference_date)
+    return len(lines), aircraft_rows, receiver_rows
 
-        dictfilt = lambda x, y: dict([(i, x[i]) for i in x if i in set(y)])
 
-        try:
-            if message["beacon_type"] in AIRCRAFT_BEACON_TYPES:
-                message = dictfilt(
-                    message,
-                    (
-                        "beacon_type",
-                        "aprs_type",
-                        "location_wkt",
-                        "altitude",
-                        "name",
-                        "dstcall",
-                        "relay",
-                        "receiver_name",
-                        "timestamp",
-                        "track",
-                        "ground_speed",
-                        "address_type",
-                        "aircraft_type",
-                        "stealth",
-                        "address",
-                        "climb_rate",
-                        "turn_rate",
-                        "signal_quality",
-                        "error_count",
-                        "frequency_offset",
-                        "gps_quality_horizontal",
-                        "gps_quality_vertical",
-                        "software_version",
-                        "hardware_version",
-                        "real_address",
-                        "signal_power",
-                        "distance",
-                        "radial",
-                        "quality",
-                        "agl",
-                        "location_mgrs",
-                        "location_mgrs_short",
-                        "receiver_id",
-                        "device_id",
-                    ),
-                )
-
-                beacon = AircraftBeacon(**message)
-            elif message["beacon_type"] in RECEIVER_BEACON_TYPES:
-                if "rec_crystal_correction" in message:
-                    del message["rec_crystal_correction"]
-                    del message["rec_crystal_correction_fine"]
-                beacon = ReceiverBeacon(**message)
-            saver.add(beacon)
-        except Exception as e:
-            print(e)
-
-    saver.flush()
+def get_compressed_position(fin):
+    """Returns the position in the underlying file of a file opened with open_file (for gzip files the position in the compressed file)."""
+
+    buffer = fin.buffer
+    return getattr(buffer, "fileobj", buffer).tell()
+
+
+def imap_bounded(pool, func, tasks, max_pending):
+    """Like pool.imap, but at most max_pending tasks are submitted and not yet consumed. Pool.imap reads all tasks in advance
+       and keeps all results in memory if the consumer (the database writer) is slower than the pool."""
+
+    pending = deque()
+    for task in tasks:
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(func, (task,)))
+
+    while pending:
+        yield pending.popleft().get()
+
+
+def convert(sourcefile, datestr, saver, processes=1, chunk_size=10000, start_line=0):
+    """Parse an APRS logfile and feed the beacons into the saver.
+       With processes > 1 the chunks are parsed in a process pool and the saver (single writer) receives the binary COPY rows in file order.
+       The file is read only once, the progress is the position in the compressed file. With each flush a checkpoint is saved,
+       so an interrupted import can be continued with start_line from the checkpoint."""
+
+    from multiprocessing import Pool
+
+    filename = os.path.basename(sourcefile)
+    fin = open_file(sourcefile)
+
+    # skip the lines which are already imported
+    for _ in itertools.islice(fin, start_line):
+        pass
+
+    steps = 100000
+    reference_date = datetime.strptime(datestr + " 12:00:00", "%Y-%m-%d %H:%M:%S")
+    tasks = ((chunk, reference_date) for chunk in read_chunks(fin, chunk_size))
+
+    if processes > 1:
+        pool = Pool(processes)
+        results = imap_bounded(pool, convert_chunk, tasks, max_pending=2 * processes)
+    else:
+        pool = None
+        results = map(convert_chunk, tasks)
+
+    lines = start_line
+    unflushed_lines = 0
+    position = get_compressed_position(fin)
+    pbar = tqdm(total=os.path.getsize(sourcefile), initial=position, unit="B", unit_scale=True)
+    pbar.set_description("Importing {}".format(sourcefile))
+    for line_count, aircraft_rows, receiver_rows in results:
+        saver.add_rows(aircraft_rows, receiver_rows)
+        lines += line_count
+
+        # with a pool the reader is ahead of the results, so the position is just an estimation
+        new_position = get_compressed_position(fin)
+        pbar.update(new_position - position)
+        position = new_position
+
+        unflushed_lines += line_count
+        if unflushed_lines >= steps:
+            saver.flush(checkpoint=(filename, position, lines))
+            unflushed_lines = 0
+
+    pbar.close()
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    saver.flush(checkpoint=(filename, position, lines))
     fin.close()
 
 
-@user_cli.command("file_import")
-@click.argument("path")
-def file_import(path):
-    """Import APRS logfiles into separate logfile tables."""
+def get_import_checkpoints():
+    """Returns the import checkpoints (filename -> ImportCheckpoint)."""
+
+    return {checkpoint.filename: checkpoint for checkpoint in db.session.query(ImportCheckpoint)}
+
+
+def get_import_tasks(path):
+    """Returns the logfiles in the path which are not imported yet as list of dicts (filepath, datestr, resume, start_line).
+       A file is done if its checkpoint is finished or if there is a table without checkpoint (imported before the checkpoints)."""
 
-    import os
     import re
 
     # Get Filepaths and dates to import
@@ -389,19 +769,120 @@ def file_import(path):
             if match:
                 results.append({"filepath": os.path.join(root, file), "datestr": match.group(1)})
 
-    with LogfileDbSaver() as saver:
-        already_imported = saver.get_datestrs()
+    already_imported = get_aircraft_beacons_postfixes()
+    checkpoints = get_import_checkpoints()
+
+    tasks = []
+    for result in results:
+        checkpoint = checkpoints.get(os.path.basename(result["filepath"]))
+        table_exists = result["datestr"].replace("-", "") in already_imported
+        if (checkpoint is None and table_exists) or (checkpoint is not None and checkpoint.finished):
+            continue
+
+        # continue an interrupted import if its tables still exist
+        result["resume"] = checkpoint is not None and table_exists
+        result["start_line"] = checkpoint.lines if result["resume"] else 0
+        tasks.append(result)
 
-        results = list(filter(lambda x: x["datestr"] not in already_imported, results))
+    return tasks
 
-        pbar = tqdm(results)
-        for result in pbar:
-            filepath = result["filepath"]
-            datestr = result["datestr"]
-            pbar.set_description("Importing data for {}".format(datestr))
 
-            saver.set_datestr(datestr)
-            saver.create_tables()
-            convert(filepath, datestr, saver)
-            saver.add_missing_devices()
-            saver.add_missing_receivers()
+def import_file(filepath, datestr, resume=False, start_line=0, processes=1, bulk=False):
+    """Import a logfile into the tables with the date as postfix and mark its checkpoint as finished."""
+
+    filename = os.path.basename(filepath)
+    if bulk and start_line > 0:
+        app.logger.warning("Restart bulk import of {} (unlogged tables can't be continued)".format(filename))
+        start_line = 0
+    elif start_line > 0:
+        app.logger.warning("Continue import of {} at line {}".format(filename, start_line))
+
+    saver = FileDbFeeder(postfix=datestr.replace("-", ""), resume=resume, bulk=bulk)
+    convert(filepath, datestr, saver, processes=processes, start_line=start_line)
+    saver.prepare()
+
+    db.session.execute("UPDATE import_checkpoints SET finished = TRUE, updated = NOW() AT TIME ZONE 'UTC' WHERE filename = :filename", {"filename": filename})
+    db.session.commit()
+
+
+@user_cli.command("file_import")
+@click.argument("path")
+@click.option("--processes", default=1, type=click.INT, help="Number of parser processes (default: 1)")
+@click.option("--bulk", is_flag=True, help="Load into unlogged tables without indices (faster, but interrupted imports start again)")
+def file_import(path, processes, bulk):
+    """Import APRS logfiles into separate logfile tables. Interrupted imports are continued."""
+
+    pbar = tqdm(get_import_tasks(path))
+    for task in pbar:
+        pbar.set_description("Importing data for {}".format(task["datestr"]))
+        import_file(task["filepath"], task["datestr"], resume=task["resume"], start_line=task["start_line"], processes=processes, bulk=bulk)
+
+
+def get_active_queries():
+    """Returns the number of active queries of other sessions in our database."""
+
+    return db.session.execute(
+        """
+        SELECT COUNT(*)
+        FROM pg_stat_activity
+        WHERE datname = current_database() AND state = 'active' AND pid <> pg_backend_pid();
+    """
+    ).scalar()
+
+
+def backfill_worker(task, processes, bulk=False):
+    """Imports one day in a separate process."""
+
+    with app.app_context():
+        import_file(task["filepath"], task["datestr"], resume=task["resume"], start_line=task["start_line"], processes=processes, bulk=bulk)
+
+
+@user_cli.command("backfill")
+@click.argument("path")
+@click.option("--concurrency", default=2, type=click.INT, help="Number of days imported at the same time (default: 2)")
+@click.option("--processes", default=1, type=click.INT, help="Number of parser processes per day (default: 1)")
+@click.option("--max_active_queries", default=8, type=click.INT, help="Don't start a new day while the database has more active queries (default: 8)")
+@click.option("--bulk", is_flag=True, help="Load into unlogged tables without indices (faster, but interrupted days start again)")
+def backfill(path, concurrency, processes, max_active_queries, bulk):
+    """Import APRS logfiles of several days in parallel. Each day has its own tables and worker process."""
+
+    import time
+    from multiprocessing import Process
+
+    tasks = get_import_tasks(path)
+
+    pbar = tqdm(total=len(tasks))
+    running = {}
+    failed = []
+    while tasks or running:
+        for datestr, process in list(running.items()):
+            if not process.is_alive():
+                process.join()
+                if process.exitcode != 0:
+                    failed.append(datestr)
+                del running[datestr]
+                pbar.update(1)
+
+        if tasks and len(running) < concurrency:
+            active_queries = get_active_queries()
+            if active_queries <= max_active_queries:
+                # the forked process must not inherit the connections of this process
+                db.session.close()
+                db.engine.dispose()
+
+                task = tasks.pop(0)
+                process = Process(target=backfill_worker, args=(task, processes, bulk))
+                process.start()
+                running[task["datestr"]] = process
+                pbar.set_description("Importing {}".format(", ".join(sorted(running))))
+                continue
+            else:
+                db.session.commit()
+                pbar.set_description("Waiting for database ({} active queries)".format(active_queries))
+
+        time.sleep(1)
+
+    pbar.close()
+
+    if failed:
+        print("Import failed for: {}. Start the backfill again to continue.".format(", ".join(failed)))
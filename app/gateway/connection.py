@@ -0,0 +1,117 @@
+from time import sleep
+
+from psycopg2 import InterfaceError, OperationalError
+from sqlalchemy.exc import DBAPIError
+
+from app import db, app
+
+
+def is_connection_error(error):
+    """True for a lost or refused connection. SQLAlchemy wraps the psycopg2 errors (e.g. of raw_connection()) in a DBAPIError."""
+
+    if isinstance(error, DBAPIError):
+        error = error.orig
+
+    return isinstance(error, (InterfaceError, OperationalError))
+
+
+class FeederConnection:
+    """Long-lived database connection of a feeder.
+
+       Recurring statements are executed as server-side prepared statements (prepared once per connection).
+       If the connection is lost the work of the current transaction is repeated with a new connection. Further attempts wait
+       retry_delay seconds, the delay is doubled with each attempt (up to max_retry_delay)."""
+
+    def __init__(self, setup_queries=None, max_attempts=5, retry_delay=1, max_retry_delay=30):
+        # queries which are executed once after each (re)connect, e.g. for temporary tables
+        self.setup_queries = setup_queries or []
+
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.connection = None
+        self.prepared = set()
+
+    def connect(self):
+        self.connection = db.engine.raw_connection()
+        self.prepared = set()
+
+        cursor = self.connection.cursor()
+        for query in self.setup_queries:
+            cursor.execute(query)
+        cursor.close()
+        self.connection.commit()
+
+    def close(self):
+        if self.connection is None:
+            return
+
+        try:
+            self.connection.close()
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+
+        self.connection = None
+        self.prepared = set()
+
+    def cursor(self):
+        if self.connection is None:
+            self.connect()
+
+        return self.connection.cursor()
+
+    def execute(self, name, query, params=()):
+        """Execute the query as prepared statement 'name'. The query must be a single statement, the params are $1, $2, ... Returns the rowcount."""
+
+        cursor = self._execute(name, query, params)
+        rowcount = cursor.rowcount
+        cursor.close()
+
+        return rowcount
+
+    def fetch_value(self, name, query, params=()):
+        """Execute the query as prepared statement 'name' and return the first value of the first row."""
+
+        cursor = self._execute(name, query, params)
+        row = cursor.fetchone()
+        cursor.close()
+
+        return row[0] if row is not None else None
+
+    def _execute(self, name, query, params):
+        cursor = self.cursor()
+        if name not in self.prepared:
+            cursor.execute("PREPARE {} AS {}".format(name, query.strip().rstrip(";")))
+            self.prepared.add(name)
+
+        if params:
+            cursor.execute("EXECUTE {}({})".format(name, ", ".join(["%s"] * len(params))), params)
+        else:
+            cursor.execute("EXECUTE {}".format(name))
+
+        return cursor
+
+    def run(self, work):
+        """Call work(self) and commit. On a lost connection we reconnect and try again (max_attempts in total)."""
+
+        delay = self.retry_delay
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                work(self)
+                self.connection.commit()
+                return
+            except Exception as e:
+                if not is_connection_error(e):
+                    if self.connection is not None:
+                        self.connection.rollback()
+                    raise
+
+                self.close()
+                if attempt == self.max_attempts:
+                    raise
+
+                app.logger.error("Lost database connection, reconnecting in {}s (attempt {}/{})".format(delay, attempt, self.max_attempts), exc_info=True)
+                sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
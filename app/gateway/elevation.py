@@ -0,0 +1,177 @@
+import json
+import os
+
+import numpy as np
+
+
+class ElevationGrid:
+    """Elevation grid (srid 4326) in a directory with memory-mapped tiles.
+
+       grid.json: georeference (upper left corner and pixel size in degrees) and tile size
+       index.npy: position of each tile in tiles.npy, -1 for tiles without data
+       tiles.npy: the tiles with data (float32, NaN for no data)"""
+
+    def __init__(self, path, mode="r"):
+        with open(os.path.join(path, "grid.json")) as f:
+            meta = json.load(f)
+
+        self.left = meta["left"]
+        self.top = meta["top"]
+        self.resolution_x = meta["resolution_x"]
+        self.resolution_y = meta["resolution_y"]
+        self.rows = meta["rows"]
+        self.cols = meta["cols"]
+        self.tile_size = meta["tile_size"]
+
+        self.index = np.load(os.path.join(path, "index.npy"))
+        self.tiles = np.load(os.path.join(path, "tiles.npy"), mmap_mode=mode)
+
+    @classmethod
+    def create(cls, path, left, top, resolution_x, resolution_y, rows, cols, used_tiles, tile_size):
+        """Create an empty grid. used_tiles is a boolean array (tile rows x tile columns) of the tiles which will get data."""
+
+        os.makedirs(path, exist_ok=True)
+
+        meta = {"left": left, "top": top, "resolution_x": resolution_x, "resolution_y": resolution_y, "rows": rows, "cols": cols, "tile_size": tile_size}
+        with open(os.path.join(path, "grid.json"), "w") as f:
+            json.dump(meta, f)
+
+        tile_count = int(np.count_nonzero(used_tiles))
+        index = np.full(used_tiles.shape, -1, dtype=np.int32)
+        index[used_tiles] = np.arange(tile_count, dtype=np.int32)
+        np.save(os.path.join(path, "index.npy"), index)
+
+        tiles = np.lib.format.open_memmap(os.path.join(path, "tiles.npy"), mode="w+", dtype=np.float32, shape=(max(tile_count, 1), int(tile_size), int(tile_size)))
+        for tile in tiles:
+            tile[:] = np.nan
+        tiles.flush()
+        del tiles
+
+        return cls(path, mode="r+")
+
+    def write_block(self, row, col, values):
+        """Write a 2D block of elevation values with its upper left pixel at (row, col)."""
+
+        values = np.asarray(values, dtype=np.float32)
+        height, width = values.shape
+
+        for tile_row in range(row // self.tile_size, (row + height - 1) // self.tile_size + 1):
+            for tile_col in range(col // self.tile_size, (col + width - 1) // self.tile_size + 1):
+                tile_index = self.index[tile_row, tile_col]
+                if tile_index < 0:
+                    continue
+
+                # overlap of the block and the tile in grid coordinates
+                row_start = max(row, tile_row * self.tile_size)
+                row_end = min(row + height, (tile_row + 1) * self.tile_size)
+                col_start = max(col, tile_col * self.tile_size)
+                col_end = min(col + width, (tile_col + 1) * self.tile_size)
+
+                block = values[row_start - row : row_end - row, col_start - col : col_end - col]
+                tile = self.tiles[tile_index]
+                target = tile[row_start - tile_row * self.tile_size : row_end - tile_row * self.tile_size, col_start - tile_col * self.tile_size : col_end - tile_col * self.tile_size]
+                target[:] = np.where(np.isnan(block), target, block)
+
+    def pixel_values(self, rows, cols):
+        """Returns the values of the given pixels (NaN outside of the grid or without data)."""
+
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        rows = np.where(inside, rows, 0)
+        cols = np.where(inside, cols, 0)
+
+        tile_indices = self.index[rows // self.tile_size, cols // self.tile_size]
+        valid = inside & (tile_indices >= 0)
+
+        result = np.full(rows.shape, np.nan, dtype=np.float64)
+        result[valid] = self.tiles[tile_indices[valid], rows[valid] % self.tile_size, cols[valid] % self.tile_size]
+        return result
+
+    def elevation(self, latitudes, longitudes):
+        """Bilinear interpolated elevation for arrays of coordinates. If a neighbour pixel has no data the value of the enclosing pixel is used."""
+
+        x = (np.asarray(longitudes, dtype=np.float64) - self.left) / self.resolution_x
+        y = (self.top - np.asarray(latitudes, dtype=np.float64)) / self.resolution_y
+
+        # enclosing pixel
+        nearest = self.pixel_values(np.floor(y), np.floor(x))
+
+        # the four pixel centers around the point
+        x = x - 0.5
+        y = y - 0.5
+        col0 = np.floor(x)
+        row0 = np.floor(y)
+        fx = x - col0
+        fy = y - row0
+
+        v00 = self.pixel_values(row0, col0)
+        v01 = self.pixel_values(row0, col0 + 1)
+        v10 = self.pixel_values(row0 + 1, col0)
+        v11 = self.pixel_values(row0 + 1, col0 + 1)
+
+        bilinear = (v00 * (1 - fx) + v01 * fx) * (1 - fy) + (v10 * (1 - fx) + v11 * fx) * fy
+
+        return np.where(np.isnan(bilinear), nearest, bilinear)
+
+
+def export_elevation(connection, path, tile_size=256):
+    """Export the raster table 'elevation' into an ElevationGrid. All rasters must have the same pixel size."""
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT ST_UpperLeftX(rast), ST_UpperLeftY(rast), ST_ScaleX(rast), ST_ScaleY(rast), ST_Width(rast), ST_Height(rast) FROM elevation")
+    extents = np.array(cursor.fetchall(), dtype=np.float64)
+    cursor.close()
+
+    if len(extents) == 0:
+        raise ValueError("Table 'elevation' is empty.")
+
+    resolution_x = float(extents[0, 2])
+    resolution_y = float(abs(extents[0, 3]))
+    if not (np.allclose(extents[:, 2], resolution_x) and np.allclose(np.abs(extents[:, 3]), resolution_y)):
+        raise ValueError("All elevation rasters must have the same pixel size.")
+
+    left = float(extents[:, 0].min())
+    top = float(extents[:, 1].max())
+    right = float((extents[:, 0] + extents[:, 4] * resolution_x).max())
+    bottom = float((extents[:, 1] - extents[:, 5] * resolution_y).min())
+
+    rows = int(round((top - bottom) / resolution_y))
+    cols = int(round((right - left) / resolution_x))
+
+    # find the tiles covered by the rasters
+    used_tiles = np.zeros(((rows - 1) // tile_size + 1, (cols - 1) // tile_size + 1), dtype=bool)
+    first_rows = np.rint((top - extents[:, 1]) / resolution_y).astype(np.int64)
+    first_cols = np.rint((extents[:, 0] - left) / resolution_x).astype(np.int64)
+    for first_row, first_col, width, height in zip(first_rows, first_cols, extents[:, 4].astype(np.int64), extents[:, 5].astype(np.int64)):
+        used_tiles[first_row // tile_size : (first_row + height - 1) // tile_size + 1, first_col // tile_size : (first_col + width - 1) // tile_size + 1] = True
+
+    grid = ElevationGrid.create(path, left, top, resolution_x, resolution_y, rows, cols, used_tiles, tile_size)
+
+    # ... and fill them
+    cursor = connection.cursor(name="elevation_export")
+    cursor.itersize = 100
+    cursor.execute("SELECT ST_UpperLeftX(rast), ST_UpperLeftY(rast), ST_DumpValues(rast, 1) FROM elevation")
+    for upper_left_x, upper_left_y, values in cursor:
+        if values is None:
+            continue
+        first_row = int(round((top - upper_left_y) / resolution_y))
+        first_col = int(round((upper_left_x - left) / resolution_x))
+        grid.write_block(first_row, first_col, np.array(values, dtype=np.float32))
+    cursor.close()
+
+    grid.tiles.flush()
+    return grid
+
+
+def add_agl(messages, elevation_grid):
+    """Set the altitude above ground level for a batch of aircraft beacons with a location and an altitude."""
+
+    rows = [message for message in messages if "latitude" in message and message.get("altitude") is not None]
+    if not rows:
+        return
+
+    elevations = elevation_grid.elevation([message["latitude"] for message in rows], [message["longitude"] for message in rows])
+    for message, elevation in zip(rows, elevations.tolist()):
+        message["agl"] = message["altitude"] - elevation if elevation == elevation else None
@@ -0,0 +1,71 @@
+from time import monotonic
+
+
+class FlushScheduler:
+    """Decides when the buffered beacons are written and transfered.
+
+       A flush is due if the buffered rows or bytes exceed max_rows/max_bytes ('size') or the oldest buffered beacon waits longer
+       than max_latency seconds ('latency'). A transfer is due every transfer_interval seconds, but only if something was flushed
+       since the last transfer, so quiet periods don't cost database round trips. The caller passes the time (monotonic()),
+       so one clock tick per message is enough."""
+
+    def __init__(self, max_rows=50000, max_bytes=16 * 1024 * 1024, max_latency=20, transfer_interval=30):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.transfer_interval = transfer_interval
+
+        self.rows = 0
+        self.bytes = 0
+        self.first = None
+
+        self.flushed_rows = False
+        self.last_transfer = monotonic()
+
+    def record(self, size, now):
+        """A beacon of size bytes was buffered."""
+
+        self.rows += 1
+        self.bytes += size
+        if self.first is None:
+            self.first = now
+
+    def flush_reason(self, now):
+        """Returns 'size', 'latency' or None (no flush due)."""
+
+        if self.rows >= self.max_rows or self.bytes >= self.max_bytes:
+            return "size"
+        elif self.first is not None and now - self.first >= self.max_latency:
+            return "latency"
+        else:
+            return None
+
+    def time_to_flush(self, now):
+        """Seconds until the latency flush is due (None if nothing is buffered)."""
+
+        if self.first is None:
+            return None
+
+        return max(self.max_latency - (now - self.first), 0.0)
+
+    def flushed(self, now, remaining=0):
+        """The buffers were flushed. remaining: beacons which are still buffered (e.g. waiting for their second part)."""
+
+        if self.rows > remaining:
+            self.flushed_rows = True
+
+        if remaining > 0 and self.rows > 0:
+            self.bytes = self.bytes * min(remaining, self.rows) // self.rows
+            self.rows = remaining
+            self.first = now
+        else:
+            self.rows = 0
+            self.bytes = 0
+            self.first = None
+
+    def should_transfer(self, now):
+        return self.flushed_rows and now - self.last_transfer >= self.transfer_interval
+
+    def transferred(self, now):
+        self.flushed_rows = False
+        self.last_transfer = now
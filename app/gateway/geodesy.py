@@ -0,0 +1,90 @@
+import numpy as np
+
+from app.model.geo import Location
+
+
+# PostGIS uses this radius for ST_DistanceSphere
+EARTH_RADIUS = 6370986.0
+
+
+def distance_sphere(lon1, lat1, lon2, lat2):
+    """Great circle distance in meters between arrays of points (like ST_DistanceSphere)."""
+
+    lon1, lat1, lon2, lat2 = [np.radians(np.asarray(x, dtype=np.float64)) for x in (lon1, lat1, lon2, lat2)]
+
+    dlon = lon2 - lon1
+    cos_lat1, sin_lat1 = np.cos(lat1), np.sin(lat1)
+    cos_lat2, sin_lat2 = np.cos(lat2), np.sin(lat2)
+
+    a = cos_lat2 * np.sin(dlon)
+    b = cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * np.cos(dlon)
+    c = sin_lat1 * sin_lat2 + cos_lat1 * cos_lat2 * np.cos(dlon)
+
+    return EARTH_RADIUS * np.arctan2(np.sqrt(a * a + b * b), c)
+
+
+def azimuth(lon1, lat1, lon2, lat2):
+    """Azimuth in degrees (clockwise from north) from point 1 to point 2 in the lon/lat plane (like ST_Azimuth for geometries).
+       Identical points give NaN."""
+
+    dx = np.asarray(lon2, dtype=np.float64) - np.asarray(lon1, dtype=np.float64)
+    dy = np.asarray(lat2, dtype=np.float64) - np.asarray(lat1, dtype=np.float64)
+
+    result = np.degrees(np.arctan2(dx, dy)) % 360.0
+    return np.where((dx == 0) & (dy == 0), np.nan, result)
+
+
+def normalized_quality(signal_quality, distance):
+    """Signal quality normalized to a distance of 10km. Distances <= 0 give NaN."""
+
+    signal_quality = np.asarray(signal_quality, dtype=np.float64)
+    distance = np.asarray(distance, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(distance > 0, signal_quality + 20 * np.log10(distance / 10000), np.nan)
+
+
+class ReceiverLocations:
+    """Cache of the current receiver locations (receiver_id -> Location)."""
+
+    def __init__(self):
+        self.locations = {}
+
+    def load(self, session):
+        query = session.execute("SELECT id, ST_X(location), ST_Y(location) FROM receivers WHERE location IS NOT NULL")
+        self.locations = {receiver_id: Location(lon, lat) for receiver_id, lon, lat in query}
+
+    def update(self, receiver_id, longitude, latitude):
+        self.locations[receiver_id] = Location(longitude, latitude)
+
+    def get(self, receiver_id):
+        return self.locations.get(receiver_id)
+
+
+def add_distances(messages, receiver_locations):
+    """Set distance, radial and quality for a batch of aircraft beacons with a location and a known receiver location."""
+
+    rows = []
+    for message in messages:
+        if "latitude" in message and message.get("receiver_id") is not None:
+            receiver_location = receiver_locations.get(message["receiver_id"])
+            if receiver_location is not None:
+                rows.append((message, receiver_location))
+
+    if not rows:
+        return
+
+    lon = np.array([message["longitude"] for message, _ in rows])
+    lat = np.array([message["latitude"] for message, _ in rows])
+    receiver_lon = np.array([location.longitude for _, location in rows])
+    receiver_lat = np.array([location.latitude for _, location in rows])
+    signal_quality = np.array([message.get("signal_quality") for message, _ in rows], dtype=np.float64)
+
+    distances = distance_sphere(lon, lat, receiver_lon, receiver_lat)
+    radials = np.rint(azimuth(lon, lat, receiver_lon, receiver_lat))
+    qualities = normalized_quality(signal_quality, distances)
+
+    for (message, _), distance, radial, quality in zip(rows, distances.tolist(), radials.tolist(), qualities.tolist()):
+        message["distance"] = distance
+        message["radial"] = int(radial) if radial == radial else None
+        message["quality"] = quality if quality == quality else None
@@ -0,0 +1,74 @@
+from time import monotonic
+
+# the coordinates are merged as pair, so they are always from the same part
+LOCATION_FIELDS = ("latitude", "longitude")
+
+
+class BeaconMerger:
+    """Some beacons are split into position and status beacon. The merger keeps the beacons for a short time window keyed by
+       (name, receiver_name, timestamp) and merges the parts into one beacon. A field which is set in more than one part gets
+       the maximum value, like the MAX() aggregates of the merge queries in process_tools."""
+
+    def __init__(self, window=5):
+        self.window = window
+
+        # key -> (receive time, message), ordered by the receive time of the first part
+        self.messages = {}
+
+    def __len__(self):
+        return len(self.messages)
+
+    def add(self, message, now=None):
+        """Add the message. Returns the message if it is a new beacon or None if it was merged into a buffered beacon."""
+
+        key = (message["name"], message["receiver_name"], message["timestamp"])
+
+        entry = self.messages.get(key)
+        if entry is None:
+            self.messages[key] = (monotonic() if now is None else now, message)
+            return message
+
+        merged = entry[1]
+        for field, value in message.items():
+            if value is None or field in LOCATION_FIELDS:
+                continue
+
+            current = merged.get(field)
+            if current is None:
+                merged[field] = value
+            else:
+                try:
+                    if value > current:
+                        merged[field] = value
+                except TypeError:
+                    # not comparable, keep the first value
+                    pass
+
+        if message.get("latitude") is not None and message.get("longitude") is not None:
+            location = (message["latitude"], message["longitude"])
+            if merged.get("latitude") is None or merged.get("longitude") is None or location > (merged["latitude"], merged["longitude"]):
+                merged["latitude"], merged["longitude"] = location
+
+        return None
+
+    def pop_ready(self, now=None):
+        """Returns the messages which are older than the time window and removes them from the merger."""
+
+        if now is None:
+            now = monotonic()
+
+        ready = []
+        for key, (received, message) in self.messages.items():
+            if now - received < self.window:
+                break
+            ready.append(key)
+
+        return [self.messages.pop(key)[1] for key in ready]
+
+    def pop_all(self):
+        """Returns all messages and clears the merger."""
+
+        messages = [message for _, message in self.messages.values()]
+        self.messages = {}
+
+        return messages
@@ -0,0 +1,190 @@
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+
+from app import app
+
+# default buckets for durations and lags in seconds
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+# buckets for the number of rows per COPY
+ROWS_BUCKETS = (10, 100, 1000, 5000, 10000, 25000, 50000, 100000, 250000)
+
+SUFFIXES = ("_sum", "_count", "_bucket")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+
+    return "{" + ",".join(['{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for key, value in sorted(labels.items())]) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bucket, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            yield name + "_bucket", dict(labels, le=format_value(bucket)), cumulative
+        yield name + "_sum", labels, self.sum
+        yield name + "_count", labels, self.count
+
+
+class Metrics:
+    """Minimal registry for metrics in the Prometheus text format.
+
+       Histograms are kept in the registry. All other values are taken from collectors when the metrics are rendered,
+       so the hot path (parsing) only updates its own counters. A collector is a function which yields (name, labels, value).
+       The metrics can be served with a local HTTP server (GET /metrics) or written periodically into a file
+       (e.g. for the textfile collector of the node exporter)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # name -> (type, help)
+        self.descriptions = {}
+        # (name, sorted labels) -> Histogram
+        self.histograms = {}
+        self.collectors = []
+
+        self.server = None
+
+    def describe(self, name, metric_type, help_text):
+        self.descriptions[name] = (metric_type, help_text)
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        self.observe_many(name, [value], buckets=buckets, **labels)
+
+    def observe_many(self, name, values, buckets=SECONDS_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            for value in values:
+                histogram.observe(value)
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def remove_collector(self, collector):
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    def get_base_name(self, name):
+        for suffix in SUFFIXES:
+            if name.endswith(suffix) and name[: -len(suffix)] in self.descriptions:
+                return name[: -len(suffix)]
+        return name
+
+    def collect(self):
+        """Returns all samples as dict: base name -> list of (name, labels, value)."""
+
+        samples = {}
+
+        with self.lock:
+            for (name, labels), histogram in self.histograms.items():
+                samples.setdefault(name, []).extend(histogram.samples(name, dict(labels)))
+
+        for collector in list(self.collectors):
+            try:
+                for name, labels, value in collector():
+                    samples.setdefault(self.get_base_name(name), []).append((name, labels, value))
+            except Exception:
+                app.logger.error("Metrics collector failed", exc_info=True)
+
+        return samples
+
+    def render(self):
+        lines = []
+        for base_name, samples in sorted(self.collect().items()):
+            if base_name in self.descriptions:
+                metric_type, help_text = self.descriptions[base_name]
+                lines.append("# HELP {} {}".format(base_name, help_text))
+                lines.append("# TYPE {} {}".format(base_name, metric_type))
+
+            for name, labels, value in samples:
+                lines.append("{}{} {}".format(name, format_labels(labels), format_value(value)))
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, filename):
+        """Write the metrics into the file (atomically, so a reader never sees a partial file)."""
+
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "w") as fout:
+            fout.write(self.render())
+        os.replace(tmp_filename, filename)
+
+    def start_writer(self, filename, interval=15):
+        def write_loop():
+            while True:
+                sleep(interval)
+                try:
+                    self.write(filename)
+                except OSError:
+                    app.logger.error("Can't write metrics file {}".format(filename), exc_info=True)
+
+        threading.Thread(target=write_loop, name="metrics-writer", daemon=True).start()
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve the metrics on http://host:port/metrics in a background thread. Returns the HTTP server."""
+
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+
+                data = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+
+        return self.server
+
+
+metrics = Metrics()
+
+metrics.describe("ogn_gateway_received_total", "counter", "Received APRS lines by beacon type")
+metrics.describe("ogn_gateway_parsed_total", "counter", "Parsed and buffered beacons by beacon type")
+metrics.describe("ogn_gateway_dropped_total", "counter", "Lines dropped by the prefilter by beacon type")
+metrics.describe("ogn_gateway_other_partitions_total", "counter", "Lines of receivers in the partitions of other workers")
+metrics.describe("ogn_gateway_parse_errors_total", "counter", "Lines which could not be parsed")
+metrics.describe("ogn_gateway_reception_cache_total", "counter", "Position lines found (hit) or not found (miss) in the reception cache")
+metrics.describe("ogn_gateway_buffered_beacons", "gauge", "Beacons in the feeder buffers")
+metrics.describe("ogn_gateway_stage_seconds", "summary", "Time spent in the feeder stages")
+metrics.describe("ogn_gateway_copy_rows", "histogram", "Rows per COPY")
+metrics.describe("ogn_gateway_lag_seconds", "histogram", "Time between the beacon timestamp and the commit into the final tables")
+metrics.describe("ogn_gateway_queue_size", "gauge", "Received lines waiting for the parser")
+metrics.describe("ogn_gateway_spilled_lines_total", "counter", "Received lines which were spilled into the temporary file of the queue")
@@ -0,0 +1,27 @@
+from functools import lru_cache
+
+from mgrs import MGRS
+
+
+class MgrsEncoder:
+    """MGRS encoder with a LRU cache.
+       The cache key are the coordinates quantized to 1e-7 degrees (~1cm), so the many receptions of the same position
+       are encoded only once. Different positions (e.g. of a circling glider) are not equal at this precision and miss the cache."""
+
+    def __init__(self, cache_size=100000, precision=7):
+        self.mgrs = MGRS()
+        self.precision = precision
+        self._encode = lru_cache(maxsize=cache_size)(self._to_mgrs)
+
+    def _to_mgrs(self, latitude, longitude):
+        location_mgrs = self.mgrs.toMGRS(latitude, longitude).decode("utf-8")
+        location_mgrs_short = location_mgrs[0:5] + location_mgrs[5:7] + location_mgrs[10:12]
+        return location_mgrs, location_mgrs_short
+
+    def encode(self, latitude, longitude):
+        """Returns the full MGRS (1m) and the reduced MGRS (1km) of a coordinate."""
+
+        return self._encode(round(latitude, self.precision), round(longitude, self.precision))
+
+    def cache_info(self):
+        return self._encode.cache_info()
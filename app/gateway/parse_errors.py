@@ -0,0 +1,118 @@
+import gzip
+import logging
+import logging.handlers
+import os
+import re
+import shutil
+from collections import Counter
+from datetime import datetime
+from time import monotonic
+
+from app import app
+
+
+def gzip_rotator(source, dest):
+    with open(source, "rb") as fin, gzip.open(dest, "wb") as fout:
+        shutil.copyfileobj(fin, fout)
+    os.remove(source)
+
+
+def gzip_namer(name):
+    return name + ".gz"
+
+
+class ParseErrorLog:
+    """Counts the parse errors by exception type and logs a summary at most every summary_interval seconds (instead of one log line per error).
+
+       If a dead letter file is set the failing raw lines are written into it (rotating and gzip compressed). The lines have the
+       exception type and the reference date as prefix and can be replayed with read_dead_letters()."""
+
+    def __init__(self, summary_interval=60):
+        self.summary_interval = summary_interval
+
+        self.counts = Counter()
+        self.total = 0
+        self.last_summary = monotonic()
+
+        self.dead_letter_logger = None
+
+    def set_dead_letter_file(self, filename, max_bytes=16 * 1024 * 1024, backup_count=10):
+        handler = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        handler.rotator = gzip_rotator
+        handler.namer = gzip_namer
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self.dead_letter_logger = logging.getLogger("ogn.dead_letters")
+        self.dead_letter_logger.propagate = False
+        self.dead_letter_logger.setLevel(logging.INFO)
+        for old_handler in list(self.dead_letter_logger.handlers):
+            self.dead_letter_logger.removeHandler(old_handler)
+            old_handler.close()
+        self.dead_letter_logger.addHandler(handler)
+
+    def record(self, raw_string, exception, reference_date):
+        error_type = type(exception).__name__
+        self.counts[error_type] += 1
+        self.total += 1
+
+        if self.dead_letter_logger is not None:
+            self.dead_letter_logger.info("{} {:%Y-%m-%dT%H:%M:%S} {}".format(error_type, reference_date, raw_string))
+
+        self.log_summary_if_due()
+
+    def log_summary_if_due(self):
+        """Log the summary if the summary_interval is over. Call it periodically, else the errors of a burst followed by quiet are not logged."""
+
+        if monotonic() - self.last_summary >= self.summary_interval:
+            self.log_summary()
+
+    def log_summary(self):
+        if self.counts:
+            app.logger.error(
+                "Parse errors in the last {:.0f}s: {} (total: {})".format(
+                    monotonic() - self.last_summary, ", ".join(["{}={}".format(error_type, count) for error_type, count in self.counts.most_common()]), self.total
+                )
+            )
+
+        self.counts = Counter()
+        self.last_summary = monotonic()
+
+
+def get_dead_letter_files(filename):
+    """Returns the dead letter file and its rotated files, the oldest first."""
+
+    directory = os.path.dirname(filename) or "."
+    pattern = re.compile(r"^{}\.([0-9]+)\.gz$".format(re.escape(os.path.basename(filename))))
+
+    rotated = []
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            match = pattern.match(name)
+            if match:
+                rotated.append((int(match.group(1)), os.path.join(directory, name)))
+
+    files = [name for _, name in sorted(rotated, reverse=True)]
+    if os.path.isfile(filename):
+        files.append(filename)
+
+    return files
+
+
+def read_dead_letters(filename):
+    """Yields (error_type, reference_date, raw_string) from a dead letter file (plain or gzip compressed)."""
+
+    if filename.endswith(".gz"):
+        fin = gzip.open(filename, "rt", encoding="utf-8", errors="replace")
+    else:
+        fin = open(filename, "rt", encoding="utf-8", errors="replace")
+
+    with fin:
+        for line in fin:
+            parts = line.rstrip("\n").split(" ", 2)
+            if len(parts) < 3:
+                continue
+
+            try:
+                yield parts[0], datetime.strptime(parts[1], "%Y-%m-%dT%H:%M:%S"), parts[2]
+            except ValueError:
+                continue
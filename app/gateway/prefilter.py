@@ -0,0 +1,130 @@
+import zlib
+from collections import Counter
+
+# the ogn parser decides by the comment if an 'APRS' line is a receiver or an aircraft beacon, so the prefilter classifies them as 'aprs'
+APRS_BEACON_TYPES = ("aprs_aircraft", "aprs_receiver")
+
+# beacon types of the ogn parser by destination call
+DSTCALL_BEACON_TYPES = {
+    "APRS": "aprs",
+    "OGFLR": "flarm",
+    "OGNTRK": "tracker",
+    "OGNFNT": "fanet",
+    "OGNSDR": "receiver",
+    "OGCAPT": "capturs",
+    "OGFLYM": "flymaster",
+    "OGINREACH": "inreach",
+    "OGLT24": "lt24",
+    "OGNAVI": "naviter",
+    "OGSKYL": "skylines",
+    "OGSPID": "spider",
+    "OGSPOT": "spot",
+}
+
+
+def classify(raw_string):
+    """Returns the expected beacon type of a raw APRS line without parsing it ('comment' for server lines and 'invalid' for lines which can't be parsed).
+
+       The type is derived from the destination call. 'APRS' lines are 'aprs' (aprs_aircraft or aprs_receiver, known after parsing)."""
+
+    if not raw_string or raw_string[0] == "#":
+        return "comment"
+
+    header_end = raw_string.find(":")
+    source_end = raw_string.find(">", 0, header_end)
+    if header_end < 0 or source_end < 0 or header_end + 1 >= len(raw_string) or raw_string[header_end + 1] not in "/>":
+        return "invalid"
+
+    dstcall_end = raw_string.find(",", source_end, header_end)
+    if dstcall_end < 0:
+        dstcall_end = header_end
+    dstcall = raw_string[source_end + 1 : dstcall_end]
+
+    return DSTCALL_BEACON_TYPES.get(dstcall, "unknown")
+
+
+def get_receiver_name(raw_string, beacon_type):
+    """Returns the name of the receiving station: the source of receiver beacons, else the last element of the path."""
+
+    if beacon_type in ("aprs_receiver", "receiver"):
+        return raw_string[: raw_string.find(">")]
+    else:
+        header = raw_string[: raw_string.find(":")]
+        return header[header.rfind(",") + 1 :]
+
+
+def get_partition(receiver_name, count):
+    """Stable partition (0 ... count - 1) of a receiver."""
+
+    return zlib.crc32(receiver_name.encode("utf-8", errors="replace")) % count
+
+
+class PreFilter:
+    """Drops raw lines before the (expensive) parsing. A line passes if its beacon type is included (all types if include is None)
+       and not excluded. Comments and invalid lines never pass. All lines and the skipped lines are counted by type.
+
+       With partition=(index, count) only the lines of the receivers in this partition pass (hashed by receiver name), so all beacons
+       of a receiver (position and received aircraft) go to the same worker.
+
+       'aprs' lines pass if one of the APRS beacon types is accepted. Their type and receiver are only known after parsing,
+       so the parsed message has to be checked with accept_message()."""
+
+    def __init__(self, include=None, exclude=None, partition=None):
+        self.include = set(include) if include is not None else None
+        self.exclude = set(exclude) if exclude is not None else set()
+        self.partition = partition
+
+        self.passed = 0
+        self.received = Counter()
+        self.skipped = Counter()
+        self.other_partitions = 0
+
+    def is_included(self, beacon_type):
+        return beacon_type not in self.exclude and (self.include is None or beacon_type in self.include)
+
+    def accept(self, raw_string):
+        beacon_type = classify(raw_string)
+        self.received[beacon_type] += 1
+
+        if beacon_type == "aprs":
+            if not any(self.is_included(aprs_type) for aprs_type in APRS_BEACON_TYPES):
+                self.skipped[beacon_type] += 1
+                return False
+
+            self.passed += 1
+            return True
+
+        if beacon_type in ("comment", "invalid") or not self.is_included(beacon_type):
+            self.skipped[beacon_type] += 1
+            return False
+
+        if self.partition is not None and get_partition(get_receiver_name(raw_string, beacon_type), self.partition[1]) != self.partition[0]:
+            self.other_partitions += 1
+            return False
+
+        self.passed += 1
+        return True
+
+    def accept_message(self, message):
+        """Checks the parsed message of an 'aprs' line (the other lines are already checked by accept())."""
+
+        beacon_type = message["beacon_type"]
+        if beacon_type not in APRS_BEACON_TYPES:
+            return True
+
+        if not self.is_included(beacon_type):
+            self.skipped[beacon_type] += 1
+            return False
+
+        receiver_name = message["name"] if beacon_type == "aprs_receiver" else message["receiver_name"]
+        if self.partition is not None and get_partition(receiver_name, self.partition[1]) != self.partition[0]:
+            self.other_partitions += 1
+            return False
+
+        return True
+
+    def summary(self):
+        summary = "passed: {}, skipped: {}".format(self.passed, ", ".join(["{}={}".format(beacon_type, count) for beacon_type, count in self.skipped.most_common()]) or "0")
+        if self.partition is not None:
+            summary += ", other partitions: {}".format(self.other_partitions)
+        return summary
@@ -1,23 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from app import db
 
+# columns of the normalized tables (BEACON_LAYOUT = "normalized"), the first columns are the keys
+POSITION_COLUMNS = [
+    "device_id",
+    "timestamp",
+    "name",
+    "dstcall",
+    "location",
+    "altitude",
+    "track",
+    "ground_speed",
+    "address_type",
+    "aircraft_type",
+    "stealth",
+    "address",
+    "climb_rate",
+    "turn_rate",
+    "gps_quality_horizontal",
+    "gps_quality_vertical",
+    "software_version",
+    "hardware_version",
+    "real_address",
+    "location_mgrs",
+    "location_mgrs_short",
+    "agl",
+    "error_count",
+]
+RECEPTION_COLUMNS = ["device_id", "timestamp", "receiver_id", "relay", "signal_quality", "error_count", "distance", "radial", "quality"]
+
+# id of the advisory lock for inserting receivers and devices: parallel importers must not insert the same name/address twice
+KEYS_LOCK_ID = 4711
+
+
+def lock_keys():
+    """Take the advisory lock for inserting receivers and devices. It is released with the end of the transaction."""
+
+    db.session.execute("SELECT pg_advisory_xact_lock({})".format(KEYS_LOCK_ID))
+
+
+def create_tables(postfix, unlogged=False):
+    """Create tables for log file import. Unlogged tables are not written into the WAL (faster, but emptied after a crash)."""
+
+    table_type = "UNLOGGED TABLE" if unlogged else "TABLE"
+    db.session.execute('DROP TABLE IF EXISTS "aircraft_beacons_{0}"; CREATE {1} aircraft_beacons_{0} AS TABLE aircraft_beacons WITH NO DATA;'.format(postfix, table_type))
+    db.session.execute('DROP TABLE IF EXISTS "receiver_beacons_{0}"; CREATE {1} receiver_beacons_{0} AS TABLE receiver_beacons WITH NO DATA;'.format(postfix, table_type))
+    db.session.commit()
+
 
-def create_tables(postfix):
-    """Create tables for log file import."""
+def drop_tables(postfix):
+    """Drop the import tables (e.g. of a one-off import)."""
 
-    db.session.execute('DROP TABLE IF EXISTS "aircraft_beacons_{0}"; CREATE TABLE aircraft_beacons_{0} AS TABLE aircraft_beacons WITH NO DATA;'.format(postfix))
-    db.session.execute('DROP TABLE IF EXISTS "receiver_beacons_{0}"; CREATE TABLE receiver_beacons_{0} AS TABLE receiver_beacons WITH NO DATA;'.format(postfix))
+    db.session.execute('DROP TABLE IF EXISTS "aircraft_beacons_{0}"; DROP TABLE IF EXISTS "receiver_beacons_{0}";'.format(postfix))
     db.session.commit()
 
 
-def create_indices(postfix):
-    """Creates indices for aircraft- and receiver-beacons."""
+def set_tables_logged(postfix):
+    """Make unlogged import tables crash-safe."""
+
+    db.session.execute('ALTER TABLE "aircraft_beacons_{0}" SET LOGGED; ALTER TABLE "receiver_beacons_{0}" SET LOGGED;'.format(postfix))
+    db.session.commit()
+
+
+def analyze_tables(postfix):
+    """Update the planner statistics of the import tables (e.g. after a bulk load)."""
+
+    db.session.execute('ANALYZE "aircraft_beacons_{0}"; ANALYZE "receiver_beacons_{0}";'.format(postfix))
+    db.session.commit()
+
+
+def add_import_sequence(postfix):
+    """Adds the column 'import_seq' to the import tables. With this sequence the continuous import processes only new rows."""
 
     db.session.execute(
         """
-        CREATE INDEX IF NOT EXISTS ix_aircraft_beacons_{0}_device_id ON "aircraft_beacons_{0}" (device_id NULLS FIRST);
-        CREATE INDEX IF NOT EXISTS ix_aircraft_beacons_{0}_receiver_id ON "aircraft_beacons_{0}" (receiver_id NULLS FIRST);
-        CREATE INDEX IF NOT EXISTS ix_aircraft_beacons_{0}_timestamp_name_receiver_name ON "aircraft_beacons_{0}" (timestamp, name, receiver_name);
-        CREATE INDEX IF NOT EXISTS ix_receiver_beacons_{0}_timestamp_name_receiver_name ON "receiver_beacons_{0}" (timestamp, name, receiver_name);
+        ALTER TABLE "aircraft_beacons_{0}" ADD COLUMN IF NOT EXISTS import_seq BIGSERIAL;
+        ALTER TABLE "receiver_beacons_{0}" ADD COLUMN IF NOT EXISTS import_seq BIGSERIAL;
+        CREATE INDEX IF NOT EXISTS ix_aircraft_beacons_{0}_import_seq ON "aircraft_beacons_{0}" (import_seq);
+        CREATE INDEX IF NOT EXISTS ix_receiver_beacons_{0}_import_seq ON "receiver_beacons_{0}" (import_seq);
     """.format(
             postfix
         )
@@ -25,23 +86,59 @@ def create_indices(postfix):
     db.session.commit()
 
 
-def create_indices_bigdata(postfix):
-    """Creates indices for aircraft- and receiver-beacons."""
+def get_max_import_seq_query(table):
+    return 'SELECT COALESCE(MAX(import_seq), 0) FROM "{0}";'.format(table)
 
-    db.session.execute(
-        """
-        CREATE INDEX IF NOT EXISTS ix_aircraft_beacons_{0}_timestamp_name_receiver_name ON "aircraft_beacons_{0}" (timestamp, name, receiver_name);
-        CREATE INDEX IF NOT EXISTS ix_receiver_beacons_{0}_timestamp_name_receiver_name ON "receiver_beacons_{0}" (timestamp, name, receiver_name);
+
+def get_create_temp_tables_query(postfix):
+    """Temporary tables for the batches of a connection, they are emptied with each commit."""
+
+    return """
+        CREATE TEMPORARY TABLE IF NOT EXISTS "aircraft_beacons_{0}" ON COMMIT DELETE ROWS AS TABLE aircraft_beacons WITH NO DATA;
+        CREATE TEMPORARY TABLE IF NOT EXISTS "receiver_beacons_{0}" ON COMMIT DELETE ROWS AS TABLE receiver_beacons WITH NO DATA;
     """.format(
-            postfix
-        )
+        postfix
     )
+
+
+def get_create_indices_queries(postfix):
+    return [
+        'CREATE INDEX IF NOT EXISTS ix_aircraft_beacons_{0}_device_id ON "aircraft_beacons_{0}" (device_id NULLS FIRST);'.format(postfix),
+        'CREATE INDEX IF NOT EXISTS ix_aircraft_beacons_{0}_receiver_id ON "aircraft_beacons_{0}" (receiver_id NULLS FIRST);'.format(postfix),
+        'CREATE INDEX IF NOT EXISTS ix_aircraft_beacons_{0}_timestamp_name_receiver_name ON "aircraft_beacons_{0}" (timestamp, name, receiver_name);'.format(postfix),
+        'CREATE INDEX IF NOT EXISTS ix_receiver_beacons_{0}_timestamp_name_receiver_name ON "receiver_beacons_{0}" (timestamp, name, receiver_name);'.format(postfix),
+    ]
+
+
+def create_indices(postfix):
+    """Creates indices for aircraft- and receiver-beacons."""
+
+    db.session.execute("\n".join(get_create_indices_queries(postfix)))
     db.session.commit()
 
 
+def create_indices_parallel(postfix, workers=4):
+    """Creates the indices for aircraft- and receiver-beacons at the same time, each index with its own connection."""
+
+    def create_index(query):
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query)
+            cursor.close()
+            connection.commit()
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() raises the first exception of the workers
+        list(executor.map(create_index, get_create_indices_queries(postfix)))
+
+
 def add_missing_devices(postfix):
     """Add missing devices."""
 
+    lock_keys()
     db.session.execute(
         """
         INSERT INTO devices(address)
@@ -59,6 +156,7 @@ def add_missing_devices(postfix):
 def add_missing_receivers(postfix):
     """Add missing receivers."""
 
+    lock_keys()
     db.session.execute(
         """
         INSERT INTO receivers(name)
@@ -82,8 +180,14 @@ def add_missing_receivers(postfix):
 def update_receiver_location(postfix):
     """Updates the receiver location. We need this because we want the actual location for distance calculations."""
 
-    db.session.execute(
-        """
+    db.session.execute(get_update_receiver_location_query(postfix))
+    db.session.commit()
+
+
+def get_update_receiver_location_query(postfix, seq_range=False):
+    """If seq_range is set only rows with $1 < import_seq <= $2 are considered."""
+
+    return """
         UPDATE receivers AS r
         SET
             location = sq.location,
@@ -91,34 +195,16 @@ def update_receiver_location(postfix):
         FROM (
             SELECT DISTINCT ON (rb.receiver_id) rb.receiver_id, rb.location, rb.altitude
             FROM "receiver_beacons_{0}" AS rb
-            WHERE rb.location IS NOT NULL
+            WHERE rb.location IS NOT NULL {1}
             ORDER BY rb.receiver_id, rb.timestamp
             ) AS sq
         WHERE r.id = sq.receiver_id;
     """.format(
-            postfix
-        )
+        postfix, "AND rb.import_seq > $1 AND rb.import_seq <= $2" if seq_range else ""
     )
-    db.session.commit()
-
 
-def update_receiver_beacons(postfix):
-    """Updates the foreign keys."""
 
-    db.session.execute(
-        """
-        UPDATE receiver_beacons_{0} AS rb
-        SET receiver_id = r.id
-        FROM receivers AS r
-        WHERE rb.receiver_id IS NULL AND rb.name = r.name;
-    """.format(
-            postfix
-        )
-    )
-    db.session.commit()
-
-
-def update_receiver_beacons_bigdata(postfix):
+def update_receiver_beacons_bigdata(postfix, unlogged=False):
     """Updates the foreign keys.
        Due to performance reasons we use a new table instead of updating the old."""
 
@@ -132,51 +218,56 @@ def update_receiver_beacons_bigdata(postfix):
             rb.good_senders, rb.good_and_bad_senders,
 
             r.id AS receiver_id
-        INTO "receiver_beacons_{0}_temp"
+        INTO {1} "receiver_beacons_{0}_temp"
         FROM "receiver_beacons_{0}" AS rb, receivers AS r
         WHERE rb.name = r.name;
 
         DROP TABLE IF EXISTS "receiver_beacons_{0}";
         ALTER TABLE "receiver_beacons_{0}_temp" RENAME TO "receiver_beacons_{0}";
     """.format(
-            postfix
+            postfix, "UNLOGGED" if unlogged else ""
         )
     )
     db.session.commit()
 
 
 def update_aircraft_beacons(postfix):
-    """Updates the foreign keys and calculates distance/radial and quality and computes the altitude above ground level.
+    """Computes the altitude above ground level.
+       The foreign keys, distance/radial and quality are already computed when the beacons are written into the table.
        Elevation data has to be in the table 'elevation' with srid 4326."""
 
-    db.session.execute(
-        """
+    db.session.execute(get_update_aircraft_beacons_query(postfix))
+    db.session.commit()
+
+
+def get_update_aircraft_beacons_query(postfix, seq_range=False):
+    """If seq_range is set only rows with $1 < import_seq <= $2 are updated."""
+
+    return """
         UPDATE aircraft_beacons_{0} AS ab
-        SET
-            device_id = d.id,
-            receiver_id = r.id,
-            distance = CASE WHEN ab.location IS NOT NULL AND r.location IS NOT NULL THEN CAST(ST_DistanceSphere(ab.location, r.location) AS REAL) ELSE NULL END,
-            radial = CASE WHEN ab.location IS NOT NULL AND r.location IS NOT NULL THEN CAST(degrees(ST_Azimuth(ab.location, r.location)) AS SMALLINT) ELSE NULL END,
-            quality = CASE WHEN ab.location IS NOT NULL AND r.location IS NOT NULL AND ST_DistanceSphere(ab.location, r.location) > 0 AND ab.signal_quality IS NOT NULL
-                        THEN CAST(signal_quality + 20*log(ST_DistanceSphere(ab.location, r.location)/10000) AS REAL)
-                        ELSE NULL
-            END,
-            agl = CAST(ab.altitude - ST_Value(e.rast, ab.location) AS REAL)
-
-        FROM devices AS d, receivers AS r, elevation AS e
-        WHERE ab.device_id IS NULL and ab.receiver_id IS NULL AND ab.address = d.address AND ab.receiver_name = r.name AND ST_Intersects(e.rast, ab.location);
+        SET agl = CAST(ab.altitude - ST_Value(e.rast, ab.location) AS REAL)
+        FROM elevation AS e
+        WHERE ab.agl IS NULL AND ab.location IS NOT NULL AND ST_Intersects(e.rast, ab.location) {1};
     """.format(
-            postfix
-        )
+        postfix, "AND ab.import_seq > $1 AND ab.import_seq <= $2" if seq_range else ""
     )
-    db.session.commit()
 
 
-def update_aircraft_beacons_bigdata(postfix):
+def update_aircraft_beacons_bigdata(postfix, unlogged=False, raster_agl=True):
     """Updates the foreign keys and calculates distance/radial and quality and computes the altitude above ground level.
-       Elevation data has to be in the table 'elevation' with srid 4326.
+       The file import computes the distances here (the receiver locations are known after update_receiver_location), the gateway
+       computes them with app.gateway.geodesy when the beacons are written. ST_DistanceSphere is computed once per row.
+       With raster_agl the agl is taken from the table 'elevation' (srid 4326), else it is already set (ElevationGrid).
+       Beacons without elevation data keep agl NULL.
        Due to performance reasons we use a new table instead of updating the old."""
 
+    if raster_agl:
+        agl = "CAST(ab.altitude - ST_Value(e.rast, ab.location) AS REAL) AS agl"
+        elevation_join = "LEFT JOIN elevation AS e ON ST_Intersects(e.rast, ab.location)"
+    else:
+        agl = "ab.agl"
+        elevation_join = ""
+
     db.session.execute(
         """
         SELECT
@@ -190,60 +281,22 @@ def update_aircraft_beacons_bigdata(postfix):
 
             d.id AS device_id,
             r.id AS receiver_id,
-            CASE WHEN ab.location IS NOT NULL AND r.location IS NOT NULL THEN CAST(ST_DistanceSphere(ab.location, r.location) AS REAL) ELSE NULL END AS distance,
-            CASE WHEN ab.location IS NOT NULL AND r.location IS NOT NULL THEN CAST(degrees(ST_Azimuth(ab.location, r.location)) AS SMALLINT) ELSE NULL END AS radial,
-            CASE WHEN ab.location IS NOT NULL AND r.location IS NOT NULL AND ST_DistanceSphere(ab.location, r.location) > 0 AND ab.signal_quality IS NOT NULL
-                 THEN CAST(signal_quality + 20*log(ST_DistanceSphere(ab.location, r.location)/10000) AS REAL)
-                 ELSE NULL
-            END AS quality,
-            CAST(ab.altitude - ST_Value(e.rast, ab.location) AS REAL) AS agl
-
-        INTO "aircraft_beacons_{0}_temp"
-        FROM "aircraft_beacons_{0}" AS ab, devices AS d, receivers AS r, elevation AS e
-        WHERE ab.address = d.address AND receiver_name = r.name AND ST_Intersects(e.rast, ab.location);
+            CAST(g.distance AS REAL) AS distance,
+            CAST(degrees(ST_Azimuth(ab.location, r.location)) AS SMALLINT) AS radial,
+            CASE WHEN g.distance > 0 THEN CAST(ab.signal_quality + 20*log(g.distance/10000) AS REAL) ELSE NULL END AS quality,
+            {2}
+
+        INTO {1} "aircraft_beacons_{0}_temp"
+        FROM "aircraft_beacons_{0}" AS ab
+        JOIN devices AS d ON ab.address = d.address
+        JOIN receivers AS r ON ab.receiver_name = r.name
+        CROSS JOIN LATERAL (SELECT ST_DistanceSphere(ab.location, r.location) AS distance) AS g
+        {3};
 
         DROP TABLE IF EXISTS "aircraft_beacons_{0}";
         ALTER TABLE "aircraft_beacons_{0}_temp" RENAME TO "aircraft_beacons_{0}";
     """.format(
-            postfix
-        )
-    )
-    db.session.commit()
-
-
-def delete_receiver_beacons(postfix):
-    """Delete beacons from table."""
-
-    db.session.execute(
-        """
-        DELETE FROM receiver_beacons_continuous_import AS rb
-        USING (
-            SELECT name, receiver_name, timestamp
-            FROM receiver_beacons_continuous_import
-            WHERE receiver_id IS NOT NULL
-        ) AS sq
-        WHERE rb.name = sq.name AND rb.receiver_name = sq.receiver_name AND rb.timestamp = sq.timestamp
-    """.format(
-            postfix
-        )
-    )
-    db.session.commit()
-
-
-def delete_aircraft_beacons(postfix):
-    """Delete beacons from table."""
-
-    db.session.execute(
-        """
-        DELETE FROM aircraft_beacons_continuous_import AS ab
-        USING (
-            SELECT name, receiver_name, timestamp
-            FROM aircraft_beacons_continuous_import
-            WHERE receiver_id IS NOT NULL and device_id IS NOT NULL
-        ) AS sq
-        WHERE ab.name = sq.name AND ab.receiver_name = sq.receiver_name AND ab.timestamp = sq.timestamp
-    """.format(
-            postfix
+            postfix, "UNLOGGED" if unlogged else "", agl, elevation_join
         )
     )
     db.session.commit()
@@ -337,8 +390,67 @@ def get_merged_receiver_beacons_subquery(postfix):
     )
 
 
-def transfer_aircraft_beacons(postfix):
-    query = """
+def get_insert_positions_and_receptions_query(source):
+    """Second part of a WITH query: insert the aircraft beacons of the CTE 'source' into the normalized tables. The position of a device
+       and timestamp is taken from the reception with the fewest errors, a later reception with fewer errors replaces it.
+       Beacons without receiver_id or device_id are dropped."""
+
+    update_columns = POSITION_COLUMNS[2:]
+
+    return """inserted_positions AS (
+        INSERT INTO positions({columns})
+        SELECT DISTINCT ON (device_id, timestamp) {columns}
+        FROM {source}
+        WHERE receiver_id IS NOT NULL AND device_id IS NOT NULL
+        ORDER BY device_id, timestamp, error_count
+        ON CONFLICT (device_id, timestamp) DO UPDATE SET ({update_columns}) = ({excluded_columns})
+        WHERE EXCLUDED.error_count < positions.error_count
+    )
+    INSERT INTO receptions({reception_columns})
+    SELECT {reception_columns}
+    FROM {source}
+    WHERE receiver_id IS NOT NULL AND device_id IS NOT NULL
+    ON CONFLICT DO NOTHING;
+    """.format(
+        source=source,
+        columns=", ".join(POSITION_COLUMNS),
+        update_columns=", ".join(update_columns),
+        excluded_columns=", ".join("EXCLUDED.{}".format(column) for column in update_columns),
+        reception_columns=", ".join(RECEPTION_COLUMNS),
+    )
+
+
+def transfer_aircraft_beacons(postfix, merged=False):
+    """Transfer the beacons with receiver_id and device_id into the table 'aircraft_beacons'. If merged is set the beacons
+       in the import table are already merged (one row per timestamp, name and receiver_name) and the GROUP BY is skipped."""
+
+    db.session.execute(get_transfer_aircraft_beacons_query(postfix, merged))
+    db.session.commit()
+
+
+def get_transfer_aircraft_beacons_query(postfix, merged=False, normalized=False):
+    if merged:
+        source = """
+        SELECT location, altitude, name, dstcall, relay, receiver_name, timestamp, track, ground_speed,
+            address_type, aircraft_type, stealth, address, climb_rate, turn_rate, signal_quality, error_count, frequency_offset, gps_quality_horizontal, gps_quality_vertical, software_version, hardware_version, real_address, signal_power,
+            distance, radial, quality, agl, location_mgrs, location_mgrs_short,
+            receiver_id, device_id
+        FROM "aircraft_beacons_{0}"
+        """.format(
+            postfix
+        )
+    else:
+        source = get_merged_aircraft_beacons_subquery(postfix)
+
+    if normalized:
+        return """
+    WITH source AS ({}),
+    {}
+    """.format(
+            source, get_insert_positions_and_receptions_query("source")
+        )
+
+    return """
     INSERT INTO aircraft_beacons(location, altitude, name, dstcall, relay, receiver_name, timestamp, track, ground_speed,
         address_type, aircraft_type, stealth, address, climb_rate, turn_rate, signal_quality, error_count, frequency_offset, gps_quality_horizontal, gps_quality_vertical, software_version, hardware_version, real_address, signal_power,
         distance, radial, quality, agl, location_mgrs, location_mgrs_short,
@@ -348,15 +460,36 @@ def transfer_aircraft_beacons(postfix):
     WHERE sq.receiver_id IS NOT NULL AND sq.device_id IS NOT NULL
     ON CONFLICT DO NOTHING;
     """.format(
-        get_merged_aircraft_beacons_subquery(postfix)
+        source
     )
 
-    db.session.execute(query)
+
+def transfer_receiver_beacons(postfix, merged=False):
+    """Transfer the beacons with receiver_id into the table 'receiver_beacons'. If merged is set the beacons
+       in the import table are already merged (one row per timestamp, name and receiver_name) and the GROUP BY is skipped."""
+
+    db.session.execute(get_transfer_receiver_beacons_query(postfix, merged))
     db.session.commit()
 
 
-def transfer_receiver_beacons(postfix):
-    query = """
+def get_transfer_receiver_beacons_query(postfix, merged=False):
+    if merged:
+        source = """
+        SELECT location, altitude, name, receiver_name, dstcall, timestamp,
+
+            version, platform, cpu_load, free_ram, total_ram, ntp_error, rt_crystal_correction, voltage,
+            amperage, cpu_temp, senders_visible, senders_total, rec_input_noise, senders_signal,
+            senders_messages, good_senders_signal, good_senders, good_and_bad_senders,
+
+            receiver_id
+        FROM "receiver_beacons_{0}"
+        """.format(
+            postfix
+        )
+    else:
+        source = get_merged_receiver_beacons_subquery(postfix)
+
+    return """
     INSERT INTO receiver_beacons(location, altitude, name, receiver_name, dstcall, timestamp,
 
         version, platform, cpu_load, free_ram, total_ram, ntp_error, rt_crystal_correction, voltage,
@@ -369,8 +502,70 @@ def transfer_receiver_beacons(postfix):
     WHERE sq.receiver_id IS NOT NULL
     ON CONFLICT DO NOTHING;
     """.format(
-        get_merged_receiver_beacons_subquery(postfix)
+        source
     )
 
-    db.session.execute(query)
-    db.session.commit()
+
+def get_move_aircraft_beacons_query(postfix, normalized=False):
+    """Moves the (already merged) beacons with import_seq <= $1 into the table 'aircraft_beacons' (or 'positions' and 'receptions').
+       Beacons without receiver_id or device_id are dropped."""
+
+    moved = """
+    WITH moved AS (
+        DELETE FROM "aircraft_beacons_{0}"
+        WHERE import_seq <= $1
+        RETURNING location, altitude, name, dstcall, relay, receiver_name, timestamp, track, ground_speed,
+            address_type, aircraft_type, stealth, address, climb_rate, turn_rate, signal_quality, error_count, frequency_offset, gps_quality_horizontal, gps_quality_vertical, software_version, hardware_version, real_address, signal_power,
+            distance, radial, quality, agl, location_mgrs, location_mgrs_short,
+            receiver_id, device_id
+    )""".format(
+        postfix
+    )
+
+    if normalized:
+        return moved + """,
+    {}""".format(
+            get_insert_positions_and_receptions_query("moved")
+        )
+
+    return moved + """
+    INSERT INTO aircraft_beacons(location, altitude, name, dstcall, relay, receiver_name, timestamp, track, ground_speed,
+        address_type, aircraft_type, stealth, address, climb_rate, turn_rate, signal_quality, error_count, frequency_offset, gps_quality_horizontal, gps_quality_vertical, software_version, hardware_version, real_address, signal_power,
+        distance, radial, quality, agl, location_mgrs, location_mgrs_short,
+        receiver_id, device_id)
+    SELECT m.*
+    FROM moved AS m
+    WHERE m.receiver_id IS NOT NULL AND m.device_id IS NOT NULL
+    ON CONFLICT DO NOTHING;
+    """
+
+
+def get_move_receiver_beacons_query(postfix):
+    """Moves the (already merged) beacons with import_seq <= $1 into the table 'receiver_beacons'. Beacons without receiver_id are dropped."""
+
+    return """
+    WITH moved AS (
+        DELETE FROM "receiver_beacons_{0}"
+        WHERE import_seq <= $1
+        RETURNING location, altitude, name, receiver_name, dstcall, timestamp,
+
+            version, platform, cpu_load, free_ram, total_ram, ntp_error, rt_crystal_correction, voltage,
+            amperage, cpu_temp, senders_visible, senders_total, rec_input_noise, senders_signal,
+            senders_messages, good_senders_signal, good_senders, good_and_bad_senders,
+
+            receiver_id
+    )
+    INSERT INTO receiver_beacons(location, altitude, name, receiver_name, dstcall, timestamp,
+
+        version, platform, cpu_load, free_ram, total_ram, ntp_error, rt_crystal_correction, voltage,
+        amperage, cpu_temp, senders_visible, senders_total, rec_input_noise, senders_signal,
+        senders_messages, good_senders_signal, good_senders, good_and_bad_senders,
+
+        receiver_id)
+    SELECT m.*
+    FROM moved AS m
+    WHERE m.receiver_id IS NOT NULL
+    ON CONFLICT DO NOTHING;
+    """.format(
+        postfix
+    )
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from time import monotonic
+
+# fields which differ between the receptions of the same aircraft beacon
+RECEPTION_FIELDS = ("receiver_name", "relay", "signal_quality", "error_count", "frequency_offset", "signal_power")
+
+
+def get_reception_field(token):
+    """Returns (field, value) if the comment token is measured by the receiver, otherwise None."""
+
+    try:
+        if token.endswith("dBm"):
+            return "signal_power", float(token[:-3])
+        elif token.endswith("dB"):
+            return "signal_quality", float(token[:-2])
+        elif token.endswith("kHz"):
+            return "frequency_offset", float(token[:-3])
+        elif token.endswith("e") and token[:-1].isdigit():
+            return "error_count", int(token[:-1])
+    except ValueError:
+        pass
+
+    return None
+
+
+def get_reception(raw_string):
+    """Split an APRS position line into (key, body, reception) or return None.
+
+       The key is (sender name, dstcall, body without the receiver dependent tokens), the body contains the timestamp.
+       reception: the receiver dependent fields (receiver_name, relay, signal_quality, error_count, frequency_offset, signal_power)."""
+
+    header, _, body = raw_string.partition(":")
+    if not body.startswith("/"):
+        return None
+
+    name, _, path = header.partition(">")
+    parts = path.split(",")
+    if len(parts) < 3:
+        return None
+
+    reception = dict.fromkeys(RECEPTION_FIELDS)
+    reception["receiver_name"] = parts[-1]
+    if parts[1].endswith("*") and parts[1][:-1].isalnum():
+        reception["relay"] = parts[1][:-1]
+
+    kept = []
+    for token in body.split(" "):
+        field = get_reception_field(token)
+        if field is None:
+            kept.append(token)
+        elif reception[field[0]] is None:
+            reception[field[0]] = field[1]
+        else:
+            # unknown format
+            return None
+
+    return (name, parts[0], " ".join(kept)), body, reception
+
+
+class ReceptionCache:
+    """Short-lived cache of parsed aircraft beacons. A beacon is often received by many receivers, the lines differ only
+       in the receiver (and relay) and the receiver measurements (signal quality, errors, frequency offset, signal power).
+       The first reception is parsed, the other receptions are a copy of it with their own receiver fields.
+
+       A beacon is only cached if the receiver fields which get_reception() found are equal to the parsed fields.
+       Entries are removed after window seconds or if there are more than max_size entries."""
+
+    def __init__(self, window=10, max_size=100000, max_reference_delta=timedelta(hours=1)):
+        self.window = window
+        self.max_size = max_size
+        self.max_reference_delta = max_reference_delta
+
+        # key -> (insert time, message, comment offset in the body)
+        self.messages = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def get(self, reception, raw_string, reference_date):
+        """Returns the parsed message for the raw string (a new dict) or None if the beacon is not cached."""
+
+        key, body, fields = reception
+        entry = self.messages.get(key)
+        if entry is None or abs(reference_date - entry[1]["reference_timestamp"]) > self.max_reference_delta:
+            self.misses += 1
+            return None
+
+        _, cached, comment_offset = entry
+        message = dict(cached)
+        message.update(fields)
+        message["raw_message"] = raw_string
+        message["reference_timestamp"] = reference_date
+        if comment_offset is not None:
+            message["comment"] = body[comment_offset:]
+
+        self.hits += 1
+        return message
+
+    def add(self, reception, message, now=None):
+        key, body, fields = reception
+        if any(message.get(field) != value for field, value in fields.items()):
+            return
+
+        if now is None:
+            now = monotonic()
+
+        comment = message.get("comment")
+        comment_offset = len(body) - len(comment) if comment else None
+        self.messages.pop(key, None)
+        self.messages[key] = (now, dict(message), comment_offset)
+
+        # the entries are ordered by their insert time
+        while self.messages:
+            first_key = next(iter(self.messages))
+            if now - self.messages[first_key][0] < self.window and len(self.messages) <= self.max_size:
+                break
+            del self.messages[first_key]
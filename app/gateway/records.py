@@ -0,0 +1,21 @@
+from collections import namedtuple
+
+
+def make_record_type(name, fields, location_field="location"):
+    """Returns a compact record type (namedtuple, no instance dict) for beacons with the given fields in this order.
+
+       The record type has a precomputed map field -> index ('index') and builds records from parsed messages ('from_message').
+       The location field holds the tuple (longitude, latitude) or None."""
+
+    base = namedtuple(name, fields)
+    index = {field: i for i, field in enumerate(fields)}
+    location_index = index.get(location_field)
+
+    def from_message(cls, message):
+        values = [message.get(field) for field in fields]
+        if location_index is not None:
+            values[location_index] = (message["longitude"], message["latitude"]) if "latitude" in message else None
+
+        return tuple.__new__(cls, values)
+
+    return type(name, (base,), {"__slots__": (), "index": index, "location_index": location_index, "from_message": classmethod(from_message)})
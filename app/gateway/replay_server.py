@@ -0,0 +1,244 @@
+import asyncio
+import re
+from datetime import datetime
+from time import monotonic
+
+from app.utils import open_file
+from app import app
+
+# the APRS timestamp (HHMMSS) of position and status beacons
+TIMESTAMP_PATTERN = re.compile(r":([/>])([0-2][0-9])([0-5][0-9])([0-5][0-9])h")
+
+SERVER_NAME = "GLIDERN1"
+SERVER_VERSION = "2.1.4-g408ed49"
+
+
+def get_line_seconds(raw_string):
+    """Returns the seconds of the day of the APRS timestamp or None if the line has no timestamp."""
+
+    match = TIMESTAMP_PATTERN.search(raw_string)
+    if match is None:
+        return None
+
+    return int(match.group(2)) * 3600 + int(match.group(3)) * 60 + int(match.group(4))
+
+
+def rewrite_timestamp(raw_string, timestamp):
+    """Replace the APRS timestamp of the line with the given time."""
+
+    return TIMESTAMP_PATTERN.sub(lambda match: ":{}{:%H%M%S}h".format(match.group(1), timestamp), raw_string, count=1)
+
+
+def read_log(filename):
+    """Yields (seconds since the first timestamp, raw_string) of an APRS log file. Lines without timestamp get the time of the line before.
+       Midnight is handled and late beacons don't go back in time."""
+
+    first = None
+    offset = 0
+    current = 0
+
+    with open_file(filename) as fin:
+        for line in fin:
+            raw_string = line.rstrip("\r\n")
+            if not raw_string:
+                continue
+
+            seconds = get_line_seconds(raw_string)
+            if seconds is not None:
+                if first is None:
+                    first = seconds
+
+                seconds = seconds - first + offset
+                if seconds < current - 12 * 3600:
+                    # next day
+                    offset += 24 * 3600
+                    seconds += 24 * 3600
+
+                current = max(current, seconds)
+
+            yield current, raw_string
+
+
+class ReplayClient:
+    def __init__(self, writer, buffer_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.connected = monotonic()
+        self.name = None
+
+
+class ReplayServer:
+    """Local stand-in for an APRS-IS server (aprsc) which replays an APRS log file.
+
+       Clients login like at aprs.glidernet.org ('user ... pass ... vers ...') and get the stream of all lines (the filter is ignored).
+       The lines are played at speed times the original rate (by their APRS timestamps) to all connected clients, like a live feed
+       a reconnecting client misses the lines in between. With rewrite_timestamps the timestamps are set to the send time.
+
+       Fault injection: every disconnect_interval seconds all clients are disconnected and every stall_interval seconds the server
+       stops sending (lines and keepalives) for stall_duration seconds. Slow clients are disconnected if their buffer is full."""
+
+    def __init__(self, filename, speed=1.0, loop=False, rewrite_timestamps=False, disconnect_interval=0, stall_interval=0, stall_duration=0, keepalive_interval=20, buffer_size=100000):
+        self.filename = filename
+        self.speed = speed
+        self.loop = loop
+        self.rewrite_timestamps = rewrite_timestamps
+        self.disconnect_interval = disconnect_interval
+        self.stall_interval = stall_interval
+        self.stall_duration = stall_duration
+        self.keepalive_interval = keepalive_interval
+        self.buffer_size = buffer_size
+
+        self.clients = set()
+        self.stalled = False
+        self.finished = None
+        self.tasks = []
+
+        self.stats = {"sent": 0, "dropped": 0, "connects": 0, "disconnects": 0, "stalls": 0, "slow_clients": 0}
+
+    def run(self, host, port):
+        """Serve until KeyboardInterrupt (or the end of the log if loop is not set)."""
+
+        try:
+            asyncio.run(self.main(host, port))
+        except KeyboardInterrupt:
+            app.logger.warning("\nStop replay server")
+
+    async def main(self, host, port):
+        server = await self.start(host, port)
+        app.logger.warning("Replay {} on {}:{} with speed {}".format(self.filename, host, server.sockets[0].getsockname()[1], self.speed))
+
+        async with server:
+            await self.finished.wait()
+            await self.close_clients()
+
+        app.logger.warning("Replay finished: {}".format(self.stats))
+
+    async def start(self, host, port):
+        """Start the server and the player. Returns the asyncio server (port 0 gives a free port)."""
+
+        self.finished = asyncio.Event()
+        server = await asyncio.start_server(self.handle_client, host, port)
+
+        tasks = [self.play()]
+        if self.disconnect_interval > 0:
+            tasks.append(self.inject_disconnects())
+        if self.stall_interval > 0 and self.stall_duration > 0:
+            tasks.append(self.inject_stalls())
+        tasks.append(self.send_keepalives())
+
+        self.tasks = [asyncio.ensure_future(task) for task in tasks]
+        return server
+
+    async def handle_client(self, reader, writer):
+        client = ReplayClient(writer, self.buffer_size)
+        self.clients.add(client)
+        self.stats["connects"] += 1
+
+        try:
+            writer.write("# aprsc {}\r\n".format(SERVER_VERSION).encode())
+            await writer.drain()
+
+            login = await reader.readline()
+            parts = login.decode(errors="replace").split()
+            client.name = parts[1] if len(parts) > 1 and parts[0] == "user" else "unknown"
+            writer.write("# logresp {} unverified, server {}\r\n".format(client.name, SERVER_NAME).encode())
+            await writer.drain()
+            app.logger.info("Client {} connected".format(client.name))
+
+            # the keepalives of the client are ignored
+            read_task = asyncio.ensure_future(self.discard_input(reader))
+            try:
+                while True:
+                    line = await client.queue.get()
+                    if line is None:
+                        break
+
+                    writer.write(line)
+                    await writer.drain()
+            finally:
+                read_task.cancel()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+            app.logger.info("Client {} disconnected".format(client.name))
+
+    async def discard_input(self, reader):
+        while await reader.readline():
+            pass
+
+    def broadcast(self, line):
+        data = (line + "\r\n").encode()
+        for client in list(self.clients):
+            try:
+                client.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # aprsc disconnects clients which don't read fast enough
+                self.stats["slow_clients"] += 1
+                self.disconnect(client)
+
+    def disconnect(self, client):
+        self.clients.discard(client)
+        while not client.queue.empty():
+            client.queue.get_nowait()
+        client.queue.put_nowait(None)
+
+    async def close_clients(self):
+        for client in list(self.clients):
+            self.disconnect(client)
+
+        for task in self.tasks:
+            task.cancel()
+
+    async def play(self):
+        try:
+            while True:
+                start = monotonic()
+                for seconds, raw_string in read_log(self.filename):
+                    delay = start + seconds / self.speed - monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                    if self.stalled or not self.clients:
+                        self.stats["dropped"] += 1
+                        continue
+
+                    if self.rewrite_timestamps:
+                        raw_string = rewrite_timestamp(raw_string, datetime.utcnow())
+
+                    self.broadcast(raw_string)
+                    self.stats["sent"] += 1
+
+                    # give the clients a chance to send if we are late
+                    if self.stats["sent"] % 1000 == 0:
+                        await asyncio.sleep(0)
+
+                if not self.loop:
+                    break
+        finally:
+            self.finished.set()
+
+    async def inject_disconnects(self):
+        while True:
+            await asyncio.sleep(self.disconnect_interval)
+            app.logger.warning("Disconnect {} clients".format(len(self.clients)))
+            for client in list(self.clients):
+                self.disconnect(client)
+                self.stats["disconnects"] += 1
+
+    async def inject_stalls(self):
+        while True:
+            await asyncio.sleep(self.stall_interval)
+            app.logger.warning("Stall for {}s".format(self.stall_duration))
+            self.stalled = True
+            self.stats["stalls"] += 1
+            await asyncio.sleep(self.stall_duration)
+            self.stalled = False
+
+    async def send_keepalives(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            if not self.stalled:
+                now = datetime.utcnow()
+                self.broadcast("# aprsc {} {:%d %b %Y %H:%M:%S} GMT {} 127.0.0.1:14580".format(SERVER_VERSION, now, SERVER_NAME))
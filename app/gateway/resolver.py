@@ -0,0 +1,98 @@
+from app.gateway.process_tools import lock_keys
+
+from app import db
+
+
+class IdResolver:
+    """Keeps the mappings receiver name -> receiver id and device address -> device id in memory.
+       Unknown names/addresses are collected and inserted in small batches with resolve()."""
+
+    def __init__(self, batch_size=100):
+        self.batch_size = batch_size
+
+        self.receiver_ids = {}
+        self.device_ids = {}
+
+        self.missing_receivers = set()
+        self.missing_devices = set()
+
+        self.load()
+
+    def load(self):
+        """Load all known receivers and devices. For duplicate names/addresses the lowest id wins."""
+
+        self.receiver_ids = {name: id for name, id in db.session.execute("SELECT name, MIN(id) FROM receivers WHERE name IS NOT NULL GROUP BY name")}
+        self.device_ids = {address: id for address, id in db.session.execute("SELECT address, MIN(id) FROM devices WHERE address IS NOT NULL GROUP BY address")}
+
+    def get_receiver_id(self, name):
+        """Returns the receiver id or None if the receiver is unknown (then it will be inserted with the next resolve())."""
+
+        if name is None:
+            return None
+
+        receiver_id = self.receiver_ids.get(name)
+        if receiver_id is None:
+            self.missing_receivers.add(name)
+        return receiver_id
+
+    def get_device_id(self, address):
+        """Returns the device id or None if the device is unknown (then it will be inserted with the next resolve())."""
+
+        if address is None:
+            return None
+
+        device_id = self.device_ids.get(address)
+        if device_id is None:
+            self.missing_devices.add(address)
+        return device_id
+
+    def has_missing(self):
+        return len(self.missing_receivers) > 0 or len(self.missing_devices) > 0
+
+    def resolve(self):
+        """Insert missing receivers and devices and add their ids to the mappings."""
+
+        missing_receivers = sorted(self.missing_receivers)
+        for i in range(0, len(missing_receivers), self.batch_size):
+            self.receiver_ids.update(insert_missing_keys("receivers", "name", missing_receivers[i : i + self.batch_size]))
+        self.missing_receivers = set()
+
+        missing_devices = sorted(self.missing_devices)
+        for i in range(0, len(missing_devices), self.batch_size):
+            self.device_ids.update(insert_missing_keys("devices", "address", missing_devices[i : i + self.batch_size]))
+        self.missing_devices = set()
+
+
+def insert_missing_keys(table, column, keys):
+    """Insert the keys which are not in the table and return the mapping key -> id for all given keys."""
+
+    lock_keys()
+    result = db.session.execute(
+        """
+        WITH missing AS (
+            SELECT DISTINCT UNNEST(CAST(:keys AS VARCHAR[])) AS key
+        ), existing AS (
+            SELECT t.{column} AS key, MIN(t.id) AS id
+            FROM {table} AS t, missing AS m
+            WHERE t.{column} = m.key
+            GROUP BY t.{column}
+        ), inserted AS (
+            INSERT INTO {table}({column})
+            SELECT m.key
+            FROM missing AS m
+            WHERE NOT EXISTS (SELECT 1 FROM existing AS e WHERE e.key = m.key)
+            ORDER BY m.key
+            RETURNING {column} AS key, id
+        )
+        SELECT key, id FROM existing
+        UNION ALL
+        SELECT key, id FROM inserted;
+    """.format(
+            table=table, column=column
+        ),
+        {"keys": keys},
+    )
+    mapping = {key: id for key, id in result}
+    db.session.commit()
+
+    return mapping
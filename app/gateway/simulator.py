@@ -0,0 +1,297 @@
+import math
+import random
+from datetime import datetime, timedelta
+
+# meters per degree latitude (and longitude at the equator)
+METERS_PER_DEGREE = 111195.0
+
+FEET_PER_METER = 3.28084
+KNOTS_PER_MS = 1.94384
+FPM_PER_MS = 196.85
+
+# aircraft types (see ogn-parser) with (details byte of FLARM, details byte of OGN tracker, APRS symbol)
+GLIDER = (0x06, 0x07, "'")
+TOW_PLANE = (0x0A, 0x0B, "X")
+
+
+def format_latitude(latitude):
+    """Returns the APRS latitude (DDMM.MM) and the third decimal place of the minutes (for the !Wxy! precision enhancement)."""
+
+    thousandths = int(round(abs(latitude) * 60000))
+    degrees, rest = divmod(thousandths, 60000)
+    return "{:02d}{:02d}.{:02d}{}".format(degrees, rest // 1000, (rest // 10) % 100, "N" if latitude >= 0 else "S"), rest % 10
+
+
+def format_longitude(longitude):
+    thousandths = int(round(abs(longitude) * 60000))
+    degrees, rest = divmod(thousandths, 60000)
+    return "{:03d}{:02d}.{:02d}{}".format(degrees, rest // 1000, (rest // 10) % 100, "E" if longitude >= 0 else "W"), rest % 10
+
+
+def move(longitude, latitude, course, distance):
+    """Move the point by distance (meters) in the direction of course (degrees, clockwise from north). Flat earth is good enough here."""
+
+    latitude_new = latitude + distance * math.cos(math.radians(course)) / METERS_PER_DEGREE
+    longitude_new = longitude + distance * math.sin(math.radians(course)) / (METERS_PER_DEGREE * math.cos(math.radians(latitude)))
+    return longitude_new, latitude_new
+
+
+def distance_and_course(longitude1, latitude1, longitude2, latitude2):
+    dx = (longitude2 - longitude1) * METERS_PER_DEGREE * math.cos(math.radians(latitude1))
+    dy = (latitude2 - latitude1) * METERS_PER_DEGREE
+    return math.hypot(dx, dy), math.degrees(math.atan2(dx, dy)) % 360
+
+
+class SimulatedReceiver:
+    def __init__(self, name, longitude, latitude, altitude, rng):
+        self.name = name
+        self.longitude = longitude
+        self.latitude = latitude
+        self.altitude = altitude
+
+        self.platform = rng.choice(["RPI-GPU", "ARM", "x64"])
+        self.ram_total = rng.choice([456.5, 970.2, 3906.0])
+        self.ntp_correction = rng.uniform(-30, 30)
+        self.rf_correction = rng.randint(-60, 90)
+        self.noise = rng.uniform(-1, 8)
+
+        # the status beacons are not sent by all receivers at the same time
+        self.offset = rng.randint(0, 299)
+
+        self.heard = set()
+        self.messages = 0
+
+    def position_line(self, timestamp):
+        latitude, _ = format_latitude(self.latitude)
+        longitude, _ = format_longitude(self.longitude)
+        return "{}>OGNSDR,TCPIP*,qAC,GLIDERN1:/{:%H%M%S}h{}I{}&/A={:06d}".format(self.name, timestamp, latitude, longitude, int(self.altitude * FEET_PER_METER))
+
+    def status_line(self, timestamp, rng):
+        line = "{}>OGNSDR,TCPIP*,qAC,GLIDERN1:>{:%H%M%S}h v0.2.8.{} CPU:{:.1f} RAM:{:.1f}/{:.1f}MB NTP:{:.1f}ms/{:+.1f}ppm {:+.1f}C {}/{}Acfts[1h] RF:{:+d}{:+.1f}ppm/{:+.2f}dB/{:+.1f}dB@10km[{}]".format(
+            self.name,
+            timestamp,
+            self.platform,
+            rng.uniform(0.1, 1.5),
+            rng.uniform(0.2, 0.8) * self.ram_total,
+            self.ram_total,
+            rng.uniform(0.1, 5.0),
+            self.ntp_correction,
+            rng.uniform(35, 60),
+            len(self.heard),
+            len(self.heard) + rng.randint(0, 3),
+            self.rf_correction,
+            rng.uniform(-1, 1),
+            self.noise,
+            rng.uniform(5, 20),
+            self.messages,
+        )
+        self.heard = set()
+        self.messages = 0
+        return line
+
+
+class SimulatedAircraft:
+    """A glider (or tow plane) with a simple flight: takeoff, thermals and glides, return to the airfield and landing.
+
+       States: 'ground' (before takeoff), 'takeoff' (climb straight ahead), 'thermal' (circling in lift), 'glide' (straight flight with sink),
+       'landing' (final glide back to the airfield) and 'landed' (some beacons on the ground, then silent)."""
+
+    def __init__(self, address, airfield, takeoff_time, flight_duration, rng):
+        self.address = address
+        self.is_flarm = rng.random() < 0.8
+        self.aircraft_type = TOW_PLANE if rng.random() < 0.1 else GLIDER
+        self.name = ("FLR" if self.is_flarm else "OGN") + address
+
+        self.airfield = airfield
+        self.longitude, self.latitude, self.elevation = airfield
+        self.altitude = self.elevation
+        self.course = rng.randint(0, 359)
+        self.speed = 0.0
+        self.climb_rate = 0.0
+        self.turn_rate = 0.0
+
+        self.state = "ground"
+        self.takeoff_time = takeoff_time
+        self.landing_time = takeoff_time + flight_duration
+        self.state_seconds = 0
+        self.target_altitude = 0
+
+        self.gps = (rng.randint(1, 4), rng.randint(1, 5))
+
+    def is_sending(self, timestamp):
+        if self.state == "ground":
+            return timestamp.second % 20 == 0
+        elif self.state == "landed":
+            return self.state_seconds < 60 and timestamp.second % 5 == 0
+        else:
+            return True
+
+    def step(self, timestamp, rng):
+        """Advance the aircraft by one second."""
+
+        self.state_seconds += 1
+
+        if self.state == "ground":
+            if timestamp >= self.takeoff_time:
+                self._enter("takeoff")
+                self.target_altitude = self.elevation + rng.uniform(400, 700)
+        elif self.state == "takeoff":
+            self.speed = min(self.speed + 3, 35.0)
+            self.climb_rate = 3.0 if self.speed > 25 else 0.0
+            self.turn_rate = 0.0
+            if self.altitude >= self.target_altitude:
+                self._enter_thermal(rng)
+        elif self.state == "thermal":
+            self.speed = 25.0 + rng.uniform(-2, 2)
+            self.turn_rate = self.thermal_turn_rate
+            self.climb_rate = self.thermal_climb_rate + rng.uniform(-0.5, 0.5)
+            if self.altitude >= self.target_altitude:
+                self._enter("glide")
+                self.course = rng.randint(0, 359)
+                self.glide_speed = rng.uniform(28, 42)
+                self.target_altitude = self.elevation + rng.uniform(500, 800)
+        elif self.state == "glide":
+            self.speed = self.glide_speed
+            self.turn_rate = 0.0
+            self.climb_rate = -1.0 + rng.uniform(-0.3, 0.3)
+            if timestamp >= self.landing_time:
+                self._enter("landing")
+            elif self.altitude <= self.target_altitude or rng.random() < 0.005:
+                self._enter_thermal(rng)
+        elif self.state == "landing":
+            distance, course = distance_and_course(self.longitude, self.latitude, self.airfield[0], self.airfield[1])
+            self.turn_rate = 0.0
+            self.course = course
+            self.speed = 30.0 if distance > 500 else max(self.speed - 3, 0.0)
+            height = self.altitude - self.elevation
+            self.climb_rate = -min(max(height * self.speed / max(distance, 100.0), 0.5), 5.0) if height > 0 else 0.0
+            if height <= 0 and self.speed == 0.0:
+                self._enter("landed")
+        elif self.state == "landed":
+            self.speed = 0.0
+            self.climb_rate = 0.0
+            self.turn_rate = 0.0
+
+        self.course = (self.course + self.turn_rate) % 360
+        self.longitude, self.latitude = move(self.longitude, self.latitude, self.course, self.speed)
+        self.altitude = max(self.altitude + self.climb_rate, self.elevation)
+
+    def _enter(self, state):
+        self.state = state
+        self.state_seconds = 0
+
+    def _enter_thermal(self, rng):
+        self._enter("thermal")
+        self.thermal_turn_rate = rng.choice([-1, 1]) * rng.uniform(12, 18)
+        self.thermal_climb_rate = rng.uniform(0.5, 3.5)
+        self.target_altitude = min(self.altitude + rng.uniform(300, 1200), self.elevation + rng.uniform(1500, 2500))
+
+    def beacon_body(self, timestamp):
+        """The part of the line after 'name>dstcall,qAS,receiver:' without the receiver dependent fields."""
+
+        latitude, latitude_enhancement = format_latitude(self.latitude)
+        longitude, longitude_enhancement = format_longitude(self.longitude)
+        details = self.aircraft_type[0] if self.is_flarm else self.aircraft_type[1]
+
+        return "/{:%H%M%S}h{}/{}{}{:03d}/{:03d}/A={:06d} !W{}{}! id{:02X}{} {:+04d}fpm {:+.1f}rot".format(
+            timestamp,
+            latitude,
+            longitude,
+            self.aircraft_type[2],
+            int(self.course) % 360,
+            int(self.speed * KNOTS_PER_MS),
+            int(self.altitude * FEET_PER_METER),
+            latitude_enhancement,
+            longitude_enhancement,
+            details,
+            self.address,
+            int(self.climb_rate * FPM_PER_MS),
+            self.turn_rate / 3.0,
+        )
+
+    def line(self, timestamp, receiver, signal_quality, error_count, frequency_offset):
+        return "{}>{},qAS,{}:{} {:.1f}dB {}e {:+.1f}kHz gps{}x{}".format(
+            self.name, "OGFLR" if self.is_flarm else "OGNTRK", receiver.name, self.beacon_body(timestamp), signal_quality, error_count, frequency_offset, self.gps[0], self.gps[1]
+        )
+
+
+class TrafficSimulator:
+    """Generates realistic OGN APRS traffic: aircraft with takeoffs, thermals and landings around some airfields,
+       received by the receivers within reception_range (each reception is a separate line like on the full feed),
+       plus position and status beacons of the receivers every 5 minutes.
+
+       The traffic is deterministic for a given seed."""
+
+    def __init__(self, aircraft_count=100, receiver_count=50, airfield_count=10, center=(11.0, 48.0), radius=100000, reception_range=50000, max_receptions=5, start=None, seed=0):
+        self.rng = random.Random(seed)
+        self.start = start or datetime.utcnow().replace(microsecond=0)
+        self.reception_range = reception_range
+        self.max_receptions = max_receptions
+
+        self.receivers = []
+        for i in range(receiver_count):
+            longitude, latitude = self._random_point(center, radius)
+            self.receivers.append(SimulatedReceiver("Sim{:05d}".format(i), longitude, latitude, self.rng.uniform(300, 1500), self.rng))
+
+        airfields = []
+        for i in range(airfield_count):
+            longitude, latitude = self._random_point(center, radius)
+            airfields.append((longitude, latitude, self.rng.uniform(300, 800)))
+
+        self.aircraft = []
+        addresses = set()
+        while len(self.aircraft) < aircraft_count:
+            address = "{:06X}".format(self.rng.randint(0, 0xFFFFFF))
+            if address in addresses:
+                continue
+            addresses.add(address)
+
+            takeoff_time = self.start + timedelta(seconds=self.rng.randint(0, 1800))
+            flight_duration = timedelta(seconds=self.rng.randint(1800, 4 * 3600))
+            self.aircraft.append(SimulatedAircraft(address, self.rng.choice(airfields), takeoff_time, flight_duration, self.rng))
+
+    def _random_point(self, center, radius):
+        distance = radius * math.sqrt(self.rng.random())
+        return move(center[0], center[1], self.rng.uniform(0, 360), distance)
+
+    def receptions(self, aircraft):
+        """Returns the receivers which hear the aircraft with (receiver, signal_quality, error_count), the nearest first."""
+
+        result = []
+        for receiver in self.receivers:
+            distance, _ = distance_and_course(receiver.longitude, receiver.latitude, aircraft.longitude, aircraft.latitude)
+            if distance <= self.reception_range:
+                result.append((distance, receiver))
+        result.sort(key=lambda x: x[0])
+
+        receptions = []
+        for distance, receiver in result[: self.max_receptions]:
+            # free space path loss, normalized to 10km like the quality column
+            signal_quality = max(10.0 - 20 * math.log10(max(distance, 100.0) / 10000) + self.rng.uniform(-3, 3), 0.0)
+            error_count = 0 if self.rng.random() < 0.9 else self.rng.randint(1, 5)
+            receptions.append((receiver, signal_quality, error_count))
+
+        return receptions
+
+    def lines(self, duration):
+        """Yields (timestamp, raw_string) for duration seconds, in chronological order."""
+
+        for second in range(int(duration)):
+            timestamp = self.start + timedelta(seconds=second)
+            seconds_of_day = timestamp.hour * 3600 + timestamp.minute * 60 + timestamp.second
+
+            for receiver in self.receivers:
+                if (seconds_of_day + receiver.offset) % 300 == 0:
+                    yield timestamp, receiver.position_line(timestamp)
+                elif (seconds_of_day + receiver.offset) % 300 == 1:
+                    yield timestamp, receiver.status_line(timestamp, self.rng)
+
+            for aircraft in self.aircraft:
+                aircraft.step(timestamp, self.rng)
+                if not aircraft.is_sending(timestamp):
+                    continue
+
+                for receiver, signal_quality, error_count in self.receptions(aircraft):
+                    receiver.heard.add(aircraft.address)
+                    receiver.messages += 1
+                    yield timestamp, aircraft.line(timestamp, receiver, signal_quality, error_count, self.rng.uniform(-5, 5))
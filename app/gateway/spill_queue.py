@@ -0,0 +1,72 @@
+import tempfile
+from collections import deque
+
+
+class SpillQueue:
+    """FIFO queue of received lines (receive time, line as bytes) which never blocks the reader.
+
+       Up to memory_limit lines are kept in memory, further lines are written into a temporary file. The lines are read back
+       (in order) when the queue in memory is empty. The file is truncated when it is read completely.
+
+       The temporary file is not durable (it is gone after a crash). The gateway writes every line into the spool before it is put
+       into the queue, so the spilled lines are replayed from the spool and the spool acknowledges only parsed lines."""
+
+    def __init__(self, memory_limit=10000, spill_dir=None, read_size=1000):
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.read_size = read_size
+
+        self.memory = deque()
+        self.file = None
+        self.write_position = 0
+        self.read_position = 0
+        self.spilled = 0
+
+        # total number of spilled lines (for the statistics)
+        self.spilled_total = 0
+
+    def __len__(self):
+        return len(self.memory) + self.spilled
+
+    def put(self, received, line):
+        if self.spilled == 0 and len(self.memory) < self.memory_limit:
+            self.memory.append((received, line))
+            return
+
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(dir=self.spill_dir)
+
+        self.file.seek(self.write_position)
+        self.file.write(b"%.6f " % received + line.rstrip(b"\r\n") + b"\n")
+        self.write_position = self.file.tell()
+        self.spilled += 1
+        self.spilled_total += 1
+
+    def get(self):
+        """Returns (received, line) or None if the queue is empty."""
+
+        if not self.memory and self.spilled > 0:
+            self._read_spilled()
+
+        if self.memory:
+            return self.memory.popleft()
+        else:
+            return None
+
+    def _read_spilled(self):
+        self.file.seek(self.read_position)
+        for _ in range(min(self.read_size, self.spilled)):
+            received, _, line = self.file.readline().partition(b" ")
+            self.memory.append((float(received), line))
+            self.spilled -= 1
+        self.read_position = self.file.tell()
+
+        if self.spilled == 0:
+            self.file.seek(0)
+            self.file.truncate()
+            self.write_position = self.read_position = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,180 @@
+import fcntl
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime
+from time import monotonic, time
+
+SEGMENT_PATTERN = re.compile(r"^spool_([0-9]{12})\.log$")
+LOCK_FILENAME = "spool.lock"
+
+
+class Spool:
+    """Append-only log of the received raw lines, written before the lines are queued or parsed.
+
+       The log is split into segments (spool_000000000001.log, ...). Each line has the reception time (epoch seconds) as prefix.
+       The feeder takes a mark when it writes a batch and acknowledges the mark after the batch is transfered into the final tables,
+       then all segments before the mark are deleted. Remaining segments can be replayed with replay_spool().
+       The data is fsynced at least every fsync_interval seconds, so a crash loses at most the lines of this interval.
+       The spool holds a lock on the directory, so only one process writes and replays it."""
+
+    def __init__(self, path, segment_size=64 * 1024 * 1024, fsync_interval=1.0):
+        self.path = path
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+
+        self.lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self.lock_file = acquire_lock(path)
+        if self.lock_file is None:
+            raise RuntimeError("Spool {} is used by another process".format(path))
+
+        existing = get_segments(path)
+        self.segment = existing[-1][0] + 1 if existing else 1
+        self.file = None
+        self.written = 0
+        self.last_sync = monotonic()
+
+        # number of appended lines and (segment, number of appended lines at its end) of the closed segments
+        self.appended = 0
+        self.segment_ends = deque()
+
+    def append(self, raw_string, received=None):
+        line = "{:.3f} {}\n".format(time() if received is None else received, raw_string)
+
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.segment_path(self.segment), "a", encoding="utf-8", errors="replace")
+                self.written = 0
+
+            self.file.write(line)
+            self.written += len(line)
+            self.appended += 1
+
+            if self.written >= self.segment_size:
+                self._rotate()
+            elif monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+
+    def mark(self, processed=None):
+        """Start a new segment and return its number. All lines appended before are in segments with a lower number.
+
+           If the lines are appended ahead of the processing (e.g. by the reader before they are queued), processed is the number of
+           appended lines which are processed. Then the mark is the first segment with unprocessed lines."""
+
+        with self.lock:
+            if self.file is not None:
+                self._rotate()
+
+            if processed is not None:
+                for segment, end in self.segment_ends:
+                    if end > processed:
+                        return segment
+            return self.segment
+
+    def acknowledge(self, mark):
+        """Delete all segments before the mark."""
+
+        for segment, filename in get_segments(self.path):
+            if segment < mark:
+                os.remove(filename)
+
+        with self.lock:
+            while self.segment_ends and self.segment_ends[0][0] < mark:
+                self.segment_ends.popleft()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self._sync()
+                self.file.close()
+                self.file = None
+
+            if self.lock_file is not None:
+                self.lock_file.close()
+                self.lock_file = None
+
+    def segment_path(self, segment):
+        return os.path.join(self.path, "spool_{:012d}.log".format(segment))
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_sync = monotonic()
+
+    def _rotate(self):
+        self._sync()
+        self.file.close()
+        self.file = None
+        self.segment_ends.append((self.segment, self.appended))
+        self.segment += 1
+
+
+def acquire_lock(path):
+    """Returns the open lock file of the spool directory or None if another process holds the lock. Closing the file releases the lock."""
+
+    lock_file = open(os.path.join(path, LOCK_FILENAME), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+
+    return lock_file
+
+
+def get_segments(path):
+    """Returns the spool segments in the directory as sorted list of (segment number, filename)."""
+
+    if not os.path.isdir(path):
+        return []
+
+    segments = []
+    for filename in os.listdir(path):
+        match = SEGMENT_PATTERN.match(filename)
+        if match:
+            segments.append((int(match.group(1)), os.path.join(path, filename)))
+
+    return sorted(segments)
+
+
+def read_segment(filename):
+    """Yields (reception time as datetime, raw_string) of a spool segment. An incomplete last line (crash while writing) is skipped."""
+
+    with open(filename, encoding="utf-8", errors="replace") as fin:
+        for line in fin:
+            if not line.endswith("\n"):
+                break
+
+            received, _, raw_string = line.rstrip("\n").partition(" ")
+            try:
+                yield datetime.utcfromtimestamp(float(received)), raw_string
+            except ValueError:
+                continue
+
+
+def replay_spool(path, saver):
+    """Feed all segments of the spool into the saver and transfer the beacons. Returns the number of replayed lines.
+       Beacons which are already in the database are skipped by the transfer (ON CONFLICT DO NOTHING)."""
+
+    segments = get_segments(path)
+    if not segments:
+        return 0
+
+    count = 0
+    for _, filename in segments:
+        for received, raw_string in read_segment(filename):
+            saver.parse(raw_string, reference_date=received)
+            count += 1
+
+            if saver.buffered_count() >= 100000:
+                saver.flush()
+
+    saver.finish()
+
+    for _, filename in segments:
+        os.remove(filename)
+
+    return count
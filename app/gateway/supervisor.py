@@ -0,0 +1,97 @@
+import os
+import signal
+import time
+from multiprocessing import Process
+
+from app import db, app
+
+
+class Supervisor:
+    """Runs the gateway workers in separate processes and restarts a worker if it dies.
+
+       target(**kwargs) is called in each worker process with the kwargs of the worker. A worker which exits with code 0 is finished,
+       otherwise it is restarted after restart_delay seconds. Ctrl-C stops the workers (they get the SIGINT from the terminal),
+       a SIGTERM of the supervisor is forwarded as SIGINT."""
+
+    def __init__(self, target, worker_kwargs, restart_delay=5):
+        self.target = target
+        self.worker_kwargs = worker_kwargs
+        self.restart_delay = restart_delay
+
+        self.processes = {}
+        self.restart_at = {}
+        self.restarts = 0
+
+    def start_worker(self, index):
+        # the forked process must not inherit the connections of this process
+        db.session.close()
+        db.engine.dispose()
+
+        process = Process(target=self.target, kwargs=self.worker_kwargs[index], name="gateway-worker-{}".format(index))
+        process.start()
+        self.processes[index] = process
+        app.logger.info("Started worker {} (pid {})".format(index, process.pid))
+
+    def run(self):
+        """Run until all workers are finished or the supervisor is stopped."""
+
+        def terminate(signum, frame):
+            raise SystemExit(0)
+
+        previous_handler = signal.signal(signal.SIGTERM, terminate)
+        try:
+            for index in range(len(self.worker_kwargs)):
+                self.start_worker(index)
+
+            while self.processes or self.restart_at:
+                self.check_workers()
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            app.logger.warning("\nStop gateway workers")
+            self.stop()
+        except SystemExit:
+            app.logger.warning("Stop gateway workers")
+            self.stop(forward_signal=True)
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+
+    def check_workers(self):
+        for index, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+
+            process.join()
+            del self.processes[index]
+            if process.exitcode != 0:
+                app.logger.error("Worker {} died with exit code {}, restart in {}s".format(index, process.exitcode, self.restart_delay))
+                self.restart_at[index] = time.monotonic() + self.restart_delay
+
+        for index, restart_at in list(self.restart_at.items()):
+            if time.monotonic() >= restart_at:
+                del self.restart_at[index]
+                self.restarts += 1
+                self.start_worker(index)
+
+    def stop(self, forward_signal=False, timeout=120):
+        """Wait for the workers to write their buffered beacons. Workers which don't stop within timeout seconds are terminated."""
+
+        self.restart_at = {}
+
+        if forward_signal:
+            for process in self.processes.values():
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGINT)
+
+        deadline = time.monotonic() + timeout
+        for index, process in self.processes.items():
+            try:
+                process.join(max(deadline - time.monotonic(), 0))
+            except KeyboardInterrupt:
+                pass
+
+            if process.is_alive():
+                app.logger.error("Worker {} doesn't stop, terminate it".format(index))
+                process.terminate()
+                process.join()
+
+        self.processes = {}
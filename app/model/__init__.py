@@ -9,6 +9,8 @@ from .device_info_origin import DeviceInfoOrigin
 from .device_stats import DeviceStats
 from .aircraft_beacon import AircraftBeacon
 from .receiver_beacon import ReceiverBeacon
+from .position import Position
+from .reception import Reception
 from .receiver import Receiver
 from .receiver_stats import ReceiverStats
 from .takeoff_landing import TakeoffLanding
@@ -17,5 +19,6 @@ from .logbook import Logbook
 from .receiver_coverage import ReceiverCoverage
 from .relation_stats import RelationStats
 from .flights2d import Flight2D
+from .import_checkpoint import ImportCheckpoint
 
 from .geo import Location
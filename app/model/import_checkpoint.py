@@ -0,0 +1,16 @@
+from app import db
+
+
+class ImportCheckpoint(db.Model):
+    """Progress of a logfile import. The checkpoint is written in the same transaction as the imported beacons."""
+
+    __tablename__ = "import_checkpoints"
+
+    filename = db.Column(db.String, primary_key=True)
+    offset = db.Column(db.BigInteger)  # position in the (compressed) file, just for progress information
+    lines = db.Column(db.BigInteger)  # number of imported lines
+    finished = db.Column(db.Boolean, default=False)
+    updated = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return "<ImportCheckpoint %s: %s,%s,%s,%s>" % (self.filename, self.offset, self.lines, self.finished, self.updated)
@@ -0,0 +1,49 @@
+from geoalchemy2.types import Geometry
+
+from app import db
+
+
+class Position(db.Model):
+    """Normalized storage of the aircraft beacons: one position per device and timestamp, the receptions are in 'receptions'.
+       The values are taken from the reception with the fewest errors."""
+
+    __tablename__ = "positions"
+
+    device_id = db.Column(db.Integer, db.ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    timestamp = db.Column(db.DateTime, primary_key=True)
+
+    # APRS data
+    name = db.Column(db.String)
+    dstcall = db.Column(db.String)
+    location_wkt = db.Column("location", Geometry("POINT", srid=4326))
+    altitude = db.Column(db.Float(precision=2))
+    track = db.Column(db.SmallInteger)
+    ground_speed = db.Column(db.Float(precision=2))
+
+    # Flarm specific data
+    address_type = db.Column(db.SmallInteger)
+    aircraft_type = db.Column(db.SmallInteger)
+    stealth = db.Column(db.Boolean)
+    address = db.Column(db.String)
+    climb_rate = db.Column(db.Float(precision=2))
+    turn_rate = db.Column(db.Float(precision=2))
+    gps_quality_horizontal = db.Column(db.SmallInteger)
+    gps_quality_vertical = db.Column(db.SmallInteger)
+    software_version = db.Column(db.Float(precision=2))
+    hardware_version = db.Column(db.SmallInteger)
+    real_address = db.Column(db.String(6))
+
+    # Calculated values
+    location_mgrs = db.Column(db.String(15))
+    location_mgrs_short = db.Column(db.String(9))
+    agl = db.Column(db.Float(precision=2))
+    error_count = db.Column(db.SmallInteger)  # error count of the reception the values are taken from
+
+    # Relations
+    device = db.relationship("Device", foreign_keys=[device_id], backref=db.backref("positions", passive_deletes=True))
+
+    def __repr__(self):
+        return "<Position %s: %s,%s,%s,%s,%s>" % (self.device_id, self.timestamp, self.altitude, self.track, self.ground_speed, self.climb_rate)
+
+
+db.Index("ix_positions_timestamp", Position.timestamp)
@@ -0,0 +1,31 @@
+from app import db
+
+
+class Reception(db.Model):
+    """Normalized storage of the aircraft beacons: the receiver dependent values of a position."""
+
+    __tablename__ = "receptions"
+
+    device_id = db.Column(db.Integer, db.ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    timestamp = db.Column(db.DateTime, primary_key=True)
+    receiver_id = db.Column(db.Integer, db.ForeignKey("receivers.id", ondelete="CASCADE"), primary_key=True)
+
+    relay = db.Column(db.String)
+    signal_quality = db.Column(db.Float(precision=2))
+    error_count = db.Column(db.SmallInteger)
+
+    # Calculated values
+    distance = db.Column(db.Float(precision=2))
+    radial = db.Column(db.SmallInteger)
+    quality = db.Column(db.Float(precision=2))  # signal quality normalized to 10km
+
+    # Relations
+    device = db.relationship("Device", foreign_keys=[device_id], backref=db.backref("receptions", passive_deletes=True))
+    receiver = db.relationship("Receiver", foreign_keys=[receiver_id], backref=db.backref("receptions", passive_deletes=True))
+
+    def __repr__(self):
+        return "<Reception %s: %s,%s,%s,%s,%s>" % (self.device_id, self.timestamp, self.receiver_id, self.signal_quality, self.error_count, self.distance)
+
+
+db.Index("ix_receptions_timestamp", Reception.timestamp)
+db.Index("ix_receptions_receiver_id_distance", Reception.receiver_id, Reception.distance)
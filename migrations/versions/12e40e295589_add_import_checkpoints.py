@@ -0,0 +1,30 @@
+"""Add import_checkpoints
+
+Revision ID: 12e40e295589
+Revises: 885123e6a2d6
+Create Date: 2026-10-18 11:17:34.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '12e40e295589'
+down_revision = '885123e6a2d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('import_checkpoints',
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('offset', sa.BigInteger(), nullable=True),
+    sa.Column('lines', sa.BigInteger(), nullable=True),
+    sa.Column('finished', sa.Boolean(), nullable=True),
+    sa.Column('updated', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('filename')
+    )
+
+
+def downgrade():
+    op.drop_table('import_checkpoints')
@@ -0,0 +1,72 @@
+"""Add positions and receptions
+
+Revision ID: 5ae60559e59b
+Revises: 12e40e295589
+Create Date: 2026-10-18 11:42:17.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+# revision identifiers, used by Alembic.
+revision = '5ae60559e59b'
+down_revision = '12e40e295589'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('positions',
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('dstcall', sa.String(), nullable=True),
+    sa.Column('location', geoalchemy2.types.Geometry(geometry_type='POINT', srid=4326), nullable=True),
+    sa.Column('altitude', sa.Float(precision=2), nullable=True),
+    sa.Column('track', sa.SmallInteger(), nullable=True),
+    sa.Column('ground_speed', sa.Float(precision=2), nullable=True),
+    sa.Column('address_type', sa.SmallInteger(), nullable=True),
+    sa.Column('aircraft_type', sa.SmallInteger(), nullable=True),
+    sa.Column('stealth', sa.Boolean(), nullable=True),
+    sa.Column('address', sa.String(), nullable=True),
+    sa.Column('climb_rate', sa.Float(precision=2), nullable=True),
+    sa.Column('turn_rate', sa.Float(precision=2), nullable=True),
+    sa.Column('gps_quality_horizontal', sa.SmallInteger(), nullable=True),
+    sa.Column('gps_quality_vertical', sa.SmallInteger(), nullable=True),
+    sa.Column('software_version', sa.Float(precision=2), nullable=True),
+    sa.Column('hardware_version', sa.SmallInteger(), nullable=True),
+    sa.Column('real_address', sa.String(length=6), nullable=True),
+    sa.Column('location_mgrs', sa.String(length=15), nullable=True),
+    sa.Column('location_mgrs_short', sa.String(length=9), nullable=True),
+    sa.Column('agl', sa.Float(precision=2), nullable=True),
+    sa.Column('error_count', sa.SmallInteger(), nullable=True),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('device_id', 'timestamp')
+    )
+    op.create_index('ix_positions_timestamp', 'positions', ['timestamp'], unique=False)
+
+    op.create_table('receptions',
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('relay', sa.String(), nullable=True),
+    sa.Column('signal_quality', sa.Float(precision=2), nullable=True),
+    sa.Column('error_count', sa.SmallInteger(), nullable=True),
+    sa.Column('distance', sa.Float(precision=2), nullable=True),
+    sa.Column('radial', sa.SmallInteger(), nullable=True),
+    sa.Column('quality', sa.Float(precision=2), nullable=True),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['receiver_id'], ['receivers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('device_id', 'timestamp', 'receiver_id')
+    )
+    op.create_index('ix_receptions_timestamp', 'receptions', ['timestamp'], unique=False)
+    op.create_index('ix_receptions_receiver_id_distance', 'receptions', ['receiver_id', 'distance'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_receptions_receiver_id_distance', table_name='receptions')
+    op.drop_index('ix_receptions_timestamp', table_name='receptions')
+    op.drop_table('receptions')
+    op.drop_index('ix_positions_timestamp', table_name='positions')
+    op.drop_table('positions')
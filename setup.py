@@ -47,6 +47,7 @@ setup(
         'ogn-client==0.9.5',
         'psycopg2-binary==2.8.3',
         'mgrs==1.3.5',
+        'numpy==1.17.2',
         'xmlunittest==0.5.0',
         'tqdm==4.35.0',
 	'requests==2.22.0',
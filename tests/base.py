@@ -21,6 +21,8 @@ class TestBaseDB(unittest.TestCase):
         db.session.execute(
             """
             DELETE FROM aircraft_beacons;
+            DELETE FROM receptions;
+            DELETE FROM positions;
             DELETE FROM receiver_beacons;
             DELETE FROM takeoff_landings;
             DELETE FROM logbook;
@@ -0,0 +1,30 @@
+import unittest
+
+from app import app
+from app.model import AircraftBeacon, Position
+from app.collect.beacons import get_aircraft_beacons, get_positions
+
+
+class TestBeacons(unittest.TestCase):
+    def tearDown(self):
+        app.config["BEACON_LAYOUT"] = "beacons"
+
+    def test_beacons_layout(self):
+        self.assertIs(get_aircraft_beacons(), AircraftBeacon.__table__)
+        self.assertIs(get_positions(), AircraftBeacon.__table__)
+
+    def test_normalized_layout(self):
+        app.config["BEACON_LAYOUT"] = "normalized"
+
+        self.assertIs(get_positions(), Position.__table__)
+
+        # the columns used by the collectors have the names of the aircraft_beacons columns
+        beacons = get_aircraft_beacons()
+        columns = set(beacons.c.keys())
+        self.assertTrue(columns <= set(AircraftBeacon.__table__.c.keys()))
+        for column in ("timestamp", "device_id", "receiver_id", "location", "altitude", "ground_speed", "error_count", "distance", "quality", "relay", "signal_quality", "location_mgrs_short"):
+            self.assertIn(column, columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
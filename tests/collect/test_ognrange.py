@@ -3,7 +3,8 @@ import unittest
 
 from tests.base import TestBaseDB, db
 
-from app.model import AircraftBeacon, Receiver, ReceiverCoverage, Device
+from app import app
+from app.model import AircraftBeacon, Position, Reception, Receiver, ReceiverCoverage, Device
 from app.collect.ognrange import update_entries
 
 
@@ -48,5 +49,40 @@ class TestOGNrange(TestBaseDB):
         self.assertEqual(coverage.max_altitude, 850)
 
 
+class TestOGNrangeNormalized(TestBaseDB):
+    def setUp(self):
+        super().setUp()
+        app.config["BEACON_LAYOUT"] = "normalized"
+
+        self.dd0815 = Device(address="DD0815")
+        self.r01 = Receiver(name="Koenigsdf")
+        self.r02 = Receiver(name="Bene")
+        db.session.add_all([self.dd0815, self.r01, self.r02])
+        db.session.commit()
+
+        # one position received by two receivers and a second position
+        db.session.add(Position(device_id=self.dd0815.id, timestamp="2017-12-10 10:00:00", location_mgrs_short="89ABC1267", altitude=800))
+        db.session.add(Position(device_id=self.dd0815.id, timestamp="2017-12-10 10:00:01", location_mgrs_short="89ABC1267", altitude=850))
+        db.session.add(Reception(device_id=self.dd0815.id, timestamp="2017-12-10 10:00:00", receiver_id=self.r01.id, signal_quality=10))
+        db.session.add(Reception(device_id=self.dd0815.id, timestamp="2017-12-10 10:00:00", receiver_id=self.r02.id, signal_quality=5))
+        db.session.add(Reception(device_id=self.dd0815.id, timestamp="2017-12-10 10:00:01", receiver_id=self.r01.id, signal_quality=12))
+        db.session.commit()
+
+    def tearDown(self):
+        app.config["BEACON_LAYOUT"] = "beacons"
+        super().tearDown()
+
+    def test_update_receiver_coverage(self):
+        update_entries(db.session, date=date(2017, 12, 10))
+
+        coverages = {coverage.receiver_id: coverage for coverage in db.session.query(ReceiverCoverage).all()}
+        self.assertEqual(len(coverages), 2)
+        self.assertEqual(coverages[self.r01.id].min_altitude, 800)
+        self.assertEqual(coverages[self.r01.id].max_altitude, 850)
+        self.assertEqual(coverages[self.r01.id].max_signal_quality, 12)
+        self.assertEqual(coverages[self.r01.id].aircraft_beacon_count, 2)
+        self.assertEqual(coverages[self.r02.id].aircraft_beacon_count, 1)
+
+
 if __name__ == "__main__":
     unittest.main()
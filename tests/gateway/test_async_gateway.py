@@ -0,0 +1,189 @@
+import asyncio
+import shutil
+import tempfile
+import time
+import unittest
+
+from ogn.client import settings
+
+from app.gateway.async_gateway import AsyncGateway
+from app.gateway.spool import Spool, get_segments, read_segment
+
+
+class ListFeeder:
+    def __init__(self, spool=None):
+        self.spool = spool
+        self.buffered = []
+        self.batches = []
+
+    def parse(self, raw_string, spooled=False):
+        if raw_string.startswith("#"):
+            return None
+        self.buffered.append(raw_string)
+        return raw_string
+
+    def buffered_count(self):
+        return len(self.buffered)
+
+    def take_batch(self, complete=False):
+        batch, self.buffered = self.buffered, []
+        return batch, []
+
+    def write_batch(self, aircraft_messages, receiver_messages):
+        self.batches.append(aircraft_messages)
+
+    def prepare(self):
+        pass
+
+    def transfer(self):
+        pass
+
+    def finish(self):
+        self.write_batch(*self.take_batch())
+
+
+class SlowFeeder(ListFeeder):
+    def write_batch(self, aircraft_messages, receiver_messages):
+        time.sleep(0.2)
+        super().write_batch(aircraft_messages, receiver_messages)
+
+
+class TestAsyncGateway(unittest.TestCase):
+    def setUp(self):
+        self.host, self.port = settings.APRS_SERVER_HOST, settings.APRS_SERVER_PORT_FULL_FEED
+
+    def tearDown(self):
+        settings.APRS_SERVER_HOST, settings.APRS_SERVER_PORT_FULL_FEED = self.host, self.port
+
+    def test_backpressure(self):
+        lines = ["# aprsc 2.1.4-g408ed49"] + ["line {}".format(i) for i in range(25)]
+        logins = []
+
+        async def handle(reader, writer):
+            logins.append(await reader.readline())
+            for line in lines:
+                writer.write((line + "\n").encode())
+            await writer.drain()
+
+        async def scenario(gateway):
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            settings.APRS_SERVER_HOST = "127.0.0.1"
+            settings.APRS_SERVER_PORT_FULL_FEED = server.sockets[0].getsockname()[1]
+
+            task = asyncio.ensure_future(gateway.main())
+            while gateway.stats["written"] < 20:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            server.close()
+
+        saver = ListFeeder()
+        gateway = AsyncGateway(saver, "anon-test", queue_size=5, max_buffered=10, flush_interval=60)
+        asyncio.run(scenario(gateway))
+        gateway.shutdown()
+
+        self.assertTrue(logins[0].startswith(b"user anon-test pass -1"))
+        self.assertEqual([len(batch) for batch in saver.batches[:2]], [10, 10])
+        self.assertEqual(sum(saver.batches, []), lines[1:])
+
+    def test_spill(self):
+        lines = ["line {}".format(i) for i in range(30)]
+
+        async def handle(reader, writer):
+            await reader.readline()
+            for line in lines:
+                writer.write((line + "\n").encode())
+            await writer.drain()
+
+        async def scenario(gateway):
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            settings.APRS_SERVER_HOST = "127.0.0.1"
+            settings.APRS_SERVER_PORT_FULL_FEED = server.sockets[0].getsockname()[1]
+
+            task = asyncio.ensure_future(gateway.main())
+            while gateway.stats["written"] < 30:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            server.close()
+
+        saver = SlowFeeder()
+        gateway = AsyncGateway(saver, "anon-test", queue_size=5, max_buffered=10, flush_interval=60)
+        asyncio.run(scenario(gateway))
+        gateway.shutdown()
+
+        # the reader doesn't wait while the writer is busy, the lines above the queue size are spilled
+        self.assertGreater(gateway.queue.spilled_total, 0)
+        self.assertEqual(sum(saver.batches, []), lines)
+
+    def test_spill_spooled(self):
+        lines = ["line {}".format(i) for i in range(30)]
+
+        async def handle(reader, writer):
+            await reader.readline()
+            for line in lines:
+                writer.write((line + "\n").encode())
+            await writer.drain()
+
+        async def scenario(gateway):
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            settings.APRS_SERVER_HOST = "127.0.0.1"
+            settings.APRS_SERVER_PORT_FULL_FEED = server.sockets[0].getsockname()[1]
+
+            task = asyncio.ensure_future(gateway.main())
+            while gateway.stats["received"] < 30:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            server.close()
+
+        path = tempfile.mkdtemp()
+        try:
+            spool = Spool(path)
+            saver = SlowFeeder(spool=spool)
+            gateway = AsyncGateway(saver, "anon-test", queue_size=5, max_buffered=10, flush_interval=60)
+            asyncio.run(scenario(gateway))
+            spilled = gateway.queue.spilled
+
+            # a crash now loses the temporary spill file, but the spilled lines are in the spool
+            spool.close()
+            self.assertGreater(spilled, 0)
+            spooled = [raw_string for _, filename in get_segments(path) for _, raw_string in read_segment(filename)]
+            self.assertEqual(spooled, lines)
+        finally:
+            shutil.rmtree(path)
+
+    def test_spool(self):
+        lines = ["line {}".format(i) for i in range(10)]
+
+        async def handle(reader, writer):
+            await reader.readline()
+            for line in lines:
+                writer.write((line + "\n").encode())
+            await writer.drain()
+
+        async def scenario(gateway):
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            settings.APRS_SERVER_HOST = "127.0.0.1"
+            settings.APRS_SERVER_PORT_FULL_FEED = server.sockets[0].getsockname()[1]
+
+            task = asyncio.ensure_future(gateway.main())
+            while gateway.stats["received"] < 10:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            server.close()
+
+        path = tempfile.mkdtemp()
+        try:
+            spool = Spool(path)
+            saver = ListFeeder(spool=spool)
+            gateway = AsyncGateway(saver, "anon-test", flush_interval=60)
+            asyncio.run(scenario(gateway))
+            spool.close()
+
+            # the reader spooled the lines before queueing them
+            spooled = [raw_string for _, filename in get_segments(path) for _, raw_string in read_segment(filename)]
+            self.assertEqual(spooled, lines)
+        finally:
+            shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
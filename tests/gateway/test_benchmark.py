@@ -0,0 +1,68 @@
+import unittest
+from collections import Counter
+from datetime import datetime
+
+from app.gateway.benchmark import percentile, run_benchmark, format_report
+
+
+class CountingFeeder:
+    def __init__(self):
+        self.parsed = []
+        self.calls = Counter()
+        self.stage_times = {"copy": 0.5}
+        self.stage_counts = {"copy": 2}
+
+    def parse(self, raw_string, reference_date=None):
+        self.parsed.append((reference_date, raw_string))
+
+    def flush(self, complete=True):
+        self.calls["flush"] += 1
+
+    def prepare(self):
+        self.calls["prepare"] += 1
+
+    def transfer(self):
+        self.calls["transfer"] += 1
+
+    def finish(self):
+        self.calls["finish"] += 1
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 90), 90)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_run_benchmark(self):
+        lines = [(datetime(2020, 5, 1, 10, 0, i), "line {}".format(i)) for i in range(50)]
+        saver = CountingFeeder()
+
+        result = run_benchmark(saver, lines, flush_interval=0, transfer_interval=3600)
+
+        self.assertEqual(saver.parsed, [(timestamp, raw_string) for timestamp, raw_string in lines])
+        self.assertEqual(saver.calls, {"flush": 50, "prepare": 50, "finish": 1})
+        self.assertEqual(result["messages"], 50)
+        self.assertEqual(len(result["flush_latencies"]), 50)
+        self.assertEqual(result["transfer_latencies"], [])
+        self.assertEqual(result["stage_times"], {"copy": 0.5})
+
+        report = format_report(result)
+        self.assertTrue(report[0].startswith("Messages:  50 in"))
+        self.assertTrue(report[-1].strip().startswith("copy"))
+
+    def test_rate(self):
+        lines = [(datetime(2020, 5, 1, 10, 0, 0), "line {}".format(i)) for i in range(11)]
+
+        result = run_benchmark(CountingFeeder(), lines, rate=100)
+
+        self.assertGreaterEqual(result["elapsed"], 0.09)
+        self.assertLess(result["rate"], 125)
+
+
+if __name__ == "__main__":
+    unittest.main()
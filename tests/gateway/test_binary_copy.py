@@ -0,0 +1,63 @@
+import struct
+import unittest
+from datetime import datetime
+
+from app.model import AircraftBeacon
+from app.gateway.binary_copy import BinaryCopyEncoder, PGCOPY_HEADER, PGCOPY_TRAILER, encode_timestamp
+
+
+def decode_rows(data):
+    """Returns the fields of the encoded rows as bytes (None for NULL)."""
+
+    rows = []
+    position = 0
+    while position < len(data):
+        (field_count,) = struct.unpack_from("!h", data, position)
+        position += 2
+
+        row = []
+        for i in range(field_count):
+            (length,) = struct.unpack_from("!i", data, position)
+            position += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(data[position : position + length])
+                position += length
+        rows.append(row)
+
+    return rows
+
+
+class TestBinaryCopy(unittest.TestCase):
+    def test_header(self):
+        self.assertEqual(len(PGCOPY_HEADER), 19)
+        self.assertEqual(PGCOPY_TRAILER, b"\xff\xff")
+
+    def test_timestamp(self):
+        self.assertEqual(encode_timestamp(datetime(2000, 1, 1, 0, 0, 1)), struct.pack("!iq", 8, 1000000))
+
+    def test_encode_row(self):
+        encoder = BinaryCopyEncoder(AircraftBeacon.__table__, ["name", "timestamp", "location", "altitude", "track", "stealth", "receiver_id", "distance"])
+
+        message = {"name": "FLRDDEB4F", "timestamp": datetime(2019, 10, 1, 12, 0, 0), "latitude": 48.5, "longitude": 11.25, "altitude": 1200.5, "track": 99, "stealth": False, "receiver_id": 42, "distance": None}
+        (row,) = decode_rows(encoder.encode_rows([message]))
+
+        self.assertEqual(row[0], b"FLRDDEB4F")
+        self.assertEqual(struct.unpack("!q", row[1])[0], int((message["timestamp"] - datetime(2000, 1, 1)).total_seconds()) * 1000000)
+        self.assertEqual(struct.unpack("<BIIdd", row[2]), (1, 0x20000001, 4326, 11.25, 48.5))
+        self.assertEqual(struct.unpack("!f", row[3])[0], 1200.5)
+        self.assertEqual(struct.unpack("!h", row[4])[0], 99)
+        self.assertEqual(row[5], b"\x00")
+        self.assertEqual(struct.unpack("!i", row[6])[0], 42)
+        self.assertIsNone(row[7])
+
+    def test_missing_location(self):
+        encoder = BinaryCopyEncoder(AircraftBeacon.__table__, ["name", "location"])
+
+        (row,) = decode_rows(encoder.encode_rows([{"name": "FLRDDEB4F"}]))
+        self.assertEqual(row, [b"FLRDDEB4F", None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from app.utils import open_file
+from app.gateway.bulkimport import convert, convert_lines, convert_records, imap_bounded, convert_chunk, read_chunks, get_compressed_position, BEACON_KEY_FIELDS, AIRCRAFT_BEACON_FIELDS, RECEIVER_BEACON_FIELDS
+
+from tests.gateway.test_binary_copy import decode_rows
+
+
+class TestBulkimport(unittest.TestCase):
+    def setUp(self):
+        self.logfile = os.path.dirname(__file__) + "/../commands/OGN_log.txt_2016-09-21"
+        self.reference_date = datetime(2016, 9, 21, 12, 0, 0)
+
+    def test_read_chunks(self):
+        with open(self.logfile) as fin:
+            chunks = list(read_chunks(fin, 200))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [200, 200, 100])
+
+    def test_convert_lines(self):
+        lines = [
+            "FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316 !W62! id06DDEB4F +594fpm -0.1rot 13.8dB 0e -2.1kHz gps2x2",
+            "EPLS>APRS,TCPIP*,qAC,GLIDERN1:>070006h v0.2.5.x64 CPU:0.4 RAM:369.8/913.6MB NTP:0.2ms/+6.7ppm +29.0C 0/0Acfts[1h] RF:+80+0.9ppm/-1.10dB/+8.3dB@10km[1323017]",
+            "# aprsc 2.1.4-g408ed49",
+            "this is not an APRS message",
+        ]
+        aircraft_data, receiver_data = convert_lines(lines, self.reference_date)
+
+        aircraft_rows = decode_rows(aircraft_data)
+        self.assertEqual(len(aircraft_rows), 1)
+        self.assertEqual(len(aircraft_rows[0]), len(BEACON_KEY_FIELDS + AIRCRAFT_BEACON_FIELDS))
+        self.assertEqual(aircraft_rows[0][:2], [b"FLRDDEB4F", b"EDER"])
+
+        receiver_rows = decode_rows(receiver_data)
+        self.assertEqual(len(receiver_rows), 1)
+        self.assertEqual(len(receiver_rows[0]), len(BEACON_KEY_FIELDS + RECEIVER_BEACON_FIELDS))
+
+    def test_convert_records_agl(self):
+        class FlatGrid:
+            def elevation(self, latitudes, longitudes):
+                return np.full(len(latitudes), 300.0)
+
+        lines = ["FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316 !W62! id06DDEB4F +594fpm -0.1rot 13.8dB 0e -2.1kHz gps2x2"]
+
+        aircraft_records, _ = convert_records(lines, self.reference_date)
+        self.assertIsNone(aircraft_records[0].agl)
+
+        aircraft_records, _ = convert_records(lines, self.reference_date, elevation_grid=FlatGrid())
+        self.assertAlmostEqual(aircraft_records[0].agl, aircraft_records[0].altitude - 300.0)
+
+    def test_convert_chunk(self):
+        with open(self.logfile) as fin:
+            lines = fin.readlines()
+
+        line_count, aircraft_data, receiver_data = convert_chunk((lines, self.reference_date))
+        self.assertEqual(line_count, 500)
+        self.assertGreater(len(decode_rows(aircraft_data)), 0)
+        self.assertGreater(len(decode_rows(receiver_data)), 0)
+
+    def test_convert_checkpoints(self):
+        class RowSaver:
+            def __init__(self):
+                self.rows = 0
+                self.checkpoints = []
+
+            def add_rows(self, aircraft_rows, receiver_rows):
+                self.rows += len(decode_rows(aircraft_rows)) + len(decode_rows(receiver_rows))
+
+            def flush(self, checkpoint=None):
+                self.checkpoints.append(checkpoint)
+
+        saver = RowSaver()
+        convert(self.logfile, "2016-09-21", saver, chunk_size=100)
+        self.assertEqual(saver.checkpoints, [("OGN_log.txt_2016-09-21", os.path.getsize(self.logfile), 500)])
+
+        # continue after line 400
+        resumed_saver = RowSaver()
+        convert(self.logfile, "2016-09-21", resumed_saver, chunk_size=100, start_line=400)
+        self.assertEqual(resumed_saver.checkpoints[-1][2], 500)
+        self.assertLess(resumed_saver.rows, saver.rows)
+
+    def test_convert_processes(self):
+        class RowSaver:
+            def __init__(self):
+                self.rows = []
+
+            def add_rows(self, aircraft_rows, receiver_rows):
+                self.rows.append((aircraft_rows, receiver_rows))
+
+            def flush(self, checkpoint=None):
+                pass
+
+        saver, pool_saver = RowSaver(), RowSaver()
+        convert(self.logfile, "2016-09-21", saver, chunk_size=50)
+        convert(self.logfile, "2016-09-21", pool_saver, processes=2, chunk_size=50)
+        self.assertEqual(pool_saver.rows, saver.rows)
+
+    def test_imap_bounded(self):
+        from multiprocessing.pool import ThreadPool
+
+        submitted = []
+
+        def tasks():
+            for i in range(20):
+                submitted.append(i)
+                yield i
+
+        with ThreadPool(2) as pool:
+            results = imap_bounded(pool, abs, tasks(), max_pending=4)
+            self.assertEqual(next(results), 0)
+            # the first result is consumed when the fifth task is read
+            self.assertEqual(len(submitted), 5)
+            self.assertEqual(list(results), list(range(1, 20)))
+
+    def test_compressed_position(self):
+        path = tempfile.mkdtemp()
+        gzip_file = os.path.join(path, "OGN_log.txt_2016-09-21.gz")
+        with open(self.logfile, "rb") as fin, gzip.open(gzip_file, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+
+        fin = open_file(gzip_file)
+        self.assertEqual(len(fin.readlines()), 500)
+        self.assertEqual(get_compressed_position(fin), os.path.getsize(gzip_file))
+        fin.close()
+
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+import psycopg2
+from sqlalchemy.exc import OperationalError
+
+from tests.base import TestBaseDB, db
+
+from app.model import Receiver
+from app.gateway.connection import FeederConnection
+
+
+class TestFeederConnection(TestBaseDB):
+    def test_prepared_statement(self):
+        connection = FeederConnection()
+
+        def insert(connection):
+            connection.execute("insert_receiver", "INSERT INTO receivers(name) VALUES('Koenigsdf');")
+
+        connection.run(insert)
+        connection.run(insert)
+        self.assertEqual(connection.prepared, {"insert_receiver"})
+        self.assertEqual(db.session.query(Receiver).count(), 2)
+
+        # a new connection has to prepare the statement again
+        connection.close()
+        connection.run(insert)
+        self.assertEqual(db.session.query(Receiver).count(), 3)
+
+        connection.close()
+
+    def test_setup_queries(self):
+        connection = FeederConnection(setup_queries=["CREATE TEMPORARY TABLE temp_names (name VARCHAR) ON COMMIT DELETE ROWS"])
+
+        def insert(connection):
+            self.assertEqual(connection.execute("insert_temp_name", "INSERT INTO temp_names VALUES('Letzi')"), 1)
+
+        connection.run(insert)
+        connection.run(insert)
+
+        connection.close()
+
+
+class TestFeederReconnect(unittest.TestCase):
+    def setUp(self):
+        self.refused = OperationalError("connect", {}, psycopg2.OperationalError("connection refused"))
+
+    @mock.patch("app.gateway.connection.sleep")
+    @mock.patch("app.gateway.connection.db")
+    def test_database_down(self, db_mock, sleep_mock):
+        db_mock.engine.raw_connection.side_effect = self.refused
+        connection = FeederConnection(max_attempts=3, retry_delay=1)
+
+        with self.assertRaises(OperationalError):
+            connection.run(lambda connection: connection.cursor())
+
+        self.assertEqual(db_mock.engine.raw_connection.call_count, 3)
+        self.assertEqual([call[0][0] for call in sleep_mock.call_args_list], [1, 2])
+        self.assertIsNone(connection.connection)
+
+    @mock.patch("app.gateway.connection.sleep")
+    @mock.patch("app.gateway.connection.db")
+    def test_database_back(self, db_mock, sleep_mock):
+        raw_connection = mock.Mock()
+        db_mock.engine.raw_connection.side_effect = [self.refused, self.refused, raw_connection]
+        connection = FeederConnection(max_attempts=5)
+
+        connection.run(lambda connection: connection.cursor())
+        raw_connection.commit.assert_called()
+        self.assertEqual(sleep_mock.call_count, 2)
+
+    @mock.patch("app.gateway.connection.db")
+    def test_other_error(self, db_mock):
+        raw_connection = db_mock.engine.raw_connection.return_value
+        connection = FeederConnection()
+
+        def work(connection):
+            connection.cursor()
+            raise ValueError("bad data")
+
+        with self.assertRaises(ValueError):
+            connection.run(work)
+        raw_connection.rollback.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
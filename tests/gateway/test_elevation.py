@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from app.gateway.elevation import ElevationGrid, add_agl
+
+
+class TestElevationGrid(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+        # 6x6 pixels with 0.1 degree resolution from 10E/48N to 10.6E/47.4N, 3x3 tiles with 2x2 pixels, the lower right tile is empty
+        used_tiles = np.ones((3, 3), dtype=bool)
+        used_tiles[2, 2] = False
+        grid = ElevationGrid.create(self.path, left=10.0, top=48.0, resolution_x=0.1, resolution_y=0.1, rows=6, cols=6, used_tiles=used_tiles, tile_size=2)
+
+        values = np.arange(36, dtype=np.float32).reshape(6, 6) * 10
+        values[0, 0] = np.nan
+        grid.write_block(0, 0, values[:3, :])
+        grid.write_block(3, 0, values[3:, :])
+        grid.tiles.flush()
+
+        self.grid = ElevationGrid(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_pixel_values(self):
+        values = self.grid.pixel_values([0, 0, 1, 5, 5, -1, 6], [0, 1, 2, 0, 5, 0, 0])
+
+        self.assertTrue(np.isnan(values[0]))
+        np.testing.assert_equal(values[1:4], [10, 80, 300])
+        self.assertTrue(np.isnan(values[4]))  # empty tile
+        self.assertTrue(np.isnan(values[5]))  # outside
+        self.assertTrue(np.isnan(values[6]))  # outside
+
+    def test_elevation(self):
+        # pixel center of (1, 1), between (1, 1) and (1, 2), between the 4 pixels (1, 1), (1, 2), (2, 1), (2, 2)
+        elevations = self.grid.elevation([47.85, 47.85, 47.8], [10.15, 10.2, 10.2])
+        np.testing.assert_almost_equal(elevations, [70, 75, 105], decimal=3)
+
+        # no data in the neighbourhood: use the enclosing pixel
+        elevations = self.grid.elevation([47.99], [10.11])
+        np.testing.assert_almost_equal(elevations, [10])
+
+        # outside
+        self.assertTrue(np.isnan(self.grid.elevation([49.0], [10.0])[0]))
+
+    def test_add_agl(self):
+        messages = [{"latitude": 47.85, "longitude": 10.15, "altitude": 1070}, {"latitude": 49.0, "longitude": 10.0, "altitude": 1000}, {"altitude": 1000}]
+        add_agl(messages, self.grid)
+
+        self.assertAlmostEqual(messages[0]["agl"], 1000, places=3)
+        self.assertIsNone(messages[1]["agl"])
+        self.assertNotIn("agl", messages[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
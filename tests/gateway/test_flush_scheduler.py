@@ -0,0 +1,62 @@
+import unittest
+
+from app.gateway.flush_scheduler import FlushScheduler
+
+
+class TestFlushScheduler(unittest.TestCase):
+    def test_size(self):
+        scheduler = FlushScheduler(max_rows=3, max_bytes=1000, max_latency=20)
+
+        scheduler.record(100, 0.0)
+        scheduler.record(100, 0.1)
+        self.assertIsNone(scheduler.flush_reason(0.2))
+        scheduler.record(100, 0.2)
+        self.assertEqual(scheduler.flush_reason(0.2), "size")
+
+        scheduler.flushed(0.3)
+        self.assertIsNone(scheduler.flush_reason(0.3))
+
+        scheduler.record(1000, 0.4)
+        self.assertEqual(scheduler.flush_reason(0.4), "size")
+
+    def test_latency(self):
+        scheduler = FlushScheduler(max_rows=100, max_latency=20)
+
+        # nothing buffered: no flush
+        self.assertIsNone(scheduler.flush_reason(100.0))
+        self.assertIsNone(scheduler.time_to_flush(100.0))
+
+        scheduler.record(100, 100.0)
+        scheduler.record(100, 110.0)
+        self.assertEqual(scheduler.time_to_flush(110.0), 10.0)
+        self.assertIsNone(scheduler.flush_reason(119.9))
+        self.assertEqual(scheduler.flush_reason(120.0), "latency")
+
+        # beacons which are still in the buffers are flushed with the next latency flush
+        scheduler.flushed(120.0, remaining=1)
+        self.assertEqual((scheduler.rows, scheduler.bytes), (1, 100))
+        self.assertEqual(scheduler.flush_reason(140.0), "latency")
+
+        scheduler.flushed(140.0)
+        self.assertIsNone(scheduler.flush_reason(200.0))
+
+    def test_transfer(self):
+        scheduler = FlushScheduler(transfer_interval=30)
+        scheduler.transferred(0.0)
+
+        # quiet period: nothing to transfer
+        self.assertFalse(scheduler.should_transfer(60.0))
+
+        scheduler.record(100, 60.0)
+        scheduler.flushed(80.0)
+        self.assertTrue(scheduler.should_transfer(80.0))
+
+        scheduler.transferred(80.0)
+        scheduler.record(100, 90.0)
+        scheduler.flushed(100.0)
+        self.assertFalse(scheduler.should_transfer(100.0))
+        self.assertTrue(scheduler.should_transfer(110.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from app.gateway.geodesy import distance_sphere, azimuth, normalized_quality, ReceiverLocations, add_distances, EARTH_RADIUS
+
+
+class TestGeodesy(unittest.TestCase):
+    def test_distance_sphere(self):
+        distances = distance_sphere([11.0, 11.0, 11.0], [47.0, 47.0, 0.0], [11.0, 11.0, 12.0], [48.0, 47.0, 0.0])
+
+        self.assertAlmostEqual(distances[0], EARTH_RADIUS * np.pi / 180, places=3)
+        self.assertEqual(distances[1], 0)
+        self.assertAlmostEqual(distances[2], EARTH_RADIUS * np.pi / 180, places=3)
+
+    def test_azimuth(self):
+        azimuths = azimuth([11.0, 11.0, 11.0, 11.0, 11.0], [47.0, 47.0, 47.0, 47.0, 47.0], [11.0, 12.0, 11.0, 10.0, 11.0], [48.0, 47.0, 46.0, 47.0, 47.0])
+
+        np.testing.assert_almost_equal(azimuths[:4], [0, 90, 180, 270])
+        self.assertTrue(np.isnan(azimuths[4]))
+
+    def test_normalized_quality(self):
+        qualities = normalized_quality([10.0, 10.0, 10.0], [10000.0, 100000.0, 0.0])
+
+        np.testing.assert_almost_equal(qualities[:2], [10.0, 30.0])
+        self.assertTrue(np.isnan(qualities[2]))
+
+    def test_add_distances(self):
+        receiver_locations = ReceiverLocations()
+        receiver_locations.update(1, 11.0, 47.0)
+
+        messages = [
+            {"receiver_id": 1, "longitude": 11.0, "latitude": 48.0, "signal_quality": 10.0},
+            {"receiver_id": 1, "longitude": 12.0, "latitude": 47.0, "signal_quality": None},
+            {"receiver_id": 1, "longitude": 11.0, "latitude": 47.0, "signal_quality": 10.0},
+            {"receiver_id": 2, "longitude": 11.0, "latitude": 48.0, "signal_quality": 10.0},
+            {"receiver_id": 1},
+        ]
+        add_distances(messages, receiver_locations)
+
+        self.assertAlmostEqual(messages[0]["distance"], EARTH_RADIUS * np.pi / 180, places=3)
+        self.assertEqual(messages[0]["radial"], 180)
+        self.assertAlmostEqual(messages[0]["quality"], 10.0 + 20 * np.log10(messages[0]["distance"] / 10000))
+
+        self.assertEqual(messages[1]["radial"], 270)
+        self.assertIsNone(messages[1]["quality"])
+
+        self.assertEqual(messages[2]["distance"], 0)
+        self.assertIsNone(messages[2]["radial"])
+        self.assertIsNone(messages[2]["quality"])
+
+        self.assertNotIn("distance", messages[3])
+        self.assertNotIn("distance", messages[4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from datetime import datetime
+
+from app.gateway.merger import BeaconMerger
+
+
+class TestBeaconMerger(unittest.TestCase):
+    def test_merge(self):
+        merger = BeaconMerger(window=5)
+
+        timestamp = datetime(2019, 10, 1, 12, 0, 0)
+        position = {"name": "Koenigsdf", "receiver_name": "GLIDERN1", "timestamp": timestamp, "location": "SRID=4326;POINT(11.4 48.1)", "version": None}
+        status = {"name": "Koenigsdf", "receiver_name": "GLIDERN1", "timestamp": timestamp, "version": "0.2.7", "location": None}
+        other = {"name": "Letzi", "receiver_name": "GLIDERN1", "timestamp": timestamp, "version": "0.2.6"}
+
+        self.assertIs(merger.add(position, now=100), position)
+        self.assertIs(merger.add(other, now=103), other)
+        self.assertIsNone(merger.add(status, now=104))
+
+        merged = position
+        self.assertEqual(len(merger), 2)
+        self.assertEqual(merged["location"], "SRID=4326;POINT(11.4 48.1)")
+        self.assertEqual(merged["version"], "0.2.7")
+
+        self.assertEqual(merger.pop_ready(now=104), [])
+        self.assertEqual(merger.pop_ready(now=106), [merged])
+        self.assertEqual(merger.pop_all(), [other])
+        self.assertEqual(len(merger), 0)
+
+    def test_max(self):
+        merger = BeaconMerger()
+
+        timestamp = datetime(2019, 10, 1, 12, 0, 0)
+        first = {"name": "FLRDDEB4F", "receiver_name": "EDER", "timestamp": timestamp, "latitude": 50.4, "longitude": 10.9, "altitude": 800.0, "error_count": 0, "stealth": False}
+        second = {"name": "FLRDDEB4F", "receiver_name": "EDER", "timestamp": timestamp, "latitude": 50.1, "longitude": 11.3, "altitude": 1200.0, "error_count": None, "stealth": True}
+
+        merger.add(first, now=100)
+        merger.add(second, now=101)
+
+        # like MAX() in SQL, the coordinates are taken as pair
+        self.assertEqual(merger.pop_all(), [{"name": "FLRDDEB4F", "receiver_name": "EDER", "timestamp": timestamp, "latitude": 50.4, "longitude": 10.9, "altitude": 1200.0, "error_count": 0, "stealth": True}])
+
+
+if __name__ == "__main__":
+    unittest.main()
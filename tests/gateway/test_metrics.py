@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+from urllib.request import urlopen
+
+from app.gateway.metrics import Metrics, format_labels
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.describe("test_received_total", "counter", "Received lines")
+        self.metrics.describe("test_duration_seconds", "histogram", "Durations")
+        self.metrics.describe("test_stage_seconds", "summary", "Stage times")
+
+    def test_format_labels(self):
+        self.assertEqual(format_labels({}), "")
+        self.assertEqual(format_labels({"b": 1, "a": 'x"y'}), '{a="x\\"y",b="1"}')
+
+    def test_histogram(self):
+        self.metrics.observe("test_duration_seconds", 0.5, buckets=(0.1, 1))
+        self.metrics.observe_many("test_duration_seconds", [0.05, 2.0], buckets=(0.1, 1))
+
+        lines = self.metrics.render().splitlines()
+        self.assertEqual(
+            lines,
+            [
+                "# HELP test_duration_seconds Durations",
+                "# TYPE test_duration_seconds histogram",
+                'test_duration_seconds_bucket{le="0.1"} 1',
+                'test_duration_seconds_bucket{le="1"} 2',
+                'test_duration_seconds_bucket{le="+Inf"} 3',
+                "test_duration_seconds_sum 2.55",
+                "test_duration_seconds_count 3",
+            ],
+        )
+
+    def test_collectors(self):
+        def collector():
+            yield "test_received_total", {"beacon_type": "flarm"}, 10
+            yield "test_stage_seconds_sum", {"stage": "copy"}, 1.5
+            yield "test_stage_seconds_count", {"stage": "copy"}, 3
+
+        def broken_collector():
+            raise ValueError()
+            yield
+
+        self.metrics.add_collector(collector)
+        self.metrics.add_collector(broken_collector)
+
+        text = self.metrics.render()
+        self.assertIn('# TYPE test_received_total counter\ntest_received_total{beacon_type="flarm"} 10\n', text)
+        self.assertIn('# TYPE test_stage_seconds summary\ntest_stage_seconds_sum{stage="copy"} 1.5\ntest_stage_seconds_count{stage="copy"} 3\n', text)
+
+        self.metrics.remove_collector(collector)
+        self.assertNotIn("test_received_total", self.metrics.render())
+
+    def test_write(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "gateway.prom")
+            self.metrics.observe("test_duration_seconds", 0.5)
+            self.metrics.write(filename)
+
+            with open(filename) as fin:
+                self.assertEqual(fin.read(), self.metrics.render())
+            self.assertEqual(os.listdir(tmpdir), ["gateway.prom"])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_serve(self):
+        self.metrics.observe("test_duration_seconds", 0.5)
+        server = self.metrics.serve(0)
+        try:
+            with urlopen("http://127.0.0.1:{}/metrics".format(server.server_address[1])) as response:
+                self.assertEqual(response.read().decode(), self.metrics.render())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from mgrs import MGRS
+
+from app.gateway.mgrs_cache import MgrsEncoder
+
+
+class TestMgrsEncoder(unittest.TestCase):
+    def setUp(self):
+        self.coordinates = [(50.42850, 10.31425), (46.82733, 7.54200), (-33.5, 151.2), (47.0, -122.3), (50.42850, 10.31425)]
+
+    def test_encode(self):
+        encoder = MgrsEncoder()
+        mgrs = MGRS()
+
+        for latitude, longitude in self.coordinates:
+            location_mgrs, location_mgrs_short = encoder.encode(latitude, longitude)
+
+            expected = mgrs.toMGRS(latitude, longitude).decode("utf-8")
+            self.assertEqual(location_mgrs, expected)
+            self.assertEqual(location_mgrs_short, expected[0:5] + expected[5:7] + expected[10:12])
+
+        self.assertEqual(encoder.cache_info().hits, 1)
+        self.assertEqual(encoder.cache_info().misses, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
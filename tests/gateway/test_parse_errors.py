@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from ogn.parser import ParseError
+
+from app.gateway.parse_errors import ParseErrorLog, get_dead_letter_files, read_dead_letters
+from app import app
+
+
+class TestParseErrorLog(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, "dead_letters.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_counts(self):
+        parse_errors = ParseErrorLog(summary_interval=3600)
+        reference_date = datetime(2016, 9, 21, 12, 0, 0)
+
+        parse_errors.record("line 1", ParseError("line 1"), reference_date)
+        parse_errors.record("line 2", ParseError("line 2"), reference_date)
+        parse_errors.record("line 3", NotImplementedError("line 3"), reference_date)
+
+        self.assertEqual(parse_errors.counts, {"ParseError": 2, "NotImplementedError": 1})
+        self.assertEqual(parse_errors.total, 3)
+
+        parse_errors.log_summary()
+        self.assertEqual(parse_errors.counts, {})
+        self.assertEqual(parse_errors.total, 3)
+
+    def test_summary_if_due(self):
+        parse_errors = ParseErrorLog(summary_interval=60)
+        parse_errors.record("line 1", ParseError("line 1"), datetime(2016, 9, 21, 12, 0, 0))
+
+        parse_errors.log_summary_if_due()
+        self.assertEqual(parse_errors.counts, {"ParseError": 1})
+
+        # no further errors: the periodic call logs the summary after the interval
+        parse_errors.last_summary -= 60
+        with self.assertLogs(app.logger, level="ERROR") as logs:
+            parse_errors.log_summary_if_due()
+        self.assertIn("ParseError=1", logs.output[0])
+        self.assertEqual(parse_errors.counts, {})
+
+    def test_dead_letters(self):
+        parse_errors = ParseErrorLog()
+        parse_errors.set_dead_letter_file(self.filename, max_bytes=200, backup_count=5)
+
+        reference_date = datetime(2016, 9, 21, 12, 0, 0)
+        for i in range(10):
+            parse_errors.record("FLRDDEB4F>APRS,qAS,EDER:/broken line {}".format(i), ParseError("broken"), reference_date)
+
+        files = get_dead_letter_files(self.filename)
+        self.assertGreater(len(files), 1)
+        self.assertTrue(files[0].endswith(".gz"))
+        self.assertEqual(files[-1], self.filename)
+
+        lines = [line for filename in files for line in read_dead_letters(filename)]
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(lines[0], ("ParseError", reference_date, "FLRDDEB4F>APRS,qAS,EDER:/broken line 0"))
+        self.assertEqual(lines[-1][2], "FLRDDEB4F>APRS,qAS,EDER:/broken line 9")
+
+
+if __name__ == "__main__":
+    unittest.main()
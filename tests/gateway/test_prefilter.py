@@ -0,0 +1,82 @@
+import unittest
+from datetime import datetime
+
+from ogn.parser import parse
+
+from app.gateway.prefilter import PreFilter, classify, get_receiver_name, get_partition
+
+
+class TestPreFilter(unittest.TestCase):
+    def test_classify(self):
+        self.assertEqual(classify("FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316 !W62! id06DDEB4F +594fpm -0.1rot 13.8dB 0e -2.1kHz gps2x2"), "aprs")
+        self.assertEqual(classify("EPLS>APRS,TCPIP*,qAC,GLIDERN1:>070006h v0.2.5.x64 CPU:0.4 RAM:369.8/913.6MB NTP:0.2ms/+6.7ppm +29.0C"), "aprs")
+        self.assertEqual(classify("FLRDD4E91>OGFLR,qAS,Letzi:/164011h4730.62N/00833.56E'000/000/A=001574 !W19! id06DD4E91 -019fpm +0.0rot 39.8dB 0e -1.2kHz gps2x3"), "flarm")
+        self.assertEqual(classify("Letzi>OGNSDR,TCPIP*,qAC,GLIDERN2:/165030h4730.62NI00833.56E&/A=001630"), "receiver")
+        self.assertEqual(classify("ICA3D1C35>OGXYZ,qAS,Letzi:/165030h4730.62N/00833.56E'/A=001630"), "unknown")
+        self.assertEqual(classify("# aprsc 2.1.4-g408ed49"), "comment")
+        self.assertEqual(classify(""), "comment")
+        self.assertEqual(classify("connecting to server"), "invalid")
+        self.assertEqual(classify("FLRDDEB4F>APRS,qAS,EDER:}something else"), "invalid")
+
+    def test_accept(self):
+        prefilter = PreFilter(include=["aprs_aircraft", "flarm"], exclude=["flarm"])
+
+        self.assertTrue(prefilter.accept("FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316"))
+        self.assertFalse(prefilter.accept("FLRDD4E91>OGFLR,qAS,Letzi:/164011h4730.62N/00833.56E'000/000/A=001574"))
+        self.assertFalse(prefilter.accept("LEMD>OGNSDR,TCPIP*,qAC,GLIDERN1:/070006h4024.63NI00343.78W&/A=002000"))
+        self.assertFalse(prefilter.accept("# aprsc 2.1.4-g408ed49"))
+
+        self.assertEqual(prefilter.passed, 1)
+        self.assertEqual(prefilter.received, {"aprs": 1, "flarm": 1, "receiver": 1, "comment": 1})
+        self.assertEqual(prefilter.skipped, {"flarm": 1, "receiver": 1, "comment": 1})
+
+        # without aprs_aircraft and aprs_receiver the 'APRS' lines are dropped before parsing
+        self.assertFalse(PreFilter(include=["flarm"]).accept("FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316"))
+
+    def test_accept_message(self):
+        reference_date = datetime(2016, 9, 21, 12, 0, 0)
+        aircraft = parse("FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316 !W62! id06DDEB4F +594fpm -0.1rot 13.8dB 0e -2.1kHz gps2x2", reference_date)
+        receiver = parse("EPLS>APRS,TCPIP*,qAC,GLIDERN1:>070006h v0.2.5.x64 CPU:0.4 RAM:369.8/913.6MB NTP:0.2ms/+6.7ppm +29.0C", reference_date)
+        # the parser decides by the comment, not by the path
+        receiver_position = parse("EDER>APRS,qAS,GLIDERN2:/070010h5025.71NI01018.85E&/A=000810", reference_date)
+        flarm = parse("FLRDD4E91>OGFLR,qAS,Letzi:/164011h4730.62N/00833.56E'000/000/A=001574 !W19! id06DD4E91 -019fpm +0.0rot 39.8dB 0e -1.2kHz gps2x3", reference_date)
+
+        self.assertEqual([message["beacon_type"] for message in (aircraft, receiver, receiver_position)], ["aprs_aircraft", "aprs_receiver", "aprs_receiver"])
+
+        prefilter = PreFilter(include=["aprs_aircraft", "flarm"])
+        self.assertTrue(prefilter.accept_message(aircraft))
+        self.assertFalse(prefilter.accept_message(receiver))
+        self.assertFalse(prefilter.accept_message(receiver_position))
+        self.assertTrue(prefilter.accept_message(flarm))
+        self.assertEqual(prefilter.skipped, {"aprs_receiver": 2})
+
+        # the receiver of a receiver beacon is its sender
+        prefilters = [PreFilter(partition=(index, 3)) for index in range(3)]
+        self.assertEqual([prefilter.accept_message(receiver) for prefilter in prefilters].index(True), get_partition("EPLS", 3))
+        self.assertEqual([prefilter.accept_message(aircraft) for prefilter in prefilters].index(True), get_partition("EDER", 3))
+
+    def test_get_receiver_name(self):
+        self.assertEqual(get_receiver_name("FLRDD4E91>OGFLR,qAS,Letzi:/164011h4730.62N/00833.56E'000/000/A=001574", "flarm"), "Letzi")
+        self.assertEqual(get_receiver_name("FLRDD4E91>OGFLR,RELAY*,qAS,Letzi:/164011h4730.62N/00833.56E'000/000/A=001574", "flarm"), "Letzi")
+        self.assertEqual(get_receiver_name("Letzi>OGNSDR,TCPIP*,qAC,GLIDERN2:/165030h4730.62NI00833.56E&/A=001630", "receiver"), "Letzi")
+
+    def test_partition(self):
+        lines = [
+            "FLRDD4E91>OGFLR,qAS,Letzi:/164011h4730.62N/00833.56E'000/000/A=001574",
+            "Letzi>OGNSDR,TCPIP*,qAC,GLIDERN2:/165030h4730.62NI00833.56E&/A=001630",
+            "FLRDD4E91>OGFLR,qAS,EDER:/164011h4730.62N/00833.56E'000/000/A=001574",
+            "EDER>OGNSDR,TCPIP*,qAC,GLIDERN2:/165030h4730.62NI00833.56E&/A=001630",
+            "FLRDD4E91>OGFLR,qAS,Koenigsdf:/164011h4730.62N/00833.56E'000/000/A=001574",
+        ]
+
+        prefilters = [PreFilter(partition=(index, 3)) for index in range(3)]
+        accepted = [[line for line in lines if prefilter.accept(line)] for prefilter in prefilters]
+
+        # each line is accepted by exactly one worker, a receiver and its aircraft beacons by the same worker
+        self.assertEqual(sorted(sum(accepted, [])), sorted(lines))
+        self.assertTrue(lines[0] in accepted[get_partition("Letzi", 3)] and lines[1] in accepted[get_partition("Letzi", 3)])
+        self.assertEqual(sum([prefilter.other_partitions for prefilter in prefilters]), 2 * len(lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
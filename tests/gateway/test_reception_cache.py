@@ -0,0 +1,56 @@
+import unittest
+from datetime import datetime
+
+from ogn.parser import parse
+
+from app.gateway.reception_cache import ReceptionCache, get_reception
+
+
+class TestReceptionCache(unittest.TestCase):
+    def setUp(self):
+        self.reference_date = datetime(2016, 9, 21, 12, 0, 0)
+        self.first = "FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316 !W62! id06DDEB4F +594fpm -0.1rot 13.8dB 0e -2.1kHz gps2x2"
+        self.second = "FLRDDEB4F>APRS,RELAY*,qAS,EDFW:/065957h5025.71N/01018.85E'099/043/A=004316 !W62! id06DDEB4F +594fpm -0.1rot 7.2dB 3e +1.5kHz gps2x2"
+
+    def test_get_reception(self):
+        key, body, reception = get_reception(self.second)
+        self.assertEqual(key, get_reception(self.first)[0])
+        self.assertTrue(body.startswith("/065957h"))
+        self.assertEqual(reception, {"receiver_name": "EDFW", "relay": "RELAY", "signal_quality": 7.2, "error_count": 3, "frequency_offset": 1.5, "signal_power": None})
+
+        self.assertIsNone(get_reception("EDER>APRS,TCPIP*,qAC,GLIDERN1:>065957h v0.2.5.x64 CPU:0.4"))
+
+    def test_cache(self):
+        cache = ReceptionCache()
+
+        reception = get_reception(self.first)
+        self.assertIsNone(cache.get(reception, self.first, self.reference_date))
+        cache.add(reception, parse(self.first, self.reference_date), now=0)
+
+        message = cache.get(get_reception(self.second), self.second, self.reference_date)
+        self.assertEqual(message, parse(self.second, self.reference_date))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_expire(self):
+        cache = ReceptionCache(window=10, max_size=2)
+
+        cache.add(get_reception(self.first), parse(self.first, self.reference_date), now=0)
+        self.assertEqual(len(cache), 1)
+
+        other = self.first.replace("065957h", "070001h")
+        cache.add(get_reception(other), parse(other, self.reference_date), now=11)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get(get_reception(self.second), self.second, self.reference_date))
+
+    def test_mismatch(self):
+        cache = ReceptionCache()
+
+        # the parser doesn't agree with the receiver fields: the beacon is not cached
+        message = parse(self.first, self.reference_date)
+        message["signal_quality"] = 1.0
+        cache.add(get_reception(self.first), message)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from datetime import datetime
+
+from app.model import AircraftBeacon
+from app.gateway.binary_copy import BinaryCopyEncoder
+from app.gateway.records import make_record_type
+
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        self.fields = ["name", "timestamp", "location", "altitude", "track", "receiver_id"]
+        self.Record = make_record_type("Record", self.fields)
+
+    def test_from_message(self):
+        message = {"name": "FLRDDEB4F", "timestamp": datetime(2019, 10, 1, 12, 0, 0), "latitude": 48.5, "longitude": 11.25, "altitude": 1200.5, "raw_message": "FLRDDEB4F>APRS"}
+        record = self.Record.from_message(message)
+
+        self.assertEqual(record.name, "FLRDDEB4F")
+        self.assertEqual(record.location, (11.25, 48.5))
+        self.assertIsNone(record.track)
+        self.assertEqual(record[self.Record.index["altitude"]], 1200.5)
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_missing_location(self):
+        record = self.Record.from_message({"name": "FLRDDEB4F"})
+        self.assertIsNone(record.location)
+
+    def test_encode_record(self):
+        encoder = BinaryCopyEncoder(AircraftBeacon.__table__, self.fields)
+
+        message = {"name": "FLRDDEB4F", "timestamp": datetime(2019, 10, 1, 12, 0, 0), "latitude": 48.5, "longitude": 11.25, "altitude": 1200.5, "track": 99, "receiver_id": None}
+        self.assertEqual(encoder.encode_records([self.Record.from_message(message)]), encoder.encode_rows([message]))
+
+        message = {"name": "FLRDDEB4F", "timestamp": datetime(2019, 10, 1, 12, 0, 0)}
+        self.assertEqual(encoder.encode_record(self.Record.from_message(message)), encoder.encode_row(message))
+
+
+if __name__ == "__main__":
+    unittest.main()
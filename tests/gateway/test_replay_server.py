@@ -0,0 +1,102 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from app.gateway.replay_server import ReplayServer, read_log, rewrite_timestamp, get_line_seconds
+
+LINES = [
+    "# aprsc 2.1.4-g408ed49 21 Sep 2016 23:59:50 GMT GLIDERN1 37.187.40.234:10152",
+    "FLRDDEB4F>APRS,qAS,EDER:/235958h5025.71N/01018.85E'099/043/A=004316 !W62! id06DDEB4F +594fpm -0.1rot 13.8dB 0e -2.1kHz gps2x2",
+    "EPLS>APRS,TCPIP*,qAC,GLIDERN1:>235959h v0.2.5.x64 CPU:0.4 RAM:369.8/913.6MB NTP:0.2ms/+6.7ppm +29.0C",
+    "FLRDDEB4F>APRS,qAS,EDER:/235957h5025.71N/01018.85E'099/043/A=004316 !W62! id06DDEB4F +594fpm -0.1rot 13.8dB 0e -2.1kHz gps2x2",
+    "FLRDDEB4F>APRS,qAS,EDER:/000001h5025.73N/01018.90E'099/043/A=004330 !W62! id06DDEB4F +594fpm -0.1rot 13.8dB 0e -2.1kHz gps2x2",
+]
+
+
+class TestReplayServer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.logfile = os.path.join(self.tmpdir, "OGN_log.txt_2016-09-21")
+        with open(self.logfile, "w") as fout:
+            fout.write("\n".join(LINES) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_timestamps(self):
+        self.assertEqual(get_line_seconds(LINES[1]), 86398)
+        self.assertIsNone(get_line_seconds(LINES[0]))
+
+        self.assertEqual(rewrite_timestamp(LINES[2], datetime(2020, 5, 1, 12, 34, 56)), LINES[2].replace(">235959h", ">123456h"))
+
+    def test_read_log(self):
+        # no time before the first timestamp, late beacons don't go back, midnight
+        self.assertEqual([seconds for seconds, _ in read_log(self.logfile)], [0, 0, 1, 1, 3])
+        self.assertEqual([raw_string for _, raw_string in read_log(self.logfile)], LINES)
+
+    def test_stream(self):
+        server = ReplayServer(self.logfile, speed=100)
+
+        async def scenario():
+            aprs_server = await server.start("127.0.0.1", 0)
+            port = aprs_server.sockets[0].getsockname()[1]
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"user test pass -1 vers test 0.1\n")
+            await writer.drain()
+
+            async def read():
+                received = []
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), timeout=5)
+                    if not line:
+                        return received
+                    received.append(line.decode().rstrip("\r\n"))
+
+            read_task = asyncio.ensure_future(read())
+            await server.finished.wait()
+            await server.close_clients()
+            received = await read_task
+
+            writer.close()
+            aprs_server.close()
+            return received
+
+        received = asyncio.run(scenario())
+
+        self.assertTrue(received[0].startswith("# aprsc"))
+        self.assertEqual(received[1], "# logresp test unverified, server GLIDERN1")
+        # the lines played before the client connected are missed
+        self.assertGreater(len(received), 2)
+        self.assertEqual(received[2:], LINES[len(LINES) + 2 - len(received) :])
+        self.assertEqual(server.stats["sent"] + server.stats["dropped"], len(LINES))
+
+    def test_disconnect(self):
+        server = ReplayServer(self.logfile, speed=1, loop=True, disconnect_interval=0.2)
+
+        async def scenario():
+            aprs_server = await server.start("127.0.0.1", 0)
+            port = aprs_server.sockets[0].getsockname()[1]
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"user test pass -1 vers test 0.1\n")
+            await writer.drain()
+
+            while await asyncio.wait_for(reader.readline(), timeout=5):
+                pass
+
+            writer.close()
+            await server.close_clients()
+            aprs_server.close()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(server.stats["connects"], 1)
+        self.assertEqual(server.stats["disconnects"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
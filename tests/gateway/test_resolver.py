@@ -0,0 +1,54 @@
+import unittest
+
+from tests.base import TestBaseDB, db
+
+from app.model import Device, Receiver
+from app.gateway.resolver import IdResolver
+
+
+class TestIdResolver(TestBaseDB):
+    def setUp(self):
+        super().setUp()
+
+        db.session.execute("INSERT INTO receivers(name) VALUES('Koenigsdf')")
+        db.session.execute("INSERT INTO devices(address) VALUES('DDEFF7')")
+        db.session.commit()
+
+    def test_known_keys(self):
+        resolver = IdResolver()
+
+        receiver = db.session.query(Receiver).filter(Receiver.name == "Koenigsdf").one()
+        device = db.session.query(Device).filter(Device.address == "DDEFF7").one()
+
+        self.assertEqual(resolver.get_receiver_id("Koenigsdf"), receiver.id)
+        self.assertEqual(resolver.get_device_id("DDEFF7"), device.id)
+        self.assertFalse(resolver.has_missing())
+
+    def test_missing_keys(self):
+        resolver = IdResolver(batch_size=1)
+
+        self.assertIsNone(resolver.get_receiver_id("Letzi"))
+        self.assertIsNone(resolver.get_receiver_id("Koenigsdf2"))
+        self.assertIsNone(resolver.get_device_id("DDAC7C"))
+        self.assertIsNone(resolver.get_device_id(None))
+        self.assertTrue(resolver.has_missing())
+
+        resolver.resolve()
+        self.assertFalse(resolver.has_missing())
+
+        self.assertEqual(db.session.query(Receiver).count(), 3)
+        self.assertEqual(db.session.query(Device).count(), 2)
+
+        letzi = db.session.query(Receiver).filter(Receiver.name == "Letzi").one()
+        self.assertEqual(resolver.get_receiver_id("Letzi"), letzi.id)
+
+        # a second resolver must not insert the keys again
+        resolver2 = IdResolver()
+        resolver2.missing_receivers.add("Letzi")
+        resolver2.resolve()
+        self.assertEqual(db.session.query(Receiver).count(), 3)
+        self.assertEqual(resolver2.get_receiver_id("Letzi"), letzi.id)
+
+
+if __name__ == "__main__":
+    unittest.main()
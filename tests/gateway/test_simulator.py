@@ -0,0 +1,54 @@
+import unittest
+from collections import Counter
+from datetime import datetime
+
+from ogn.parser import parse
+
+from app.gateway.prefilter import classify
+from app.gateway.simulator import TrafficSimulator, format_latitude, format_longitude
+
+
+class TestSimulator(unittest.TestCase):
+    def test_format_coordinates(self):
+        self.assertEqual(format_latitude(48.5), ("4830.00N", 0))
+        self.assertEqual(format_latitude(-33.123456), ("3307.40S", 7))
+        self.assertEqual(format_longitude(8.55945), ("00833.56E", 7))
+        self.assertEqual(format_longitude(-122.0), ("12200.00W", 0))
+
+    def test_lines(self):
+        simulator = TrafficSimulator(aircraft_count=10, receiver_count=10, airfield_count=2, radius=20000, start=datetime(2020, 5, 1, 10, 0, 0), seed=1)
+        lines = list(simulator.lines(600))
+
+        self.assertEqual([timestamp for timestamp, _ in lines], sorted([timestamp for timestamp, _ in lines]))
+        self.assertEqual(set([classify(raw_string) for _, raw_string in lines]), {"flarm", "tracker", "receiver"})
+
+        aprs_types = Counter()
+        for timestamp, raw_string in lines[::10]:
+            message = parse(raw_string, timestamp)
+            self.assertEqual(message["timestamp"], timestamp)
+            aprs_types[(message["beacon_type"], message["aprs_type"])] += 1
+        self.assertEqual(set(aprs_types), {("flarm", "position"), ("tracker", "position"), ("receiver", "position"), ("receiver", "status")})
+
+        # the same beacon is received by more than one receiver
+        receptions = Counter([(raw_string.split(">")[0], timestamp) for timestamp, raw_string in lines if classify(raw_string) != "receiver"])
+        self.assertGreater(max(receptions.values()), 1)
+
+    def test_flights(self):
+        simulator = TrafficSimulator(aircraft_count=5, receiver_count=1, start=datetime(2020, 5, 1, 10, 0, 0), seed=2)
+        states = set()
+        for _ in simulator.lines(6 * 3600):
+            states.update([aircraft.state for aircraft in simulator.aircraft])
+
+        self.assertEqual(states, {"ground", "takeoff", "thermal", "glide", "landing", "landed"})
+        self.assertTrue(all([aircraft.state == "landed" for aircraft in simulator.aircraft]))
+
+    def test_deterministic(self):
+        start = datetime(2020, 5, 1, 10, 0, 0)
+        lines1 = list(TrafficSimulator(aircraft_count=5, receiver_count=5, start=start, seed=3).lines(60))
+        lines2 = list(TrafficSimulator(aircraft_count=5, receiver_count=5, start=start, seed=3).lines(60))
+
+        self.assertEqual(lines1, lines2)
+
+
+if __name__ == "__main__":
+    unittest.main()
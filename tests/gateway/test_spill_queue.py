@@ -0,0 +1,46 @@
+import unittest
+
+from app.gateway.spill_queue import SpillQueue
+
+
+class TestSpillQueue(unittest.TestCase):
+    def test_fifo(self):
+        queue = SpillQueue(memory_limit=3, read_size=2)
+        for i in range(10):
+            queue.put(float(i), "line {}\n".format(i).encode())
+
+        self.assertEqual(len(queue), 10)
+        self.assertEqual(queue.spilled_total, 7)
+
+        result = []
+        for i in range(4):
+            result.append(queue.get())
+
+        # new lines go behind the spilled lines
+        queue.put(10.0, b"line 10\n")
+
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            result.append(item)
+
+        self.assertEqual([received for received, _ in result], [float(i) for i in range(11)])
+        self.assertEqual([line.strip() for _, line in result], ["line {}".format(i).encode() for i in range(11)])
+        self.assertEqual(len(queue), 0)
+
+        # the file is truncated when it is read completely
+        self.assertEqual(queue.write_position, 0)
+        queue.close()
+
+    def test_memory_only(self):
+        queue = SpillQueue(memory_limit=10)
+        queue.put(1.5, b"line\n")
+
+        self.assertEqual(queue.get(), (1.5, b"line\n"))
+        self.assertIsNone(queue.get())
+        self.assertIsNone(queue.file)
+
+
+if __name__ == "__main__":
+    unittest.main()
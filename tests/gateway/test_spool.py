@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from app.gateway.spool import Spool, acquire_lock, get_segments, read_segment, replay_spool
+
+
+class ListSaver:
+    def __init__(self):
+        self.lines = []
+        self.finished = False
+
+    def parse(self, raw_string, reference_date=None):
+        self.lines.append((reference_date, raw_string))
+
+    def buffered_count(self):
+        return 0
+
+    def finish(self):
+        self.finished = True
+
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_mark_and_acknowledge(self):
+        spool = Spool(self.path)
+
+        spool.append("FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316", received=1474441197.0)
+        mark = spool.mark()
+        spool.append("# aprsc 2.1.4-g408ed49", received=1474441198.0)
+        spool.close()
+
+        self.assertEqual([segment for segment, _ in get_segments(self.path)], [1, 2])
+
+        lines = list(read_segment(get_segments(self.path)[0][1]))
+        self.assertEqual(lines, [(datetime(2016, 9, 21, 6, 59, 57), "FLRDDEB4F>APRS,qAS,EDER:/065957h5025.71N/01018.85E'099/043/A=004316")])
+
+        spool.acknowledge(mark)
+        self.assertEqual([segment for segment, _ in get_segments(self.path)], [2])
+
+        # a new spool continues with the next segment
+        self.assertEqual(Spool(self.path).mark(), 3)
+
+    def test_mark_processed(self):
+        spool = Spool(self.path)
+        spool.append("line 1")
+        spool.append("line 2")
+        self.assertEqual(spool.mark(processed=2), 2)
+
+        # the reader spooled lines which are not yet processed: they must not be acknowledged
+        spool.append("line 3")
+        spool.append("line 4")
+        self.assertEqual(spool.mark(processed=3), 2)
+        self.assertEqual(spool.mark(processed=4), 3)
+
+        spool.acknowledge(3)
+        self.assertEqual(list(spool.segment_ends), [])
+        spool.close()
+
+    def test_lock(self):
+        spool = Spool(self.path)
+        self.assertIsNone(acquire_lock(self.path))
+        with self.assertRaises(RuntimeError):
+            Spool(self.path)
+
+        spool.close()
+        acquire_lock(self.path).close()
+
+    def test_rotation(self):
+        spool = Spool(self.path, segment_size=100)
+        for i in range(10):
+            spool.append("x" * 40)
+        spool.close()
+
+        self.assertEqual(len(get_segments(self.path)), 5)
+
+    def test_incomplete_line(self):
+        filename = os.path.join(self.path, "spool_000000000001.log")
+        with open(filename, "w") as f:
+            f.write("1474441197.000 line 1\n1474441198.000 line")
+
+        self.assertEqual([raw_string for _, raw_string in read_segment(filename)], ["line 1"])
+
+    def test_replay(self):
+        spool = Spool(self.path)
+        spool.append("line 1", received=1474441197.0)
+        spool.mark()
+        spool.append("line 2", received=1474441198.0)
+        spool.close()
+
+        saver = ListSaver()
+        self.assertEqual(replay_spool(self.path, saver), 2)
+        self.assertEqual([raw_string for _, raw_string in saver.lines], ["line 1", "line 2"])
+        self.assertEqual(saver.lines[1][0], datetime(2016, 9, 21, 6, 59, 58))
+        self.assertTrue(saver.finished)
+        self.assertEqual(get_segments(self.path), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from app.gateway.supervisor import Supervisor
+
+
+def worker(path, fail_once=False):
+    """Writes a file for each start. With fail_once the first start fails."""
+
+    starts = len(os.listdir(path))
+    with open(os.path.join(path, "start_{}".format(starts)), "w"):
+        pass
+
+    if fail_once and starts == 0:
+        sys.exit(1)
+
+
+class TestSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.paths = [os.path.join(self.tmpdir, str(index)) for index in range(2)]
+        for path in self.paths:
+            os.mkdir(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_restart(self):
+        supervisor = Supervisor(worker, [{"path": self.paths[0]}, {"path": self.paths[1], "fail_once": True}], restart_delay=0)
+        supervisor.run()
+
+        self.assertEqual(supervisor.restarts, 1)
+        self.assertEqual(len(os.listdir(self.paths[0])), 1)
+        self.assertEqual(len(os.listdir(self.paths[1])), 2)
+        self.assertEqual(supervisor.processes, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import datetime
+
+import unittest
+
+from tests.base import TestBaseDB, db
+from app.model import Device, Receiver, Position, Reception
+
+
+class TestPosition(TestBaseDB):
+    def setUp(self):
+        self.device = Device(name="FLRDD0815", address="DD0815")
+        self.receiver = Receiver(name="Koenigsdf")
+        db.session.add(self.device)
+        db.session.add(self.receiver)
+        db.session.commit()
+
+        timestamp = datetime.datetime(2019, 10, 1, 12, 0, 0)
+        db.session.add(Position(device_id=self.device.id, timestamp=timestamp, altitude=800))
+        db.session.add(Reception(device_id=self.device.id, timestamp=timestamp, receiver_id=self.receiver.id, signal_quality=12.5))
+        db.session.commit()
+
+    def test_delete_device(self):
+        db.session.delete(self.device)
+        db.session.commit()
+
+        self.assertEqual(db.session.query(Position).count(), 0)
+        self.assertEqual(db.session.query(Reception).count(), 0)
+
+    def test_delete_receiver(self):
+        db.session.delete(self.receiver)
+        db.session.commit()
+
+        self.assertEqual(db.session.query(Position).count(), 1)
+        self.assertEqual(db.session.query(Reception).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()